@@ -1,3 +1,7 @@
+import time
+from api.startup import LAZY_STARTUP, phase, record_phase, preload_heavy_modules, mark_first_response, print_startup_report
+
+_import_started = time.perf_counter()
 import os
 from flask import Flask, request, session, jsonify
 from flask_cors import CORS
@@ -5,18 +9,38 @@ from pymongo import MongoClient
 from dotenv import load_dotenv
 import nest_asyncio
 from datetime import datetime
-from flask_socketio import SocketIO
-
-socketio = SocketIO(cors_allowed_origins="*", async_mode='threading')
 
 nest_asyncio.apply()
 
 
 load_dotenv()
+record_phase('imports', _import_started)
+
+with phase('database'):
+    from api.database import db
+
+_socketio = None
+
+
+def get_socketio():
+    """The shared SocketIO instance; flask_socketio (and its engineio stack) is imported on first use."""
+    global _socketio
+    if _socketio is None:
+        from flask_socketio import SocketIO
+        # gunicorn.conf.py sets gevent/eventlet for the green worker classes
+        _socketio = SocketIO(cors_allowed_origins="*", async_mode=os.getenv('SOCKETIO_ASYNC_MODE', 'threading'))
+    return _socketio
+
+
+def __getattr__(name):
+    # `from api import socketio` keeps working without importing flask_socketio up front
+    if name == 'socketio':
+        return get_socketio()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-from api.database import db
 
 def create_app():
+    started = time.perf_counter()
     app = Flask(__name__)
     
     app.secret_key = os.getenv("FLASK_SECRET_KEY", "change-in-production")
@@ -39,8 +63,8 @@ def create_app():
                  "https://acadhub.kuberbassi.com"
              ],
              "supports_credentials": True,
-             "allow_headers": ["Content-Type", "Authorization", "Accept"],
-             "expose_headers": ["Content-Type", "Authorization"],
+             "allow_headers": ["Content-Type", "Authorization", "Accept", "X-Profile"],
+             "expose_headers": ["Content-Type", "Authorization", "X-Next-Cursor", "X-Profile-Id", "Server-Timing"],
              "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"]
          }})
 
@@ -53,8 +77,8 @@ def create_app():
         """
         import jwt as jwt_lib
         
-        # Skip if already have session
-        if 'user' in session:
+        # Skip if already have session (and for /metrics, whose bearer is METRICS_TOKEN)
+        if 'user' in session or request.path == '/metrics':
             return
         
         # Check for JWT token
@@ -72,7 +96,6 @@ def create_app():
                 # This ensures course, semester, batch, etc. are available
                 user_email = payload.get('email', '').lower()  # ✅ Normalized to lowercase
                 if user_email:
-                    from api.database import db
                     users_collection = db.get_collection('users')
                     db_user = users_collection.find_one({'email': user_email})
                     
@@ -116,24 +139,42 @@ def create_app():
                 # The route will return 401 if 'user' is missing from session.
                 print(f"⚠️ JWT middleware error: {e}")
 
+    record_phase('app', started)
+
     # Security, Scalability & Logging Middleware
+    started = time.perf_counter()
     from api.middleware.compression import init_compression
     from api.middleware.security import init_security_headers
     from api.middleware.logging import init_activity_logger
     from api.middleware.honeypot import init_honeypot
-    
+    from api.query_stats import init_query_stats
+    from api.metrics import init_metrics
+    from api.profiling import init_profiling
+
+    # First, so the other middleware's time and queries are counted too
+    init_metrics(app)
+    init_query_stats(app)
+    init_profiling(app)
     init_compression(app)
     init_security_headers(app)
     init_activity_logger(app)
     init_honeypot(app)
+    record_phase('middleware', started)
 
     @app.errorhandler(Exception)
     def handle_exception(e):
         import traceback
         print(f"🔥 SERVER ERROR: {str(e)}")
-        traceback.print_exc()
-        response = jsonify({"error": str(e), "trace": traceback.format_exc()})
-        response.status_code = 500
+        from pymongo.errors import ConnectionFailure
+        if isinstance(e, ConnectionFailure):
+            # Database down (or circuit open): say so, without a stack trace per request
+            response = jsonify({"error": "Database temporarily unavailable", "code": "DB_UNAVAILABLE"})
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+        else:
+            traceback.print_exc()
+            response = jsonify({"error": str(e), "trace": traceback.format_exc()})
+            response.status_code = 500
         # Determine origin for CORS
         request_origin = request.headers.get('Origin')
         allowed_origins = [
@@ -156,13 +197,24 @@ def create_app():
             response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
             response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, Accept'
         return response
-    
+
+    @app.after_request
+    def note_first_response(response):
+        mark_first_response()
+        return response
+
+    started = time.perf_counter()
     from api.routes.attendance import attendance_bp, mark_attendance, get_attendance_logs, get_classes_for_date, get_calendar_data, delete_attendance, edit_attendance
     from api.routes.dashboard import dashboard_bp, get_dashboard_data, get_notifications, get_reports_data, analytics_day_of_week
     from api.routes.profile import profile_bp, handle_profile, handle_preferences, get_system_logs, upload_pfp
     from api.routes.academic import academic_bp, handle_results, handle_manual_courses, handle_manual_course_item, get_full_subjects_data, get_subjects, get_subject_details, delete_subject, update_subject_details, update_attendance_count
     from api.routes.timetable import timetable_bp, handle_timetable, handle_holidays, save_structure, add_slot, update_slot, delete_slot, delete_holiday
     from api.routes.skills import skills_bp, get_skills, add_skill, update_skill, delete_skill
+    from api.routes.batch import batch_bp
+    from api.routes.events import events_bp
+    from api.routes.health import health_bp, health_check
+    from api.routes.metrics import metrics_bp
+    from api.routes.profiles import profiles_bp
     from api.auth import auth_bp
     from api.keep import keep_bp
     from api.scraper import scraper_bp, get_notices
@@ -175,11 +227,17 @@ def create_app():
     app.register_blueprint(academic_bp, url_prefix='/api/v1/academic')
     app.register_blueprint(timetable_bp, url_prefix='/api/v1/timetable')
     app.register_blueprint(skills_bp, url_prefix='/api/v1/skills')
+    app.register_blueprint(batch_bp, url_prefix='/api/v1/batch')
+    app.register_blueprint(events_bp, url_prefix='/api/v1/events')
+    app.register_blueprint(health_bp, url_prefix='/api/v1/health')
+    app.register_blueprint(metrics_bp, url_prefix='/metrics')
+    app.register_blueprint(profiles_bp, url_prefix='/api/v1/profiles')
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(keep_bp)
     app.register_blueprint(scraper_bp, url_prefix='/api/scraper')
 
     # LEGACY ROUTES (Frontend Compatibility)
+    app.add_url_rule('/api/health', view_func=health_check, methods=['GET'])
     app.add_url_rule('/api/current_user', view_func=handle_profile, methods=['GET'])
     app.add_url_rule('/api/preferences', view_func=handle_preferences, methods=['GET', 'POST'])
     app.add_url_rule('/api/dashboard_data', view_func=get_dashboard_data, methods=['GET'])
@@ -235,12 +293,21 @@ def create_app():
     app.add_url_rule('/api/delete_all_data', view_func=delete_all_data, methods=['DELETE'])
     app.add_url_rule('/api/backups', view_func=list_backups, methods=['GET'])
     app.add_url_rule('/api/restore_backup/<backup_id>', view_func=restore_backup, methods=['POST'])
+    record_phase('blueprints', started)
 
     
     # Initialize Rate Limiter
-    init_limiter(app)
+    with phase('limiter'):
+        init_limiter(app)
     
-    # Initialize SocketIO
-    socketio.init_app(app)
+    # Initialize SocketIO (connect/join handlers + optional cross-worker message queue).
+    # Lazy startup defers it to the first /socket.io request.
+    with phase('realtime'):
+        from api.realtime import init_realtime
+        init_realtime(app, lazy=LAZY_STARTUP)
+
+    if not LAZY_STARTUP:
+        preload_heavy_modules()
+    print_startup_report()
     
     return app
@@ -18,6 +18,7 @@ from itertools import groupby
 from werkzeug.utils import secure_filename
 from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
 from api.database import db  # ✅ Import central db to avoid circularity
+from api import grading
 # try:
 #     from pywebpush import webpush, WebPushException
 # except ImportError:
@@ -327,76 +328,22 @@ def calculate_percent(attended, total):
 # --- IPU Grading Helper Functions ---
 def get_ipu_grade(percentage):
     """Returns IPU grade and grade point based on percentage."""
-    if percentage >= 90:
-        return 'O', 10
-    elif percentage >= 75:
-        return 'A+', 9
-    elif percentage >= 65:
-        return 'A', 8
-    elif percentage >= 55:
-        return 'B+', 7
-    elif percentage >= 50:
-        return 'B', 6
-    elif percentage >= 45:
-        return 'C', 5
-    elif percentage >= 40:
-        return 'P', 4
-    else:
-        return 'F', 0
+    return grading.IPU_10.lookup(percentage)
 
 def calculate_subject_result(subject):
     """
     Calculates total marks, percentage, grade and grade point for a subject.
     IPU formula: Theory (40 internal + 60 external) + Practical (40 internal + 60 external)
     """
-    subject_type = subject.get('type', 'theory')
-    """Calculate total marks, percentage, grade, and grade point for a subject."""
-    s_type = subject.get('type', 'theory')
-    
-    # Convert to int, handling both None and string values
-    internal_theory = int(subject.get('internal_theory') or 0) if subject.get('internal_theory') else 0
-    external_theory = int(subject.get('external_theory') or 0) if subject.get('external_theory') else 0
-    internal_practical = int(subject.get('internal_practical') or 0) if subject.get('internal_practical') else 0
-    external_practical = int(subject.get('external_practical') or 0) if subject.get('external_practical') else 0
-    
-    total_marks = 0
-    max_marks = 0
-    
-    if s_type == 'theory':
-        total_marks = internal_theory + external_theory
-        max_marks = 100
-    elif s_type == 'practical':
-        total_marks = internal_practical + external_practical
-        max_marks = 100
-    elif s_type == 'nues':
-        total_marks = internal_theory
-        max_marks = 100
-    
-    percentage = (total_marks / max_marks * 100) if max_marks > 0 else 0
-    grade, grade_point = get_ipu_grade(percentage)
-    
-    return {
-        'total_marks': total_marks,
-        'max_marks': max_marks,
-        'percentage': round(percentage, 2),
-        'grade': grade,
-        'grade_point': grade_point
-    }
+    subject = dict(subject, type=subject.get('type') or 'theory')
+    return grading.subject_result(subject, grading.IPU_10)
 
 def calculate_sgpa(subjects):
     """
     Calculates SGPA using IPU formula.
     SGPA = Σ(Grade Point × Credits) / Σ(Credits)
     """
-    total_credits = 0
-    weighted_sum = 0
-    
-    for subject in subjects:
-        credits = subject.get('credits', 0) or 0
-        grade_point = subject.get('grade_point', 0) or 0
-        weighted_sum += grade_point * credits
-        total_credits += credits
-    
+    total_credits, weighted_sum = grading.sgpa_totals(subjects)
     return round(weighted_sum / total_credits, 2) if total_credits > 0 else 0
 
 def calculate_cgpa(all_semester_results):
@@ -407,19 +354,8 @@ def calculate_cgpa(all_semester_results):
           Gni = grade point of ith course of nth semester
     This sums across ALL courses from ALL semesters.
     """
-    total_credits = 0
-    weighted_sum = 0
-    
-    for result in all_semester_results:
-        # Sum across each subject in this semester
-        subjects = result.get('subjects', [])
-        for subject in subjects:
-            credits = subject.get('credits', 0) or 0
-            grade_point = subject.get('grade_point', 0) or 0
-            weighted_sum += grade_point * credits
-            total_credits += credits
-    
-    return round(weighted_sum / total_credits, 2) if total_credits > 0 else 0
+    result = grading.cgpa([res.get('subjects', []) for res in all_semester_results])
+    return result['cgpa'] if result['total_credits'] > 0 else 0
 
 def calculate_bunk_guard(attended, total, required_percent=75):
     """Calculates bunk status and messages using a potentially custom threshold."""
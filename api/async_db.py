@@ -0,0 +1,143 @@
+# api/async_db.py
+# Motor on one long-lived event loop, for routes that fan out into independent queries
+
+import os
+import asyncio
+import threading
+from pymongo.errors import ConnectionFailure
+from api import query_stats
+from api.metrics import pool_listener
+from api.database import db, connection, DatabaseUnavailable, MONGO_MAX_POOL_SIZE
+
+# Flask's async views run every request on a fresh event loop, and a Motor
+# client belongs to the loop it was created on. Instead, one loop runs in a
+# background thread for the whole process; views stay synchronous and block
+# on run()/run_all() while their queries run concurrently on it.
+
+_lock = threading.Lock()
+_loop = None
+# AsyncIOMotorDatabase, or None: no MONGO_URI or no motor, so queries run
+# on the blocking client in the loop's executor (still concurrently)
+_async_db = None
+
+
+def _motor_database(loop):
+    mongo_uri = os.getenv('MONGO_URI')
+    if not mongo_uri:
+        return None
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+    except ImportError:
+        return None
+    client = AsyncIOMotorClient(
+        mongo_uri,
+        io_loop=loop,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        serverSelectionTimeoutMS=5000,
+        connectTimeoutMS=5000,
+        socketTimeoutMS=30000,
+        retryWrites=True,
+        event_listeners=[query_stats.listener, pool_listener]
+    )
+    return client.get_database('attendanceDB')
+
+
+def _get_loop():
+    global _loop, _async_db
+    if _loop is not None:
+        return _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='async-db', daemon=True).start()
+            _async_db = _motor_database(loop)
+            _loop = loop
+            print(f"✅ Async data layer: {'motor' if _async_db is not None else 'pymongo in threads'}")
+    return _loop
+
+
+def _reset_after_fork():
+    # The loop's thread didn't survive the fork; the child starts its own on first use
+    global _lock, _loop, _async_db
+    _lock = threading.Lock()
+    _loop = None
+    _async_db = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+async def _counted(coro, queries):
+    # Tasks on the shared loop don't inherit the caller's context; carry its
+    # query counter over (gather's tasks and Motor's executor copy it from here)
+    query_stats.bind(queries)
+    return await coro
+
+
+def run(coro, timeout=None):
+    """Run a coroutine on the shared loop and wait for its result. Not for use on the loop itself."""
+    return asyncio.run_coroutine_threadsafe(_counted(coro, query_stats.current()), _get_loop()).result(timeout)
+
+
+async def gather(return_exceptions=False, **aws):
+    """Await the keyword awaitables concurrently; {name: result}."""
+    results = await asyncio.gather(*aws.values(), return_exceptions=return_exceptions)
+    return dict(zip(aws.keys(), results))
+
+
+def run_all(return_exceptions=False, **aws):
+    """
+    Run independent queries concurrently and wait for all of them:
+    run_all(subjects=find(...), logs=find(...)) -> {'subjects': [...], 'logs': [...]}.
+    With return_exceptions a failed query's exception is its result.
+    """
+    return run(gather(return_exceptions=return_exceptions, **aws))
+
+
+async def in_thread(func, *args, **kwargs):
+    """Blocking code (sync helpers, scrapes) alongside the queries, in the loop's executor."""
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+async def _guarded(awaitable):
+    # Motor queries go through the same circuit breaker as the blocking client
+    connection.before_call()
+    try:
+        result = await awaitable
+    except DatabaseUnavailable:
+        raise
+    except ConnectionFailure as e:
+        connection.record_failure(e)
+        raise
+    except Exception:
+        # The server answered; only connection errors count against it
+        connection.record_success()
+        raise
+    connection.record_success()
+    return result
+
+
+async def find(collection, query, projection=None, sort=None, limit=0):
+    """All matching documents as a list."""
+    _get_loop()
+    if _async_db is None:
+        def blocking():
+            cursor = db.get_collection(collection).find(query, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            return list(cursor.limit(limit) if limit else cursor)
+        return await in_thread(blocking)
+
+    cursor = _async_db[collection].find(query, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    return await _guarded(cursor.to_list(length=None))
+
+
+async def find_one(collection, query, projection=None):
+    _get_loop()
+    if _async_db is None:
+        return await in_thread(db.get_collection(collection).find_one, query, projection)
+    return await _guarded(_async_db[collection].find_one(query, projection))
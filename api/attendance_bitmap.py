@@ -0,0 +1,290 @@
+# api/attendance_bitmap.py
+# Compact per-(owner, subject, semester) attendance: packed bits + parallel date index
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from bson import Binary
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+from api.database import db
+
+bitmaps_collection = db.get_collection('attendance_bitmaps')
+attendance_log_collection = db.get_collection('attendance_logs')
+
+COUNTED_STATUSES = ('present', 'absent', 'late', 'approved_medical')
+ATTENDED_STATUSES = ('present', 'late', 'approved_medical')
+
+# Optimistic-concurrency retries before the doc is marked stale and left for a rebuild
+WRITE_RETRIES = 3
+TREND_BUCKET = 10
+
+_indexes_ready = False
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    try:
+        bitmaps_collection.create_index(
+            [('owner_email', ASCENDING), ('subject_id', ASCENDING), ('semester', ASCENDING)],
+            unique=True
+        )
+        _indexes_ready = True
+    except Exception as e:
+        print(f"⚠️ Could not create attendance_bitmaps index: {e}")
+
+
+def _popcount(value):
+    return bin(value).count('1')
+
+
+def _to_int(data):
+    return int.from_bytes(bytes(data or b''), 'little')
+
+
+def _to_bytes(value, length):
+    return Binary(value.to_bytes((length + 7) // 8, 'little'))
+
+
+# --- Pure helpers on the decoded form ---
+# A decoded bitmap is {'dates': [...], 'log_ids': [...], 'counted': int, 'attended': int}
+# where bit i of `counted`/`attended` describes the i-th class in date order.
+
+def _decode(doc):
+    return {
+        'dates': list(doc.get('dates', [])),
+        'log_ids': list(doc.get('log_ids', [])),
+        'counted': _to_int(doc.get('counted')),
+        'attended': _to_int(doc.get('attended'))
+    }
+
+
+def _encode(state):
+    length = len(state['dates'])
+    counted, attended = state['counted'], state['attended']
+    return {
+        'dates': state['dates'],
+        'log_ids': state['log_ids'],
+        'counted': _to_bytes(counted, length),
+        'attended': _to_bytes(attended, length),
+        # Stored so a percentage read never has to touch the bits
+        'total': _popcount(counted),
+        'attended_count': _popcount(attended)
+    }
+
+
+def _bits_for(status):
+    return (1 if status in COUNTED_STATUSES else 0), (1 if status in ATTENDED_STATUSES else 0)
+
+
+def _insert_at(value, idx, bit):
+    """Insert `bit` at position idx, shifting higher bits up."""
+    low = value & ((1 << idx) - 1)
+    return low | (bit << idx) | ((value >> idx) << (idx + 1))
+
+
+def _remove_at(value, idx):
+    low = value & ((1 << idx) - 1)
+    return low | ((value >> (idx + 1)) << idx)
+
+
+def _set_at(value, idx, bit):
+    return (value | (1 << idx)) if bit else (value & ~(1 << idx))
+
+
+def _apply(state, op, log_id, date_str=None, status=None):
+    """
+    Apply one mark/edit/delete to a decoded bitmap in place.
+    Returns False when the change can't be applied (edit of an unknown log).
+    """
+    ids = state['log_ids']
+    existing = ids.index(log_id) if log_id in ids else None
+
+    if op == 'delete':
+        if existing is not None:
+            for key in ('counted', 'attended'):
+                state[key] = _remove_at(state[key], existing)
+            del state['dates'][existing]
+            del ids[existing]
+        return True
+    if existing is None and (op == 'edit' or not date_str):
+        return False
+
+    if existing is not None:
+        old_bits = ((state['counted'] >> existing) & 1, (state['attended'] >> existing) & 1)
+        old_date = state['dates'][existing]
+        if date_str is None or date_str == old_date:
+            counted, attended = _bits_for(status) if status is not None else old_bits
+            state['counted'] = _set_at(state['counted'], existing, counted)
+            state['attended'] = _set_at(state['attended'], existing, attended)
+            return True
+        # Date moved: re-insert at the new position
+        _apply(state, 'delete', log_id)
+        bits = _bits_for(status) if status is not None else old_bits
+    else:
+        bits = _bits_for(status)
+
+    # Classes on the same date keep insertion order
+    idx = bisect_right(state['dates'], date_str)
+    state['dates'].insert(idx, date_str)
+    ids.insert(idx, log_id)
+    state['counted'] = _insert_at(state['counted'], idx, bits[0])
+    state['attended'] = _insert_at(state['attended'], idx, bits[1])
+    return True
+
+
+def build_state(logs):
+    """Decoded bitmap from raw attendance logs."""
+    ordered = sorted(
+        (log for log in logs if isinstance(log.get('date'), str)),
+        key=lambda log: (log['date'], log.get('timestamp') or datetime.min, log['_id'])
+    )
+    counted = attended = 0
+    for i, log in enumerate(ordered):
+        c, a = _bits_for(log.get('status'))
+        counted |= c << i
+        attended |= a << i
+    return {
+        'dates': [log['date'] for log in ordered],
+        'log_ids': [log['_id'] for log in ordered],
+        'counted': counted,
+        'attended': attended
+    }
+
+
+# --- Store ---
+
+def _key(user_email, subject_id, semester):
+    return {'owner_email': user_email, 'subject_id': subject_id, 'semester': semester}
+
+
+def rebuild_bitmap(user_email, subject_id, semester):
+    """Recompute one bitmap from the raw logs (the audit trail stays authoritative)."""
+    _ensure_indexes()
+    logs = attendance_log_collection.find(
+        {'owner_email': user_email, 'subject_id': subject_id},
+        {'date': 1, 'status': 1, 'timestamp': 1}
+    )
+    state = build_state(list(logs))
+    doc = _encode(state)
+    doc.update(_key(user_email, subject_id, semester))
+    doc.update({'stale': False, 'updated_at': datetime.utcnow()})
+    # $inc (not $set) so a writer holding an older version always loses its check
+    try:
+        bitmaps_collection.update_one(_key(user_email, subject_id, semester),
+                                      {'$set': doc, '$inc': {'version': 1}}, upsert=True)
+    except DuplicateKeyError:
+        # Two first reads upserted at once; the other one's doc, built from the same logs, won
+        return bitmaps_collection.find_one(_key(user_email, subject_id, semester)) or doc
+    return doc
+
+
+def get_bitmap(user_email, subject_id, semester):
+    """Stored bitmap doc, (re)built from logs when missing or marked stale."""
+    doc = bitmaps_collection.find_one(_key(user_email, subject_id, semester))
+    if doc is None or doc.get('stale'):
+        doc = rebuild_bitmap(user_email, subject_id, semester)
+    return doc
+
+
+def record_change(user_email, subject_id, semester, op, log_id, date_str=None, status=None):
+    """
+    Keep the bitmap in step with a mark ('mark'), edit ('edit') or delete
+    ('delete') of one log. Uses a version check so concurrent writes to the
+    same subject can't interleave; after WRITE_RETRIES losses the doc is
+    flagged stale and the next read rebuilds it. Never raises: the log write
+    has already happened and the bitmap is derived data.
+    """
+    if subject_id is None:
+        return
+    try:
+        key = _key(user_email, subject_id, semester)
+        for _ in range(WRITE_RETRIES):
+            doc = bitmaps_collection.find_one(key)
+            if doc is None:
+                # Built from logs, which already include this change
+                rebuild_bitmap(user_email, subject_id, semester)
+                return
+            if doc.get('stale'):
+                return
+            state = _decode(doc)
+            if not _apply(state, op, log_id, date_str, status):
+                rebuild_bitmap(user_email, subject_id, semester)
+                return
+            update = _encode(state)
+            update['updated_at'] = datetime.utcnow()
+            result = bitmaps_collection.update_one(
+                {'_id': doc['_id'], 'version': doc.get('version', 0)},
+                {'$set': update, '$inc': {'version': 1}}
+            )
+            if result.modified_count:
+                return
+        bitmaps_collection.update_one(key, {'$set': {'stale': True}})
+    except Exception as e:
+        print(f"⚠️ Attendance bitmap update failed for {user_email}/{subject_id}: {e}")
+
+
+def drop_user_bitmaps(user_email, subject_id=None):
+    """Forget bitmaps after bulk changes to logs; they rebuild lazily on read."""
+    query = {'owner_email': user_email}
+    if subject_id is not None:
+        query['subject_id'] = subject_id
+    bitmaps_collection.delete_many(query)
+
+
+# --- Queries ---
+
+def percentage(doc):
+    """O(1): uses the stored popcounts."""
+    total = doc.get('total', 0)
+    return round(doc.get('attended_count', 0) / total * 100, 2) if total else 0.0
+
+
+def window_stats(doc, start=None, end=None, last=None):
+    """
+    Attended/total over a slice of classes: by date (inclusive 'YYYY-MM-DD'
+    bounds, via bisect on the date index) or the last `last` classes.
+    """
+    dates = doc.get('dates', [])
+    lo, hi = 0, len(dates)
+    if start:
+        lo = bisect_left(dates, start)
+    if end:
+        hi = bisect_right(dates, end)
+    if last is not None:
+        lo = max(lo, hi - last)
+    if hi <= lo:
+        return {'attended': 0, 'total': 0, 'percentage': 0.0, 'from': None, 'to': None}
+    mask = (1 << (hi - lo)) - 1
+    total = _popcount((_to_int(doc.get('counted')) >> lo) & mask)
+    attended = _popcount((_to_int(doc.get('attended')) >> lo) & mask)
+    return {
+        'attended': attended,
+        'total': total,
+        'percentage': round(attended / total * 100, 2) if total else 0.0,
+        'from': dates[lo],
+        'to': dates[hi - 1]
+    }
+
+
+def trend(doc, bucket=TREND_BUCKET):
+    """Percentage per consecutive block of `bucket` classes, oldest first."""
+    counted = _to_int(doc.get('counted'))
+    attended = _to_int(doc.get('attended'))
+    dates = doc.get('dates', [])
+    mask = (1 << bucket) - 1
+    points = []
+    for lo in range(0, len(dates), bucket):
+        total = _popcount((counted >> lo) & mask)
+        if not total:
+            continue
+        hits = _popcount((attended >> lo) & mask)
+        points.append({
+            'from': dates[lo],
+            'to': dates[min(lo + bucket, len(dates)) - 1],
+            'attended': hits,
+            'total': total,
+            'percentage': round(hits / total * 100, 2)
+        })
+    return points
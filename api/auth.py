@@ -1,7 +1,5 @@
 import os
-import requests
 from flask import Blueprint, redirect, url_for, session, request, jsonify
-from authlib.integrations.flask_client import OAuth
 from urllib.parse import urlencode, quote_plus
 from bson import ObjectId
 import jwt
@@ -17,8 +15,22 @@ def login():
     """Shell login route to satisfy url_for('auth.login') and prevent BuildErrors"""
     return redirect('/')
 
-# This will be initialized in our main __init__.py
-oauth = OAuth()
+_oauth = None
+
+
+def __getattr__(name):
+    # `from api.auth import oauth` still works; authlib is only imported when it's used
+    global _oauth
+    if name == 'oauth':
+        if _oauth is None:
+            from authlib.integrations.flask_client import OAuth
+            _oauth = OAuth()
+        return _oauth
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def is_admin(user_email):
+    user = db.get_collection('users').find_one({"email": user_email}, {"role": 1})
+    return bool(user) and user.get('role') == 'admin'
 
 def admin_required(f):
     @wraps(f)
@@ -27,9 +39,8 @@ def admin_required(f):
             return jsonify({"error": "Unauthorized"}), 401
         
         user_email = session['user'].get('email')
-        user = db.get_collection('users').find_one({"email": user_email})
         
-        if not user or user.get('role') != 'admin':
+        if not is_admin(user_email):
             return jsonify({"error": "Forbidden: Admin access required"}), 403
             
         return f(*args, **kwargs)
@@ -45,6 +56,7 @@ def login_required(f):
 
 @auth_bp.route('/google', methods=['POST'])
 def google_auth():
+    import requests
     data = request.json
     code = data.get('code')
     
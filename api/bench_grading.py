@@ -0,0 +1,170 @@
+"""
+Micro-benchmarks for api/grading.py against the if/elif implementations it
+replaced (kept here, verbatim in behaviour, as the baseline).
+
+    python api/bench_grading.py [--number 20000] [--repeat 5]
+
+Each case also checks that the engine returns the same grades/points as the
+baseline for the IPU and 4.0 scales before timing anything.
+"""
+import os
+import sys
+import random
+import argparse
+import timeit
+
+# Allow running as `python api/bench_grading.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import grading
+
+
+# --- Baselines (pre-consolidation code paths) ---
+
+def legacy_ipu_grade(percentage):
+    if percentage >= 90:
+        return 'O', 10
+    elif percentage >= 75:
+        return 'A+', 9
+    elif percentage >= 65:
+        return 'A', 8
+    elif percentage >= 55:
+        return 'B+', 7
+    elif percentage >= 50:
+        return 'B', 6
+    elif percentage >= 45:
+        return 'C', 5
+    elif percentage >= 40:
+        return 'P', 4
+    else:
+        return 'F', 0
+
+
+def legacy_four_point_grade(percentage):
+    if percentage >= 90:
+        return 'O'
+    elif percentage >= 87:
+        return 'A+'
+    elif percentage >= 83:
+        return 'A'
+    elif percentage >= 80:
+        return 'B+'
+    elif percentage >= 77:
+        return 'B'
+    elif percentage >= 73:
+        return 'C+'
+    elif percentage >= 70:
+        return 'C'
+    elif percentage >= 60:
+        return 'D'
+    else:
+        return 'F'
+
+
+def legacy_subject_result(subject):
+    s_type = subject.get('type', 'theory')
+    internal_theory = int(subject.get('internal_theory') or 0) if subject.get('internal_theory') else 0
+    external_theory = int(subject.get('external_theory') or 0) if subject.get('external_theory') else 0
+    internal_practical = int(subject.get('internal_practical') or 0) if subject.get('internal_practical') else 0
+    external_practical = int(subject.get('external_practical') or 0) if subject.get('external_practical') else 0
+
+    total_marks = 0
+    max_marks = 0
+    if s_type == 'theory':
+        total_marks = internal_theory + external_theory
+        max_marks = 100
+    elif s_type == 'practical':
+        total_marks = internal_practical + external_practical
+        max_marks = 100
+    elif s_type == 'nues':
+        total_marks = internal_theory
+        max_marks = 100
+
+    percentage = (total_marks / max_marks * 100) if max_marks > 0 else 0
+    grade, grade_point = legacy_ipu_grade(percentage)
+    return {
+        'total_marks': total_marks,
+        'max_marks': max_marks,
+        'percentage': round(percentage, 2),
+        'grade': grade,
+        'grade_point': grade_point
+    }
+
+
+def legacy_grade_semester(subjects):
+    processed = []
+    for sub in subjects:
+        final_sub = sub.copy()
+        final_sub.update(legacy_subject_result(sub))
+        final_sub.update({'name': sub.get('name'), 'code': sub.get('code', ''), 'credits': int(sub.get('credits', 0))})
+        processed.append(final_sub)
+    total_credits = 0
+    weighted = 0
+    for sub in processed:
+        total_credits += sub['credits']
+        weighted += sub['grade_point'] * sub['credits']
+    return round(weighted / total_credits, 2) if total_credits else 0
+
+
+# --- Fixtures ---
+
+def make_semester(rng, size=8):
+    subjects = []
+    for i in range(size):
+        s_type = rng.choice(['theory', 'theory', 'practical', 'nues'])
+        subjects.append({
+            'name': f'Subject {i}',
+            'code': f'SUB{i:03d}',
+            'credits': rng.choice([1, 2, 3, 4]),
+            'type': s_type,
+            'internal_theory': rng.randint(0, 40),
+            'external_theory': rng.randint(0, 60),
+            'internal_practical': rng.randint(0, 40),
+            'external_practical': rng.randint(0, 60),
+        })
+    return subjects
+
+
+def check_parity(percentages, semesters):
+    for p in percentages:
+        assert grading.IPU_10.lookup(p) == legacy_ipu_grade(p), p
+        assert grading.GPA_4.grade(p) == legacy_four_point_grade(p), p
+    for semester in semesters:
+        for sub in semester:
+            new, old = grading.subject_result(sub), legacy_subject_result(sub)
+            assert (new['grade'], new['grade_point'], new['percentage']) == \
+                   (old['grade'], old['grade_point'], old['percentage']), sub
+        assert grading.grade_semester(semester)['sgpa'] == legacy_grade_semester(semester)
+
+
+def run(number, repeat):
+    rng = random.Random(42)
+    percentages = [rng.uniform(0, 100) for _ in range(1000)]
+    semesters = [make_semester(rng) for _ in range(50)]
+    check_parity(percentages, semesters)
+
+    cases = [
+        ('ipu grade lookup x1000',
+         lambda: [legacy_ipu_grade(p) for p in percentages],
+         lambda: grading.grade_batch(percentages, grading.IPU_10)),
+        ('4.0 grade lookup x1000',
+         lambda: [legacy_four_point_grade(p) for p in percentages],
+         lambda: grading.grade_batch(percentages, grading.GPA_4)),
+        ('grade semester (8 subjects) x50',
+         lambda: [legacy_grade_semester(s) for s in semesters],
+         lambda: [grading.grade_semester(s) for s in semesters]),
+    ]
+
+    print(f"{'case':<34}{'baseline ms':>14}{'engine ms':>12}{'speedup':>10}")
+    for name, baseline, engine in cases:
+        base = min(timeit.repeat(baseline, number=number, repeat=repeat)) / number * 1000
+        new = min(timeit.repeat(engine, number=number, repeat=repeat)) / number * 1000
+        print(f"{name:<34}{base:>14.4f}{new:>12.4f}{base / new:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the grading engine against the legacy functions.")
+    parser.add_argument('--number', type=int, default=200, help="Calls per timing run")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing runs (best is reported)")
+    args = parser.parse_args()
+    run(args.number, args.repeat)
@@ -0,0 +1,102 @@
+"""
+Cold-start benchmark: time from a fresh interpreter to the first response,
+with LAZY_STARTUP on and off (see api/startup.py).
+
+    python api/bench_startup.py [--runs 5] [--path /api/current_user] [--importtime 15]
+
+Every run is a new process, so nothing is shared between runs. Each one
+imports the api package, calls create_app() and sends one request through
+the test client; the request goes through the full before_request chain,
+so with a real MONGO_URI it includes connecting to Mongo.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import io, json, time, contextlib
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import api
+    imported = time.perf_counter()
+    app = api.create_app()
+    created = time.perf_counter()
+    status = app.test_client().get({path!r}).status_code
+    responded = time.perf_counter()
+from api.startup import startup_report
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_response_ms': (responded - started) * 1000,
+    'status': status,
+    'report': startup_report()
+}}))
+"""
+
+
+def run_once(lazy, path):
+    env = dict(os.environ, LAZY_STARTUP='1' if lazy else '0')
+    out = subprocess.run(
+        [sys.executable, '-c', CHILD.format(path=path)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def slowest_imports(lazy, top):
+    """(cumulative ms, module) of the slowest top-level imports under -X importtime."""
+    env = dict(os.environ, LAZY_STARTUP='1' if lazy else '0')
+    err = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import api; api.create_app()'],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit() and name.startswith(' ') and not name.startswith('   '):
+            # Direct imports of the top-level script and of api/* modules
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def run(runs, path, importtime):
+    print(f"{'mode':<8}{'import ms':>12}{'create_app ms':>16}{'first response ms':>20}{'status':>8}")
+    reports = {}
+    for lazy in (False, True):
+        results = [run_once(lazy, path) for _ in range(runs)]
+        mode = 'lazy' if lazy else 'eager'
+        reports[mode] = results[-1]['report']
+        print(f"{mode:<8}"
+              f"{statistics.median(r['import_ms'] for r in results):>12.1f}"
+              f"{statistics.median(r['create_app_ms'] for r in results):>16.1f}"
+              f"{statistics.median(r['first_response_ms'] for r in results):>20.1f}"
+              f"{results[-1]['status']:>8}")
+
+    for mode, report in reports.items():
+        print(f"\n{mode} phases (ms, last run):")
+        for name, ms in report['phases_ms'].items():
+            print(f"  {name:<28}{ms:>8.1f}")
+        print(f"  heavy modules loaded: {', '.join(report['heavy_loaded']) or 'none'}")
+
+    if importtime:
+        for lazy in (False, True):
+            print(f"\nslowest imports ({'lazy' if lazy else 'eager'}):")
+            for ms, name in slowest_imports(lazy, importtime):
+                print(f"  {name:<40}{ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cold start with and without LAZY_STARTUP.")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes per mode (median is reported)")
+    parser.add_argument('--path', default='/api/current_user', help="Path of the first request")
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help="Also list the N slowest imports per mode (python -X importtime)")
+    args = parser.parse_args()
+    run(args.runs, args.path, args.importtime)
@@ -0,0 +1,138 @@
+"""
+Load-test the production worker modes (gunicorn.conf.py) against the dev
+server (`python run.py`: Werkzeug through socketio.run, one process).
+
+    python api/bench_workers.py [--modes dev,sync,gthread,gevent] [--path /api/v1/dashboard/bundle]
+                                [--concurrency 32] [--duration 15] [--token JWT]
+
+Each mode is started on a free local port with the environment of this
+shell (MONGO_URI etc.), warmed up, then hit by `concurrency` keep-alive
+clients for `duration` seconds. Modes whose worker class isn't installed
+are skipped. Pass --token (see /api/auth/dev_login) to load authenticated
+endpoints; without it most /api paths answer 401 after the before_request
+chain, which still exercises Mongo (honeypot, activity log).
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEV_SERVER = """
+import sys
+from api import create_app, socketio
+app = create_app()
+socketio.run(app, host='127.0.0.1', port=int(sys.argv[1]), allow_unsafe_werkzeug=True, log_output=False)
+"""
+
+WORKER_MODULES = {'gevent': 'gevent', 'eventlet': 'gunicorn.workers.geventlet'}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start(mode, port):
+    env = dict(os.environ, WORKER_MODE=mode)
+    if mode == 'dev':
+        cmd = [sys.executable, '-c', DEV_SERVER, str(port)]
+    else:
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'index:app',
+               '--bind', f'127.0.0.1:{port}', '--access-logfile', os.devnull]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(proc, port, path, headers, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and proc.poll() is None:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('GET', path, headers=headers)
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def load(port, path, headers, concurrency, duration):
+    """(latencies in ms, status counts, error count) from `concurrency` keep-alive clients."""
+    latencies, statuses, errors = [], {}, [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine, codes, failed = [], {}, 0
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                mine.append((time.perf_counter() - start) * 1000)
+                codes[response.status] = codes.get(response.status, 0) + 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        with lock:
+            latencies.extend(mine)
+            for code, count in codes.items():
+                statuses[code] = statuses.get(code, 0) + count
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, statuses, errors[0]
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def run(modes, path, concurrency, duration, token):
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    print(f"{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}  statuses")
+    for mode in modes:
+        module = WORKER_MODULES.get(mode)
+        if module and importlib.util.find_spec(module) is None:
+            print(f"{mode:<10}  skipped ({module} not installed)")
+            continue
+        port = free_port()
+        proc = start(mode, port)
+        try:
+            if not wait_ready(proc, port, path, headers):
+                print(f"{mode:<10}  did not start")
+                continue
+            load(port, path, headers, min(concurrency, 4), 2)  # warm up every worker
+            latencies, statuses, errors = load(port, path, headers, concurrency, duration)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+        ordered = sorted(latencies)
+        codes = ' '.join(f"{code}x{count}" for code, count in sorted(statuses.items()))
+        print(f"{mode:<10}{len(ordered) / duration:>10.1f}{percentile(ordered, 50):>10.1f}"
+              f"{percentile(ordered, 95):>10.1f}{percentile(ordered, 99):>10.1f}{errors:>8}  {codes}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the dev server with the gunicorn worker modes under load.")
+    parser.add_argument('--modes', default='dev,sync,gthread,gevent', help="Comma-separated: dev, sync, gthread, gevent, eventlet")
+    parser.add_argument('--path', default='/api/current_user', help="Path every client requests")
+    parser.add_argument('--concurrency', type=int, default=32, help="Simultaneous keep-alive clients")
+    parser.add_argument('--duration', type=float, default=15, help="Seconds of load per mode")
+    parser.add_argument('--token', help="JWT sent as a Bearer token")
+    args = parser.parse_args()
+    run([m.strip() for m in args.modes.split(',') if m.strip()], args.path, args.concurrency, args.duration, args.token)
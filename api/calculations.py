@@ -1,6 +1,8 @@
 # Calculation Engine for AcadHub
 # All business logic for academic metrics
 
+from api.grading import GPA_4
+
 class AttendanceCalculator:
     """Calculate attendance percentages and predictions"""
     
@@ -66,17 +68,7 @@ class AttendanceCalculator:
 class GradeCalculator:
     """Calculate SGPA, CGPA, and grade points"""
     
-    GRADE_POINTS = {
-        'O': 4.0,   # Outstanding
-        'A+': 3.7,  # Excellent
-        'A': 3.3,   # Very Good
-        'B+': 3.0,  # Good
-        'B': 2.7,   # Above Average
-        'C+': 2.3,  # Average
-        'C': 2.0,   # Satisfactory
-        'D': 1.0,   # Pass
-        'F': 0.0,   # Fail
-    }
+    GRADE_POINTS = dict(GPA_4.point_for_grade)
     
     @staticmethod
     def calculate_sgpa(semester_courses: list) -> dict:
@@ -100,7 +92,7 @@ class GradeCalculator:
             grade = course.get('grade', 'F')
             credits = course.get('credits', 0)
             
-            grade_point = GradeCalculator.GRADE_POINTS.get(grade, 0.0)
+            grade_point = GPA_4.points_for(grade)
             total_grade_points += grade_point * credits
             total_credits += credits
         
@@ -132,7 +124,7 @@ class GradeCalculator:
                 grade = course.get('grade', 'F')
                 credits = course.get('credits', 0)
                 
-                grade_point = GradeCalculator.GRADE_POINTS.get(grade, 0.0)
+                grade_point = GPA_4.points_for(grade)
                 total_grade_points += grade_point * credits
                 total_credits += credits
         
@@ -147,24 +139,7 @@ class GradeCalculator:
     @staticmethod
     def grade_from_percentage(percentage: float) -> str:
         """Convert percentage to letter grade"""
-        if percentage >= 90:
-            return 'O'
-        elif percentage >= 87:
-            return 'A+'
-        elif percentage >= 83:
-            return 'A'
-        elif percentage >= 80:
-            return 'B+'
-        elif percentage >= 77:
-            return 'B'
-        elif percentage >= 73:
-            return 'C+'
-        elif percentage >= 70:
-            return 'C'
-        elif percentage >= 60:
-            return 'D'
-        else:
-            return 'F'
+        return GPA_4.grade(percentage)
     
     @staticmethod
     def predict_grade_performance(current_marks: list, total_possible: float) -> dict:
@@ -1,9 +1,28 @@
 # COMPLETE CALCULATION ENGINE - All Academic Metrics
 
-from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import math
+from typing import List, Dict, Tuple, Sequence
 import statistics
 
+from api.grading import IPU_10, GPA_4, SCHEMES, subject_result, course_points
+
+_np = False
+
+
+def _numpy():
+    """numpy, imported on first use (it is most of this module's import time), or None if missing."""
+    global _np
+    if _np is False:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:  # Batch API falls back to the scalar path
+            _np = None
+    return _np
+
 class AttendanceCalculator:
     """Advanced attendance tracking and predictions"""
     
@@ -11,6 +30,9 @@ class AttendanceCalculator:
     RISK_THRESHOLD_SAFE = 75.0
     RISK_THRESHOLD_WARNING = 60.0
     RISK_THRESHOLD_CRITICAL = 50.0
+    # Index order matches get_risk_level's branches (used by calculate_batch)
+    _RISK_LABELS = ("Safe", "Warning", "Critical", "Danger")
+    _RISK_COLORS = ("green", "orange", "red", "darkred")
     
     @staticmethod
     def calculate_percentage(attended: int, total: int) -> float:
@@ -34,7 +56,7 @@ class AttendanceCalculator:
                 "percentage": pct,
                 "can_bunk": True,
                 "count": can_bunk,
-                "status_message": f"You can bunk {can_bunk} more classes." if can_bunk > 0 else "On the edge! Don't bunk."
+                "status_message": AttendanceCalculator.bunk_status_message(True, can_bunk, target)
             }
         else:
             # Must attend
@@ -50,7 +72,7 @@ class AttendanceCalculator:
                 "percentage": pct,
                 "can_bunk": False,
                 "count": must_attend,
-                "status_message": f"Attend next {must_attend} classes to reach {target}%."
+                "status_message": AttendanceCalculator.bunk_status_message(False, must_attend, target)
             }
 
     @staticmethod
@@ -65,6 +87,93 @@ class AttendanceCalculator:
         else:
             return "Danger", "darkred"
     
+    @staticmethod
+    def calculate_batch(attended: Sequence[int], total: Sequence[int], target=75) -> Dict:
+        """
+        Vectorized calculate_percentage + calculate_bunk_guard + get_risk_level
+        over many subjects at once. `target` may be a scalar or a sequence.
+
+        Returns parallel arrays (NumPy when available, lists otherwise):
+            percentage, can_bunk, count, bunk_count, must_attend, risk_level, color
+        Every value equals what the scalar methods return for the same row.
+        """
+        np = _numpy()
+        if np is None:
+            return AttendanceCalculator._calculate_batch_scalar(attended, total, target)
+
+        attended = np.asarray(attended, dtype=np.int64)
+        total = np.asarray(total, dtype=np.int64)
+        target = np.broadcast_to(np.asarray(target, dtype=np.float64), attended.shape)
+        if attended.shape != total.shape:
+            raise ValueError("attended and total must have the same length")
+
+        safe_total = np.where(total == 0, 1, total)
+        percentage = np.where(total == 0, 0.0, np.round(attended / safe_total * 100, 2))
+        can_bunk = percentage >= target
+
+        # Mirrors int((attended * 100 - target * total) / target): truncation toward zero
+        if np.any(can_bunk & (target == 0)):
+            raise ZeroDivisionError("a target of 0% has no bunk count")
+        bunk_num = attended * 100 - target * total
+        bunk_count = np.where(can_bunk, np.trunc(bunk_num / np.where(target == 0, 1, target)), 0).astype(np.int64)
+
+        # Mirrors the scalar ceil: trunc(num / denom) + (num % denom != 0)
+        must_num = target * total - 100 * attended
+        must_den = 100 - target
+        if np.any(~can_bunk & (must_den == 0)):
+            raise ZeroDivisionError("target of 100% cannot be reached once a class is missed")
+        safe_den = np.where(must_den == 0, 1, must_den)
+        must_attend = np.trunc(must_num / safe_den) + (np.mod(must_num, safe_den) != 0)
+        must_attend = np.where(can_bunk, 0, must_attend).astype(np.int64)
+
+        risk_idx = np.select(
+            [
+                percentage >= AttendanceCalculator.RISK_THRESHOLD_SAFE,
+                percentage >= AttendanceCalculator.RISK_THRESHOLD_WARNING,
+                percentage >= AttendanceCalculator.RISK_THRESHOLD_CRITICAL
+            ],
+            [0, 1, 2],
+            default=3
+        )
+
+        return {
+            'percentage': percentage,
+            'can_bunk': can_bunk,
+            'count': np.where(can_bunk, bunk_count, must_attend),
+            'bunk_count': bunk_count,
+            'must_attend': must_attend,
+            'risk_level': np.array(AttendanceCalculator._RISK_LABELS)[risk_idx],
+            'color': np.array(AttendanceCalculator._RISK_COLORS)[risk_idx]
+        }
+
+    @staticmethod
+    def _calculate_batch_scalar(attended, total, target) -> Dict:
+        """Pure-Python fallback for calculate_batch with the same output shape."""
+        attended, total = list(attended), list(total)
+        if len(attended) != len(total):
+            raise ValueError("attended and total must have the same length")
+        targets = list(target) if isinstance(target, (list, tuple)) else [target] * len(attended)
+
+        out = {k: [] for k in ('percentage', 'can_bunk', 'count', 'bunk_count', 'must_attend', 'risk_level', 'color')}
+        for a, t, tgt in zip(attended, total, targets):
+            guard = AttendanceCalculator.calculate_bunk_guard(a, t, tgt)
+            risk, color = AttendanceCalculator.get_risk_level(guard['percentage'])
+            out['percentage'].append(guard['percentage'])
+            out['can_bunk'].append(guard['can_bunk'])
+            out['count'].append(guard['count'])
+            out['bunk_count'].append(guard['count'] if guard['can_bunk'] else 0)
+            out['must_attend'].append(0 if guard['can_bunk'] else guard['count'])
+            out['risk_level'].append(risk)
+            out['color'].append(color)
+        return out
+
+    @staticmethod
+    def bunk_status_message(can_bunk: bool, count: int, target=75) -> str:
+        """Same wording calculate_bunk_guard uses, for rows produced by calculate_batch."""
+        if can_bunk:
+            return f"You can bunk {count} more classes." if count > 0 else "On the edge! Don't bunk."
+        return f"Attend next {count} classes to reach {target}%."
+
     @staticmethod
     def calculate_days_needed(attended: int, total: int, target: float) -> int:
         """
@@ -116,80 +225,25 @@ class AttendanceCalculator:
 class GradeCalculator:
     """Complete grade and GPA calculation system"""
     
-    # Grade point scale (4.0 system)
-    GRADE_SCALE = {
-        'O': 4.0,    # Outstanding (90-100)
-        'A+': 3.7,   # Excellent (87-89)
-        'A': 3.3,    # Very Good (83-86)
-        'B+': 3.0,   # Good (80-82)
-        'B': 2.7,    # Above Average (77-79)
-        'C+': 2.3,   # Average (73-76)
-        'C': 2.0,    # Satisfactory (70-72)
-        'D': 1.0,    # Pass (60-69)
-        'F': 0.0     # Fail (<60)
-    }
-    
-    # Percentage ranges for grades
-    PERCENTAGE_TO_GRADE = [
-        (90, 'O'),
-        (87, 'A+'),
-        (83, 'A'),
-        (80, 'B+'),
-        (77, 'B'),
-        (73, 'C+'),
-        (70, 'C'),
-        (60, 'D'),
-        (0, 'F')
-    ]
-    
-    # IPU Grade Points (10-point scale)
-    IPU_GRADE_SCALE = {
-        'O': 10, 'A+': 9, 'A': 8, 'B+': 7, 'B': 6, 'C+': 5, 'C': 4, 'F': 0
-    }
+    # Tables live in api/grading.py; these views keep existing callers working
+    GRADE_SCALE = dict(GPA_4.point_for_grade)
+    PERCENTAGE_TO_GRADE = sorted(zip(GPA_4.cutoffs, GPA_4.grades), reverse=True)
+    IPU_GRADE_SCALE = dict(IPU_10.point_for_grade)
 
     @staticmethod
     def calculate_subject_result(subject: Dict) -> Dict:
-        """IPU Calculation Logic for a single subject."""
-        internal_t = float(subject.get('internal_theory', 0) or 0)
-        external_t = float(subject.get('external_theory', 0) or 0)
-        internal_p = float(subject.get('internal_practical', 0) or 0)
-        external_p = float(subject.get('external_practical', 0) or 0)
-        
-        total = internal_t + external_t + internal_p + external_p
-        # Most IPU subjects are out of 100
-        max_marks = 100 
-        percentage = (total / max_marks) * 100
-        
-        # IPU Grading Scheme (approximate simplified)
-        grade = 'F'
-        if percentage >= 90: grade = 'O'
-        elif percentage >= 75: grade = 'A+'
-        elif percentage >= 65: grade = 'A'
-        elif percentage >= 55: grade = 'B+'
-        elif percentage >= 50: grade = 'B'
-        elif percentage >= 45: grade = 'C+'
-        elif percentage >= 40: grade = 'C'
-        
-        return {
-            'total_marks': round(total, 2),
-            'max_marks': max_marks,
-            'percentage': round(percentage, 2),
-            'grade': grade,
-            'grade_point': GradeCalculator.IPU_GRADE_SCALE.get(grade, 0)
-        }
+        """IPU result for a single subject (see grading.subject_result)."""
+        return subject_result(subject, IPU_10)
 
     @staticmethod
     def percentage_to_grade(percentage: float) -> str:
         """Convert percentage to grade"""
-        for min_pct, grade in GradeCalculator.PERCENTAGE_TO_GRADE:
-            if percentage >= min_pct:
-                return grade
-        return 'F'
+        return GPA_4.grade(percentage)
     
     @staticmethod
     def grade_to_points(grade: str) -> float:
         """Get grade points for a grade"""
-        return GradeCalculator.GRADE_SCALE.get(grade, 0.0)
+        return GPA_4.points_for(grade)
     
     @staticmethod
     def calculate_sgpa(courses: List[Dict]) -> Dict:
@@ -230,7 +284,7 @@ class GradeCalculator:
             credits = course.get('credits', 0)
             name = course.get('name', 'Unknown')
             
-            grade_points = GradeCalculator.IPU_GRADE_SCALE.get(grade, 0)
+            grade_points = course_points(course, IPU_10)
             course_grade_points = grade_points * credits
             
             total_grade_points += course_grade_points
@@ -352,3 +406,358 @@ class GradeCalculator:
         cgpas = [t['cgpa'] for t in trend_data]
         improvement = cgpas[-1] - cgpas[0]
         return round(improvement, 2)
+
+
+class CGPAPlanner:
+    """
+    What it takes to reach a target CGPA over the remaining semesters.
+
+    For a semester's course credits, a dynamic programme over credit-weighted
+    grade points finds every reachable points total and, for each, the most
+    even grade combination (lowest top grade, then fewest credits at it). Tables depend only on the
+    credit profile, so they are memoized and shared across users.
+    """
+
+    # Failing a course is never part of a plan
+    MIN_PLAN_GRADE_POINT = 4
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _profile_table(credits: Tuple[int, ...], scheme_name: str = 'ipu_10'):
+        """
+        Reachable totals for a credit profile (sorted, descending).
+        Returns (sorted_totals, stages) where stages[k][total] describes the
+        most even way to reach `total` with the first k+1 courses.
+        """
+        scheme = SCHEMES[scheme_name]
+        # The scheme's own rows: legacy letters (points_for only) are never planned
+        options = sorted((point, grade) for grade, point in zip(scheme.grades, scheme.points)
+                         if point >= CGPAPlanner.MIN_PLAN_GRADE_POINT)
+        # State per total: (top grade point, credits earned at that top grade, previous total, grade)
+        frontier = {0: (0, 0, None, None)}
+        stages = []
+        for credit in credits:
+            nxt = {}
+            for total, (top, top_credits, _, _) in frontier.items():
+                for point, grade in options:
+                    key = total + credit * point
+                    if point > top:
+                        candidate = (point, credit, total, grade)
+                    elif point == top:
+                        candidate = (top, top_credits + credit, total, grade)
+                    else:
+                        candidate = (top, top_credits, total, grade)
+                    if key not in nxt or candidate[:2] < nxt[key][:2]:
+                        nxt[key] = candidate
+            stages.append(nxt)
+            frontier = nxt
+        return sorted(frontier), tuple(stages)
+
+    @staticmethod
+    def plan_semester(courses: List[Dict], required_points: float, scheme_name: str = 'ipu_10') -> Dict:
+        """
+        Cheapest grade combination whose credit-weighted points reach
+        `required_points`. Courses need 'credits' and optionally 'name'.
+        """
+        indexed = sorted(enumerate(courses), key=lambda item: -int(item[1].get('credits', 0) or 0))
+        profile = tuple(int(c.get('credits', 0) or 0) for _, c in indexed)
+        total_credits = sum(profile)
+        if total_credits == 0:
+            return {'reachable': True, 'points': 0, 'sgpa': 0.0, 'courses': []}
+
+        totals, stages = CGPAPlanner._profile_table(profile, scheme_name)
+        i = bisect_left(totals, required_points - 1e-9)
+        if i == len(totals):
+            return {'reachable': False, 'points': totals[-1], 'sgpa': round(totals[-1] / total_credits, 2), 'courses': []}
+
+        chosen = totals[i]
+        grades = [None] * len(profile)
+        total = chosen
+        for k in range(len(profile) - 1, -1, -1):
+            _, _, previous, grade = stages[k][total]
+            grades[k] = grade
+            total = previous
+
+        scheme = SCHEMES[scheme_name]
+        planned = [None] * len(courses)
+        for (original_idx, course), grade in zip(indexed, grades):
+            planned[original_idx] = {
+                'name': course.get('name'),
+                'credits': int(course.get('credits', 0) or 0),
+                'grade': grade,
+                'grade_point': scheme.points_for(grade)
+            }
+        return {'reachable': True, 'points': chosen, 'sgpa': round(chosen / total_credits, 2), 'courses': planned}
+
+    @staticmethod
+    def plan(done_credits: float, done_points: float, remaining: List[Dict], target_cgpa: float,
+             scheme_name: str = 'ipu_10') -> Dict:
+        """
+        remaining: [{'semester': 5, 'courses': [{'name', 'credits'}, ...]}
+                    or {'semester': 6, 'total_credits': 24}, ...]
+        """
+        scheme = SCHEMES[scheme_name]
+        sem_credits = []
+        for sem in remaining:
+            courses = sem.get('courses')
+            if courses:
+                sem_credits.append(sum(int(c.get('credits', 0) or 0) for c in courses))
+            else:
+                sem_credits.append(int(sem.get('total_credits', 0) or 0))
+        remaining_credits = sum(sem_credits)
+        all_credits = done_credits + remaining_credits
+
+        result = {
+            'target_cgpa': target_cgpa,
+            'current_cgpa': round(done_points / done_credits, 2) if done_credits else 0.0,
+            'completed_credits': done_credits,
+            'remaining_credits': remaining_credits,
+            'max_possible_cgpa': round((done_points + scheme.max_point * remaining_credits) / all_credits, 2) if all_credits else 0.0,
+            'semesters': []
+        }
+        if remaining_credits == 0:
+            met = bool(done_credits) and done_points / done_credits >= target_cgpa
+            result.update({'status': 'met' if met else 'unreachable', 'required_sgpa': None})
+            return result
+
+        required_sgpa = (target_cgpa * all_credits - done_points) / remaining_credits
+        # Rounded up so following it exactly never lands just short
+        result['required_sgpa'] = max(0.0, math.ceil(required_sgpa * 100 - 1e-6) / 100)
+        if required_sgpa > scheme.max_point:
+            result['status'] = 'unreachable'
+            return result
+        result['status'] = 'met' if required_sgpa <= CGPAPlanner.MIN_PLAN_GRADE_POINT else 'reachable'
+
+        for sem, credits in zip(remaining, sem_credits):
+            entry = {'semester': sem.get('semester'), 'credits': credits,
+                     'required_sgpa': result['required_sgpa']}
+            courses = sem.get('courses')
+            if courses:
+                # Per-semester ceilings add up to at least the overall requirement
+                need = math.ceil(required_sgpa * credits - 1e-9)
+                planned = CGPAPlanner.plan_semester(courses, need, scheme_name)
+                entry.update({'planned_sgpa': planned['sgpa'], 'courses': planned['courses']})
+            result['semesters'].append(entry)
+        return result
+
+
+class AttendanceProjector:
+    """
+    Forward projection of attendance over the rest of the semester.
+    Everything is calendar arithmetic on weekday counts; no day-by-day loop.
+    """
+
+    @staticmethod
+    def weekday_occurrences(start: date, end: date) -> List[int]:
+        """How many Mondays..Sundays fall in [start, end] (inclusive)."""
+        days = (end - start).days + 1
+        if days <= 0:
+            return [0] * 7
+        full_weeks, remainder = divmod(days, 7)
+        counts = [full_weeks] * 7
+        first = start.weekday()
+        for i in range(remainder):
+            counts[(first + i) % 7] += 1
+        return counts
+
+    @staticmethod
+    def classes_between(weekly: List[int], start: date, end: date, holidays: List[date]) -> int:
+        """
+        Classes of one subject held in [start, end], given its per-weekday
+        counts. `holidays` must be sorted, unique and inside the semester.
+        """
+        return sum(AttendanceProjector.classes_by_weekday(weekly, start, end, holidays))
+
+    @staticmethod
+    def classes_by_weekday(weekly: List[int], start: date, end: date, holidays: List[date]) -> List[int]:
+        """Like classes_between, split into Monday..Sunday."""
+        occurrences = AttendanceProjector.weekday_occurrences(start, end)
+        held = [n * occ for n, occ in zip(weekly, occurrences)]
+        upper = bisect_right(holidays, end)
+        lower = bisect_left(holidays, start)
+        for h in holidays[lower:upper]:
+            held[h.weekday()] -= weekly[h.weekday()]
+        return held
+
+    @staticmethod
+    def date_of_nth_class(weekly: List[int], start: date, end: date, holidays: List[date], n: int):
+        """Date of the n-th remaining class (1-based), or None if fewer than n remain."""
+        if n <= 0 or sum(weekly) == 0:
+            return None
+        lo, hi = 0, (end - start).days
+        if AttendanceProjector.classes_between(weekly, start, end, holidays) < n:
+            return None
+        # classes_between is monotone in the end date, so binary search the offset
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if AttendanceProjector.classes_between(weekly, start, start + timedelta(days=mid), holidays) >= n:
+                hi = mid
+            else:
+                lo = mid + 1
+        return start + timedelta(days=lo)
+
+    @staticmethod
+    def project_subject(attended: int, total: int, weekly: List[int], start: date, end: date,
+                        holidays: List[date], targets: List[float]) -> Dict:
+        """
+        Projection for one subject.
+
+        For each target: how many remaining classes can still be missed, the
+        best and worst final percentage, and the date after which the target
+        is out of reach if every class from `start` is missed.
+        """
+        remaining = AttendanceProjector.classes_between(weekly, start, end, holidays)
+        final_total = total + remaining
+        result = {
+            'remaining_classes': remaining,
+            'classes_per_week': sum(weekly),
+            'projected_max_percentage': AttendanceCalculator.calculate_percentage(attended + remaining, final_total),
+            'projected_min_percentage': AttendanceCalculator.calculate_percentage(attended, final_total),
+            'targets': []
+        }
+
+        for target in targets:
+            # Missing k more keeps the target iff (attended + remaining - k) * 100 >= target * final_total
+            slack = (attended + remaining) * 100 - target * final_total
+            if final_total == 0:
+                status, can_miss, unreachable_on = 'no_classes', 0, None
+            elif slack < 0:
+                status, can_miss, unreachable_on = 'unreachable', 0, None
+            else:
+                can_miss = min(int(slack // 100), remaining)
+                if can_miss >= remaining:
+                    status, unreachable_on = 'safe', None
+                else:
+                    status = 'at_risk'
+                    unreachable_on = AttendanceProjector.date_of_nth_class(weekly, start, end, holidays, can_miss + 1)
+            result['targets'].append({
+                'target': target,
+                'status': status,
+                'can_miss': can_miss,
+                'must_attend': max(remaining - can_miss, 0) if status != 'unreachable' else remaining,
+                'unreachable_after': unreachable_on.isoformat() if unreachable_on else None
+            })
+        return result
+
+
+class AttendanceSimulator:
+    """
+    Monte Carlo estimate of how the semester ends for each subject.
+
+    Every path draws a per-weekday attendance rate from a Beta posterior
+    built from the user's own logs (shrunk toward the subject's overall rate
+    so sparse weekdays don't swing to 0% or 100%), then a binomial number of
+    attended classes for the classes left on that weekday. All subjects and
+    paths are sampled in one shot.
+    """
+
+    DEFAULT_SAMPLES = 5000
+    MAX_SAMPLES = 20000
+    # Weight of the subject-wide rate, in pseudo-classes per weekday
+    PRIOR_STRENGTH = 4.0
+    PERCENTILES = (10, 50, 90)
+
+    @staticmethod
+    def _beta_params(history_attended, history_total):
+        """Posterior (alpha, beta) per subject and weekday; inputs are S x 7."""
+        overall = [(sum(a) + 1) / (sum(t) + 2) for a, t in zip(history_attended, history_total)]
+        k = AttendanceSimulator.PRIOR_STRENGTH
+        alpha = [[a + k * p for a in row] for row, p in zip(history_attended, overall)]
+        beta = [[(t - a) + k * (1 - p) for a, t in zip(row_a, row_t)]
+                for row_a, row_t, p in zip(history_attended, history_total, overall)]
+        return alpha, beta
+
+    @staticmethod
+    def simulate(attended: Sequence[int], total: Sequence[int],
+                 history_attended: Sequence[Sequence[int]], history_total: Sequence[Sequence[int]],
+                 remaining: Sequence[Sequence[int]], thresholds: Sequence[float],
+                 samples: int = DEFAULT_SAMPLES, seed=None) -> List[Dict]:
+        """
+        attended/total: current counters per subject.
+        history_attended/history_total: logged classes per subject and weekday (Mon..Sun).
+        remaining: classes left per subject and weekday.
+
+        Returns one dict per subject with the expected final percentage,
+        percentiles and the probability of finishing below each threshold.
+        """
+        samples = max(1, min(int(samples), AttendanceSimulator.MAX_SAMPLES))
+        if not len(attended):
+            return []
+        alpha, beta = AttendanceSimulator._beta_params(history_attended, history_total)
+        if _numpy() is None:
+            finals = AttendanceSimulator._sample_scalar(attended, total, alpha, beta, remaining, samples, seed)
+        else:
+            finals = AttendanceSimulator._sample_vectorized(attended, total, alpha, beta, remaining, samples, seed)
+
+        results = []
+        for i, final in enumerate(finals):
+            results.append({
+                'remaining_classes': int(sum(remaining[i])),
+                'expected_percentage': round(float(sum(final) / len(final)), 2),
+                'percentiles': {
+                    f'p{q}': round(float(v), 2)
+                    for q, v in zip(AttendanceSimulator.PERCENTILES,
+                                    AttendanceSimulator._percentiles(final, AttendanceSimulator.PERCENTILES))
+                },
+                'below': [
+                    {'threshold': t, 'probability': round(AttendanceSimulator._share_below(final, t), 4)}
+                    for t in thresholds
+                ]
+            })
+        return results
+
+    @staticmethod
+    def _sample_vectorized(attended, total, alpha, beta, remaining, samples, seed):
+        np = _numpy()
+        rng = np.random.default_rng(seed)
+        alpha = np.asarray(alpha, dtype=np.float64)
+        beta = np.asarray(beta, dtype=np.float64)
+        remaining = np.asarray(remaining, dtype=np.int64)
+        # Only (subject, weekday) cells with classes left are sampled; most of the
+        # 7-day grid is empty, and beta/binomial draws dominate the cost
+        subject_idx, day_idx = np.nonzero(remaining)
+        rates = rng.beta(alpha[subject_idx, day_idx], beta[subject_idx, day_idx], size=(samples, len(subject_idx)))
+        draws = rng.binomial(remaining[subject_idx, day_idx], rates)
+        # samples x subjects: sum each subject's cells
+        owner = np.zeros((len(subject_idx), remaining.shape[0]), dtype=np.int64)
+        owner[np.arange(len(subject_idx)), subject_idx] = 1
+        future = draws @ owner
+        final_total = np.asarray(total, dtype=np.int64) + remaining.sum(axis=1)
+        safe_total = np.where(final_total == 0, 1, final_total)
+        final = (np.asarray(attended, dtype=np.int64) + future) / safe_total * 100
+        final = np.where(final_total == 0, 0.0, final)
+        return final.T
+
+    @staticmethod
+    def _sample_scalar(attended, total, alpha, beta, remaining, samples, seed):
+        import random
+        rng = random.Random(seed)
+        finals = []
+        for i in range(len(attended)):
+            final_total = total[i] + sum(remaining[i])
+            values = []
+            for _ in range(samples):
+                future = 0
+                for d in range(7):
+                    if remaining[i][d]:
+                        p = rng.betavariate(alpha[i][d], beta[i][d])
+                        future += sum(1 for _ in range(remaining[i][d]) if rng.random() < p)
+                values.append((attended[i] + future) / final_total * 100 if final_total else 0.0)
+            finals.append(values)
+        return finals
+
+    @staticmethod
+    def _share_below(values, threshold):
+        np = _numpy()
+        if np is not None:
+            return float(np.mean(values < threshold))
+        return sum(1 for v in values if v < threshold) / len(values)
+
+    @staticmethod
+    def _percentiles(values, qs):
+        np = _numpy()
+        if np is not None:
+            return np.percentile(values, qs)
+        ordered = sorted(values)
+        return [ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))] for q in qs]
+
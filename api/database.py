@@ -1,71 +1,377 @@
-
 import os
 import time
+import random
+import threading
 from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure, AutoReconnect, NetworkTimeout, ServerSelectionTimeoutError
 from dotenv import load_dotenv
+from api.startup import LAZY_STARTUP
+from api.query_stats import listener as query_listener
+from api.metrics import pool_listener
 
 load_dotenv()
 
 _db_instance = None
 
-def init_db():
-    global _db_instance
+# Per-process pool; gunicorn.conf.py sizes it per worker
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '200'))
+MONGO_MIN_POOL_SIZE = min(int(os.getenv('MONGO_MIN_POOL_SIZE', '10')), MONGO_MAX_POOL_SIZE)
+
+# Circuit breaker: this many consecutive connection failures open it, and
+# while open every operation fails at once instead of waiting out
+# serverSelectionTimeoutMS. After the open period one probe is let through;
+# if it fails the period doubles (up to the max).
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('DB_BREAKER_THRESHOLD', '5'))
+BREAKER_OPEN_SECONDS = float(os.getenv('DB_BREAKER_OPEN_SECONDS', '5'))
+BREAKER_MAX_OPEN_SECONDS = 60
+# A probe that hasn't reported back by then (a find() cursor never iterated,
+# a caller that swallowed the result) counts as lost and the circuit reopens
+BREAKER_PROBE_SECONDS = 30
+# Building a client (no URI, DNS for mongodb+srv) is retried with exponential backoff
+RECONNECT_BASE_SECONDS = 1
+RECONNECT_MAX_SECONDS = 60
+# Retry budget for idempotent reads: every successful operation earns a tenth
+# of a retry, at most 10 banked, so retries can't multiply load in an outage
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_MAX = 10
+RETRY_BACKOFF_SECONDS = 0.05
+
+# Collection methods that talk to the server (gated by the breaker)
+OPERATIONS = frozenset({
+    'find', 'find_one', 'find_one_and_update', 'find_one_and_replace', 'find_one_and_delete',
+    'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one',
+    'delete_one', 'delete_many', 'bulk_write', 'count_documents', 'estimated_document_count',
+    'distinct', 'aggregate', 'watch', 'create_index', 'create_indexes', 'drop_index',
+    'list_indexes', 'index_information', 'drop', 'rename'
+})
+# ...and the ones safe to run twice
+IDEMPOTENT_READS = frozenset({'find', 'find_one', 'count_documents', 'estimated_document_count', 'distinct', 'aggregate'})
+
+
+class DatabaseUnavailable(ConnectionFailure):
+    """Raised without touching the network: breaker open or reconnect backing off."""
+
+
+def _connect():
     mongo_uri = os.getenv('MONGO_URI')
     if not mongo_uri:
         print("❌ MONGO_URI is missing in environment!")
-        return None
-        
+        raise DatabaseUnavailable("MONGO_URI is not set")
+
+    # Building the client doesn't wait for a server (operations do, up to
+    # serverSelectionTimeoutMS); mongodb+srv DNS and URI errors fail here
+    client = MongoClient(
+        mongo_uri,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,    # Increased for 5M+ accounts concurrency
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=5000,
+        connectTimeoutMS=5000,
+        socketTimeoutMS=30000,
+        retryWrites=True,
+        event_listeners=[query_listener, pool_listener]
+    )
+    return client.get_database('attendanceDB')
+
+
+def _retryable(error):
+    # Selection timeouts already waited the full timeout; a retry would double it
+    return isinstance(error, (AutoReconnect, NetworkTimeout)) and not isinstance(error, ServerSelectionTimeoutError)
+
+
+class ConnectionManager:
+    """
+    The process's one MongoClient, plus the circuit breaker and retry budget
+    every collection operation goes through (see LazyCollection).
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.open_seconds = BREAKER_OPEN_SECONDS
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+        self.last_error = None
+        self.reconnect_attempts = 0
+        self._reconnect_backoff = RECONNECT_BASE_SECONDS
+        self._next_connect_at = 0.0
+        self.retry_tokens = float(RETRY_BUDGET_MAX)
+        self.trips = 0
+        self.rejected = 0
+        self.retries = 0
+        self.retries_denied = 0
+
+    # --- client ---
+
+    def database(self):
+        """The shared Database, connecting first if needed. Raises DatabaseUnavailable while backing off."""
+        global _db_instance
+        if _db_instance is not None:
+            return _db_instance
+        with self._lock:
+            if _db_instance is not None:
+                return _db_instance
+            now = time.monotonic()
+            if now < self._next_connect_at:
+                self.rejected += 1
+                raise DatabaseUnavailable(
+                    f"Reconnect backing off for {self._next_connect_at - now:.1f}s (last error: {self.last_error})")
+            self.reconnect_attempts += 1
+            print(f"🔄 Connecting to MongoDB (attempt {self.reconnect_attempts})...")
+            try:
+                _db_instance = _connect()
+            except Exception as e:
+                self.last_error = str(e)[:200]
+                delay = self._reconnect_backoff * random.uniform(1, 1.5)
+                self._next_connect_at = now + delay
+                self._reconnect_backoff = min(self._reconnect_backoff * 2, RECONNECT_MAX_SECONDS)
+                print(f"❌ MongoDB Connection Error: {e} (next attempt in {delay:.1f}s)")
+                raise DatabaseUnavailable(str(e)) from e
+            self._reconnect_backoff = RECONNECT_BASE_SECONDS
+            self._next_connect_at = 0.0
+            return _db_instance
+
+    # --- breaker ---
+
+    def before_call(self):
+        """Fail fast while open; once the open period is over, let exactly one probe through."""
+        if self.state == self.CLOSED:
+            return
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise DatabaseUnavailable(f"Database circuit open for {remaining:.1f}s more (last error: {self.last_error})")
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    if time.monotonic() - self._probe_started_at > BREAKER_PROBE_SECONDS:
+                        print("⚠️  MongoDB probe never reported back, reopening circuit")
+                        self._open()
+                    self.rejected += 1
+                    raise DatabaseUnavailable("Database circuit half-open, probe in flight")
+                self._probe_in_flight = True
+                self._probe_started_at = time.monotonic()
+
+    def record_success(self):
+        if self.state == self.CLOSED and not self.failures:
+            # Hot path, no lock: a lost deposit under a race only shrinks the budget a little
+            self.retry_tokens = min(RETRY_BUDGET_MAX, self.retry_tokens + RETRY_BUDGET_RATIO)
+            return
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                print("✅ MongoDB reachable again, circuit closed")
+            self.state = self.CLOSED
+            self.open_seconds = BREAKER_OPEN_SECONDS
+            self._probe_in_flight = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.last_error = str(error)[:200]  # selection errors carry the whole topology
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.open_seconds = min(self.open_seconds * 2, BREAKER_MAX_OPEN_SECONDS)
+                self._open()
+            elif self.state == self.CLOSED and self.failures >= BREAKER_FAILURE_THRESHOLD:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self.trips += 1
+        print(f"⚠️  MongoDB circuit open for {self.open_seconds:.0f}s after {self.failures} failures: {self.last_error}")
+
+    def allow_retry(self, error):
+        """Spend one retry from the budget, if the error is worth retrying and the breaker is closed."""
+        if not _retryable(error) or self.state != self.CLOSED:
+            return False
+        with self._lock:
+            if self.retry_tokens < 1:
+                self.retries_denied += 1
+                return False
+            self.retry_tokens -= 1
+            self.retries += 1
+        time.sleep(RETRY_BACKOFF_SECONDS * random.uniform(1, 2))
+        return True
+
+    def call(self, operation, func, args, kwargs):
+        """Run one collection operation through the breaker (and the retry budget for idempotent reads)."""
+        self.before_call()
+        retryable = operation in IDEMPOTENT_READS and not _writes_output(operation, args, kwargs)
+        while True:
+            try:
+                result = func(*args, **kwargs)
+            except DatabaseUnavailable:
+                raise
+            except ConnectionFailure as e:
+                self.record_failure(e)
+                if retryable and self.allow_retry(e):
+                    retryable = False  # once per call
+                    continue
+                raise
+            except Exception:
+                # The server answered (duplicate key, bad query...): the connection is fine
+                self.record_success()
+                raise
+            if operation == 'find':
+                # Nothing has been sent yet; the cursor reports when it fetches
+                return _GuardedCursor(result, self, retryable)
+            self.record_success()
+            return result
+
+    def ping(self):
+        return self.call('ping', self.database().client.admin.command, ('ping',), {})
+
+    def health(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(0.0, self.opened_at + self.open_seconds - time.monotonic()), 1)
+            return {
+                'connected': _db_instance is not None,
+                'circuit': self.state,
+                'consecutive_failures': self.failures,
+                'retry_in_seconds': retry_in,
+                'last_error': self.last_error,
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'reconnect_attempts': self.reconnect_attempts,
+                'retry_budget': round(self.retry_tokens, 1),
+                'retries': self.retries,
+                'retries_denied': self.retries_denied
+            }
+
+
+def _writes_output(operation, args, kwargs):
+    if operation != 'aggregate':
+        return False
+    pipeline = args[0] if args else kwargs.get('pipeline', [])
+    return any('$out' in stage or '$merge' in stage for stage in pipeline)
+
+
+class _GuardedCursor:
+    """
+    A find() cursor whose fetches report to the connection manager. A read
+    that fails before returning anything is retried once on a fresh clone.
+    """
+
+    def __init__(self, cursor, manager, retryable):
+        self._cursor = cursor
+        self._manager = manager
+        self._retryable = retryable
+        self._started = False
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # sort(), limit()... return the cursor itself; keep the guard on it
+            return self if result is self._cursor else result
+        return chained
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            try:
+                doc = next(self._cursor)
+            except StopIteration:
+                if not self._started:
+                    self._started = True
+                    self._manager.record_success()
+                raise
+            except ConnectionFailure as e:
+                self._manager.record_failure(e)
+                if not self._started and self._retryable and self._manager.allow_retry(e):
+                    self._retryable = False
+                    self._cursor = self._cursor.clone()
+                    continue
+                raise
+            except Exception:
+                # The server answered (bad query, OperationFailure...): as in ConnectionManager.call
+                if not self._started:
+                    self._started = True
+                    self._manager.record_success()
+                raise
+            if not self._started:
+                self._started = True
+                self._manager.record_success()
+            return doc
+
+    next = __next__
+
+
+connection = ConnectionManager()
+
+
+def init_db():
+    """Connect the shared client now; the Database, or None (the reason is in connection.health())."""
     try:
-        # Increase timeout slightly or keep as is
-        client = MongoClient(
-            mongo_uri,
-            maxPoolSize=200,    # Increased for 5M+ accounts concurrency
-            minPoolSize=10,
-            serverSelectionTimeoutMS=5000,
-            connectTimeoutMS=5000,
-            socketTimeoutMS=30000,
-            retryWrites=True
-        )
-        # Force a connection check to see if it fails immediately (DNS etc)
-        # asking for a database is lazy in pymongo, but we want to know if it failed for the 'db' proxy logic
-        # However, to be truly lazy we shouldn't block. 
-        # But the original code relied on 'db' being valid or None.
-        
-        # We'll just assume it works or fail later. 
-        # But to detect the 'None' case from original code:
-        # We try to access it? No, keeping it simple.
-        
-        _db_instance = client.get_database('attendanceDB')
-        return _db_instance
-    except Exception as e:
-        print(f"❌ MongoDB Connection Error: {e}")
+        return connection.database()
+    except DatabaseUnavailable:
         return None
 
+
 # Proxy classes to handle lazy connection
 class LazyCollection:
     def __init__(self, name):
         self._name = name
-    
+        self._db = None
+        self._col = None
+
     def __getattr__(self, name):
-        global _db_instance
-        if _db_instance is None:
-            # Try to reconnect on demand
-            print(f"🔄 Attempting to reconnect to MongoDB for collection '{self._name}'...")
-            if init_db() is None:
-                 raise Exception(f"Database not connected. Cannot perform '{name}' on '{self._name}'")
-        
-        real_col = _db_instance.get_collection(self._name)
-        return getattr(real_col, name)
+        # Connects on first use; fails fast (no new client) while a reconnect is backing off
+        database = connection.database()
+        if self._db is not database:
+            # First use, or the client was replaced (reconnect, fork)
+            self._col = database.get_collection(self._name)
+            self._db = database
+        attr = getattr(self._col, name)
+        if name not in OPERATIONS:
+            return attr
+
+        def operation(*args, **kwargs):
+            return connection.call(name, attr, args, kwargs)
+        return operation
 
 class LazyDB:
     def get_collection(self, name):
         return LazyCollection(name)
 
-# Initial Connection Attempt
-_db_instance = init_db()
+def reset_after_fork():
+    """
+    Drop the client inherited from the parent process (MongoClient is not
+    fork-safe) and give this process its own. gunicorn's post_fork hook
+    calls this when the app is preloaded in the master.
+    """
+    global _db_instance
+    _db_instance = None
+    connection.reset()
+    if not LAZY_STARTUP:
+        init_db()
+
+
+# Lazy startup (see api/startup.py) skips this: building the client resolves
+# the mongodb+srv records, so it's left to the first collection access
+if not LAZY_STARTUP:
+    # Initial Connection Attempt
+    if init_db() is None:
+        print("⚠️  Initial DB connection failed. Using LazyDB proxy to prevent crash.")
 
-if _db_instance is not None:
-    db = _db_instance
-else:
-    print("⚠️  Initial DB connection failed. Using LazyDB proxy to prevent crash.")
-    db = LazyDB()
+# Always the proxy, so collections fetched at import follow the current
+# client: a reconnect or a post-fork reset is picked up everywhere
+db = LazyDB()
@@ -0,0 +1,227 @@
+# api/events.py
+# Per-user change feed behind /api/v1/events: in-process ring buffers, or a Mongo change stream
+
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from pymongo.errors import OperationFailure
+from api.database import db
+
+events_collection = db.get_collection('change_events')
+
+# 'memory' (this process only), 'mongo' (change stream, shared by every worker)
+# or 'auto' (mongo when the deployment supports change streams)
+EVENTS_BACKEND = os.getenv('EVENTS_BACKEND', 'auto')
+# Events the in-process feed keeps per user for Last-Event-ID resume
+REPLAY_LIMIT = 100
+# Users whose buffers are kept by the in-process feed (least recently published dropped)
+MEMORY_MAX_USERS = 10000
+# Mongo feed documents expire after this long
+EVENT_TTL_SECONDS = 24 * 3600
+HEARTBEAT_SECONDS = 15
+# How long one change-stream getMore waits, so a stream notices its deadline
+CHANGE_STREAM_POLL_SECONDS = 5
+# Streams end before the 30s serverless function limit; EventSource reconnects
+# with Last-Event-ID and picks up where it left off
+STREAM_MAX_SECONDS = int(os.getenv('EVENTS_STREAM_MAX_SECONDS', '25'))
+RETRY_MS = 3000
+# The Mongo feed's event IDs are change-stream resume tokens (their hex _data)
+_RESUME_TOKEN = re.compile(r'[0-9A-Fa-f]+')
+
+
+def format_event(event, payload, event_id=None):
+    """One SSE frame."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(payload, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def heartbeat_frame():
+    # Comment line: keeps proxies from closing the connection, ignored by EventSource
+    return f": heartbeat {datetime.utcnow().isoformat()}\n\n"
+
+
+def reset_frame(last_event_id):
+    """Sent when a resume point is gone (other worker, restart, too old): refetch everything."""
+    return format_event('reset', {'type': 'reset', 'last_event_id': last_event_id})
+
+
+class MemoryFeed:
+    """Ring buffer of recent events per user plus a condition for waiting streams."""
+
+    def __init__(self, keep=REPLAY_LIMIT, max_users=MEMORY_MAX_USERS):
+        self._cond = threading.Condition()
+        self._keep = keep
+        self._max_users = max_users
+        self._boot = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._events = OrderedDict()
+
+    def publish(self, user_email, event, payload):
+        with self._cond:
+            self._seq += 1
+            buffer = self._events.pop(user_email, None) or deque(maxlen=self._keep)
+            buffer.append((self._seq, f"{self._boot}-{self._seq}", event, payload))
+            self._events[user_email] = buffer
+            while len(self._events) > self._max_users:
+                self._events.popitem(last=False)
+            self._cond.notify_all()
+
+    def _parse(self, last_event_id):
+        boot, _, seq = (last_event_id or '').partition('-')
+        if boot != self._boot or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def stream(self, user_email, last_event_id, deadline):
+        """Yield SSE frames until `deadline` (time.monotonic())."""
+        with self._cond:
+            cursor = self._seq
+        if last_event_id:
+            seq = self._parse(last_event_id)
+            with self._cond:
+                buffer = list(self._events.get(user_email, ()))
+            oldest = buffer[0][0] if buffer else self._seq + 1
+            if seq is None or seq < oldest - 1 or seq > cursor:
+                # Unknown or already evicted from the buffer; anything newer is still sent
+                yield reset_frame(last_event_id)
+            else:
+                cursor = seq
+
+        last_beat = time.monotonic()
+        while True:
+            with self._cond:
+                pending = [e for e in self._events.get(user_email, ()) if e[0] > cursor]
+                if not pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    self._cond.wait(min(HEARTBEAT_SECONDS, remaining))
+                    pending = [e for e in self._events.get(user_email, ()) if e[0] > cursor]
+            for seq, event_id, event, payload in pending:
+                cursor = seq
+                yield format_event(event, payload, event_id)
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            if not pending and now - last_beat >= HEARTBEAT_SECONDS - 0.01:
+                last_beat = now
+                yield heartbeat_frame()
+
+
+class MongoFeed:
+    """
+    Events stored in change_events (TTL'd) and tailed with a change stream, so
+    any worker can serve any user. Event IDs are the stream's resume tokens:
+    the server orders them by commit, whereas ObjectIds come from each
+    worker's clock and counter and can commit out of order.
+    """
+
+    def __init__(self):
+        self._indexes_ready = False
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        try:
+            events_collection.create_index('created_at', expireAfterSeconds=EVENT_TTL_SECONDS)
+            self._indexes_ready = True
+        except Exception as e:
+            print(f"⚠️ Could not create change_events indexes: {e}")
+
+    def publish(self, user_email, event, payload):
+        self._ensure_indexes()
+        events_collection.insert_one({
+            'owner_email': user_email,
+            'event': event,
+            'payload': payload,
+            'created_at': datetime.utcnow()
+        })
+
+    def _watch(self, user_email, resume_token):
+        pipeline = [{'$match': {'operationType': 'insert', 'fullDocument.owner_email': user_email}}]
+        return events_collection.watch(
+            pipeline, resume_after=resume_token, max_await_time_ms=CHANGE_STREAM_POLL_SECONDS * 1000
+        )
+
+    def stream(self, user_email, last_event_id, deadline):
+        resume_token = None
+        if last_event_id:
+            if _RESUME_TOKEN.fullmatch(last_event_id):
+                resume_token = {'_data': last_event_id}
+            else:
+                yield reset_frame(last_event_id)  # not an ID this feed issued
+        try:
+            changes = self._watch(user_email, resume_token)
+        except OperationFailure:
+            if resume_token is None:
+                raise
+            # The resume point has rolled out of the oplog, or is an ObjectId from before IDs were tokens
+            yield reset_frame(last_event_id)
+            changes = self._watch(user_email, None)
+
+        # Resuming replays everything after the token, in commit order, then goes live
+        with changes:
+            last_beat = time.monotonic()
+            while time.monotonic() < deadline:
+                change = changes.try_next()
+                if change is None:
+                    if time.monotonic() - last_beat >= HEARTBEAT_SECONDS:
+                        last_beat = time.monotonic()
+                        yield heartbeat_frame()
+                    continue
+                doc = change['fullDocument']
+                yield format_event(doc['event'], doc['payload'], change['_id']['_data'])
+
+
+_memory_feed = MemoryFeed()
+_mongo_feed = MongoFeed()
+_backend = None
+
+
+def _supports_change_streams():
+    try:
+        hello = events_collection.database.client.admin.command('hello')
+        return bool(hello.get('setName')) or hello.get('msg') == 'isdbgrid'
+    except Exception:
+        return False
+
+
+def get_feed():
+    """The configured feed; 'auto' is resolved once, on first use."""
+    global _backend
+    if _backend is None:
+        if EVENTS_BACKEND == 'mongo' or (EVENTS_BACKEND == 'auto' and _supports_change_streams()):
+            _backend = _mongo_feed
+        else:
+            _backend = _memory_feed
+        print(f"✅ Change feed backend: {'mongo change stream' if _backend is _mongo_feed else 'in-process'}")
+    return _backend
+
+
+def publish_event(user_email, event, payload):
+    """Append an event to a user's feed. Never raises: the write it describes already happened."""
+    try:
+        get_feed().publish(user_email, event, payload)
+    except Exception as e:
+        print(f"⚠️ Change feed publish '{event}' failed for {user_email}: {e}")
+
+
+def event_stream(user_email, last_event_id=None, max_seconds=STREAM_MAX_SECONDS):
+    """SSE frames for one connection: retry hint, replay after last_event_id, then live events and heartbeats."""
+    yield f"retry: {RETRY_MS}\n\n"
+    deadline = time.monotonic() + max_seconds
+    try:
+        for frame in get_feed().stream(user_email, last_event_id, deadline):
+            yield frame
+    except Exception as e:
+        print(f"⚠️ Change feed stream failed for {user_email}: {e}")
+        yield format_event('error', {'type': 'error', 'message': 'stream interrupted'})
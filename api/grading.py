@@ -0,0 +1,194 @@
+# api/grading.py
+# Single grading engine: declarative scheme tables + bisect lookups
+
+from bisect import bisect_right
+from typing import Dict, List, Sequence, Tuple
+
+
+class GradingScheme:
+    """
+    A grading scale defined by (min_percentage, grade, grade_point) rows.
+    Rows may be given in any order; lookups go through a precomputed table
+    (whole-number cut-offs) or a bisect over the sorted cut-offs, never an
+    if/elif ladder. `legacy_points` maps letters an older table handed out,
+    which lookups no longer produce, to their points for stored courses.
+    """
+
+    def __init__(self, name: str, rows: Sequence[Tuple[float, str, float]], max_point: float,
+                 legacy_points: Dict[str, float] = None):
+        self.name = name
+        self.max_point = max_point
+        ordered = sorted(rows)
+        self.cutoffs = [row[0] for row in ordered]
+        self.grades = [row[1] for row in ordered]
+        self.points = [row[2] for row in ordered]
+        # Stored documents carry grade letters; resolve them without a scan
+        self.point_for_grade = dict(legacy_points or {})
+        self.point_for_grade.update((grade, point) for _, grade, point in ordered)
+        self._lowest = (self.grades[0], self.points[0])
+        # With whole-number cut-offs, floor(percentage) decides the grade, so
+        # 0..100 is precomputed once and most lookups are a single index
+        self._by_floor = None
+        if all(float(c).is_integer() for c in self.cutoffs):
+            self._by_floor = [self._bisect(i) for i in range(101)]
+
+    def _bisect(self, percentage: float) -> Tuple[str, float]:
+        idx = bisect_right(self.cutoffs, percentage) - 1
+        if idx < 0:
+            return self._lowest
+        return self.grades[idx], self.points[idx]
+
+    def lookup(self, percentage: float) -> Tuple[str, float]:
+        """(grade, grade_point) for a percentage."""
+        table = self._by_floor
+        if table is not None and 0 <= percentage <= 100:
+            return table[int(percentage)]
+        return self._bisect(percentage)
+
+    def grade(self, percentage: float) -> str:
+        return self.lookup(percentage)[0]
+
+    def points_for(self, grade: str) -> float:
+        return self.point_for_grade.get(grade, 0)
+
+
+# GGSIPU Ordinance 11 (also what the web and mobile clients show)
+IPU_10 = GradingScheme('ipu_10', [
+    (90, 'O', 10),
+    (75, 'A+', 9),
+    (65, 'A', 8),
+    (55, 'B+', 7),
+    (50, 'B', 6),
+    (45, 'C', 5),
+    (40, 'P', 4),
+    (0, 'F', 0),
+], max_point=10, legacy_points={'C+': 5})  # the old 45-49 band, now C
+
+# 4.0 scale used by the older analytics helpers
+GPA_4 = GradingScheme('gpa_4', [
+    (90, 'O', 4.0),
+    (87, 'A+', 3.7),
+    (83, 'A', 3.3),
+    (80, 'B+', 3.0),
+    (77, 'B', 2.7),
+    (73, 'C+', 2.3),
+    (70, 'C', 2.0),
+    (60, 'D', 1.0),
+    (0, 'F', 0.0),
+], max_point=4.0)
+
+SCHEMES = {scheme.name: scheme for scheme in (IPU_10, GPA_4)}
+
+# Marks that count toward each subject type (every paper is out of 100)
+SUBJECT_COMPONENTS = {
+    'theory': ('internal_theory', 'external_theory'),
+    'practical': ('internal_practical', 'external_practical'),
+    'nues': ('internal_theory',),
+}
+# Untyped subjects predate the type field; they were graded on everything entered
+_ALL_COMPONENTS = ('internal_theory', 'external_theory', 'internal_practical', 'external_practical')
+MAX_MARKS = 100
+
+
+def _mark(value) -> float:
+    if value.__class__ in (int, float):
+        return value
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _components(subject_type):
+    components = SUBJECT_COMPONENTS.get(subject_type)
+    if components is None:
+        components = SUBJECT_COMPONENTS.get(str(subject_type or '').lower(), _ALL_COMPONENTS)
+    return components
+
+
+def _grade_into(target: Dict, subject: Dict, scheme: GradingScheme) -> Dict:
+    total = 0
+    for field in _components(subject.get('type')):
+        total += _mark(subject.get(field))
+    percentage = total / MAX_MARKS * 100
+    target['total_marks'] = round(total, 2)
+    target['max_marks'] = MAX_MARKS
+    target['percentage'] = round(percentage, 2)
+    target['grade'], target['grade_point'] = scheme.lookup(percentage)
+    return target
+
+
+def subject_result(subject: Dict, scheme: GradingScheme = IPU_10) -> Dict:
+    """Total marks, percentage, grade and grade point for one subject."""
+    return _grade_into({}, subject, scheme)
+
+
+def course_points(course: Dict, scheme: GradingScheme = IPU_10) -> float:
+    """
+    Grade point of an already graded course. The stored grade_point wins so
+    documents graded under an older table keep the points they were saved with.
+    """
+    point = course.get('grade_point')
+    if point is not None:
+        return point
+    return scheme.points_for(course.get('grade', 'F'))
+
+
+def sgpa_totals(courses: Sequence[Dict], scheme: GradingScheme = IPU_10) -> Tuple[float, float]:
+    """(total_credits, total_grade_points) for graded courses."""
+    credits_sum = 0
+    points_sum = 0.0
+    for course in courses:
+        credits = course.get('credits', 0) or 0
+        credits_sum += credits
+        points_sum += course_points(course, scheme) * credits
+    return credits_sum, points_sum
+
+
+def grade_semester(subjects: Sequence[Dict], scheme: GradingScheme = IPU_10) -> Dict:
+    """
+    Batch entry point: grade every subject of a semester and total it in one
+    pass. Input marks and fields are preserved on each returned subject.
+    """
+    graded = []
+    credits_sum = 0
+    points_sum = 0.0
+    for sub in subjects:
+        result = _grade_into(dict(sub), sub, scheme)
+        credits = int(_mark(sub.get('credits')))
+        result['name'] = sub.get('name')
+        result['code'] = sub.get('code', '')
+        result['credits'] = credits
+        credits_sum += credits
+        points_sum += result['grade_point'] * credits
+        graded.append(result)
+    return {
+        'subjects': graded,
+        'sgpa': round(points_sum / credits_sum, 2) if credits_sum else 0.0,
+        'total_credits': credits_sum,
+        'total_grade_points': round(points_sum, 2)
+    }
+
+
+def cgpa(semesters: Sequence[Sequence[Dict]], scheme: GradingScheme = IPU_10) -> Dict:
+    """CGPA over all courses of all semesters (credit weighted, not an average of SGPAs)."""
+    credits_sum = 0
+    points_sum = 0.0
+    for courses in semesters:
+        credits, points = sgpa_totals(courses, scheme)
+        credits_sum += credits
+        points_sum += points
+    return {
+        'cgpa': round(points_sum / credits_sum, 2) if credits_sum else 0.0,
+        'total_credits': credits_sum,
+        'total_grade_points': round(points_sum, 2)
+    }
+
+
+def grade_batch(percentages: Sequence[float], scheme: GradingScheme = IPU_10) -> List[Tuple[str, float]]:
+    """(grade, grade_point) for many percentages."""
+    table = scheme._by_floor
+    if table is None:
+        return [scheme._bisect(p) for p in percentages]
+    bisect_lookup = scheme._bisect
+    return [table[int(p)] if 0 <= p <= 100 else bisect_lookup(p) for p in percentages]
@@ -4,45 +4,159 @@
 from flask import Blueprint, jsonify, session, request
 from bson import ObjectId
 from datetime import datetime
+from pymongo import UpdateOne, DeleteOne, ASCENDING, DESCENDING
 import traceback
 from api.database import db
+from api.realtime import emit_change, NOTES_UPDATED
+from api.utils.text_search import build_search_terms, parse_query, highlight, make_snippet
 
 keep_bp = Blueprint('keep', __name__, url_prefix='/api/keep')
 
 # MongoDB collection for notes
 notes_collection = db.get_collection('brain_dump_notes') if db is not None else None
 
+LIST_PAGE_SIZE = 30
+LIST_MAX_PAGE_SIZE = 100
+SNIPPET_LENGTH = 140
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+BULK_MAX_NOTES = 500
+BULK_ACTIONS = ('trash', 'restore', 'color', 'delete')
+
+_indexes_ready = False
+
+
+def _ensure_indexes():
+    """Create the note indexes once per process (idempotent on the server)."""
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    try:
+        notes_collection.create_index(
+            [('owner_email', ASCENDING), ('search_terms', ASCENDING), ('updated_at', DESCENDING), ('_id', DESCENDING)],
+            name='owner_search_terms_updated'
+        )
+        notes_collection.create_index(
+            [('owner_email', ASCENDING), ('trashed', ASCENDING), ('updated_at', DESCENDING), ('_id', DESCENDING)],
+            name='owner_trashed_updated'
+        )
+        _indexes_ready = True
+    except Exception as e:
+        print(f"Notes index creation failed: {e}")
+
+
+def _encode_cursor(note):
+    """Opaque pagination cursor: `<updated_at iso>_<note id>`."""
+    updated_at = note.get('updated_at') or datetime.min
+    return f"{updated_at.isoformat()}_{note['_id']}"
+
+
+def _cursor_filter(cursor):
+    """Filter for notes strictly after `cursor` in (updated_at desc, _id desc) order."""
+    ts_str, _, oid_str = cursor.rpartition('_')
+    ts = datetime.fromisoformat(ts_str)
+    oid = ObjectId(oid_str)
+    return {'$or': [
+        {'updated_at': {'$lt': ts}},
+        {'updated_at': ts, '_id': {'$lt': oid}}
+    ]}
+
+
+def _backfill_search_terms(user_email):
+    """Index notes written before search existed. No-op once a user is backfilled."""
+    stale = notes_collection.find(
+        {'owner_email': user_email, 'search_terms': {'$exists': False}},
+        {'title': 1, 'body': 1}
+    )
+    ops = [
+        UpdateOne({'_id': n['_id']}, {'$set': {'search_terms': build_search_terms(n.get('title'), n.get('body'))}})
+        for n in stale
+    ]
+    if ops:
+        notes_collection.bulk_write(ops, ordered=False)
+
+
+def _format_summary(note):
+    """Fields every note listing sends the frontend."""
+    return {
+        'id': str(note['_id']),
+        'title': note.get('title', ''),
+        'color': note.get('color', 'DEFAULT'),
+        'createTime': note.get('created_at').isoformat() if note.get('created_at') else None,
+        'updateTime': note.get('updated_at').isoformat() if note.get('updated_at') else None,
+        'trashed': note.get('trashed', False)
+    }
+
 
 @keep_bp.route('/notes', methods=['GET'])
 def list_notes():
-    """Fetch all notes for the current user from MongoDB."""
+    """
+    Fetch the current user's notes, newest first; trashed=true for the bin.
+    By default the response is the bare list of every note with full bodies,
+    as existing clients expect. With paginated=1 it is one page of summaries,
+    {"notes": [...], "next_cursor": ...}, continued with cursor and sized by
+    limit; full bodies are then fetched one at a time via GET /notes/<id>.
+    """
     if 'user' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    if not notes_collection:
+    if notes_collection is None:
         return jsonify({"error": "Database not available"}), 500
 
+    paginated = request.args.get('paginated') == '1'
+    if paginated:
+        try:
+            limit = min(max(int(request.args.get('limit', LIST_PAGE_SIZE)), 1), LIST_MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({"error": "Invalid limit"}), 400
+
     try:
         user_email = session['user'].get('email')
-        notes = list(notes_collection.find(
-            {'owner_email': user_email, 'trashed': {'$ne': True}},
-            sort=[('updated_at', -1)]
-        ))
+        _ensure_indexes()
+
+        show_trashed = request.args.get('trashed') == 'true'
+        match = {'owner_email': user_email, 'trashed': True if show_trashed else {'$ne': True}}
+        if not paginated:
+            notes = notes_collection.find(match, sort=[('updated_at', -1), ('_id', -1)])
+            return jsonify([dict(_format_summary(note), body=note.get('body', '')) for note in notes])
+
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                match.update(_cursor_filter(cursor))
+            except Exception:
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        # Truncate bodies server-side so full notes never cross the wire here
+        notes = list(notes_collection.aggregate([
+            {'$match': match},
+            {'$sort': {'updated_at': -1, '_id': -1}},
+            {'$limit': limit + 1},
+            {'$project': {
+                'title': 1,
+                'color': 1,
+                'created_at': 1,
+                'updated_at': 1,
+                'trashed': 1,
+                'snippet': {'$substrCP': [{'$ifNull': ['$body', '']}, 0, SNIPPET_LENGTH]},
+                'body_length': {'$strLenCP': {'$ifNull': ['$body', '']}}
+            }}
+        ]))
+        has_more = len(notes) > limit
+        notes = notes[:limit]
         
-        # Format notes for frontend
         formatted_notes = []
         for note in notes:
-            formatted_notes.append({
-                'id': str(note['_id']),
-                'title': note.get('title', ''),
-                'body': note.get('body', ''),
-                'color': note.get('color', 'DEFAULT'),
-                'createTime': note.get('created_at').isoformat() if note.get('created_at') else None,
-                'updateTime': note.get('updated_at').isoformat() if note.get('updated_at') else None,
-                'trashed': note.get('trashed', False)
-            })
+            formatted_notes.append(dict(
+                _format_summary(note),
+                snippet=note.get('snippet', ''),
+                truncated=note.get('body_length', 0) > SNIPPET_LENGTH
+            ))
         
-        return jsonify(formatted_notes)
+        return jsonify({
+            'notes': formatted_notes,
+            'next_cursor': _encode_cursor(notes[-1]) if has_more and notes else None
+        })
         
     except Exception as e:
         print(f"Notes Error: {e}")
@@ -50,13 +164,52 @@ def list_notes():
         return jsonify({"error": "Internal error"}), 500
 
 
+@keep_bp.route('/notes/<note_id>', methods=['GET'])
+def get_note(note_id):
+    """Fetch a single note including its full body."""
+    if 'user' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    if notes_collection is None:
+        return jsonify({"error": "Database not available"}), 500
+
+    try:
+        note_oid = ObjectId(note_id)
+    except Exception:
+        return jsonify({"error": "Invalid note ID"}), 400
+
+    try:
+        user_email = session['user'].get('email')
+        note = notes_collection.find_one(
+            {'_id': note_oid, 'owner_email': user_email},
+            {'search_terms': 0}
+        )
+        if not note:
+            return jsonify({"error": "Note not found"}), 404
+
+        return jsonify({
+            'id': str(note['_id']),
+            'title': note.get('title', ''),
+            'body': note.get('body', ''),
+            'color': note.get('color', 'DEFAULT'),
+            'createTime': note.get('created_at').isoformat() if note.get('created_at') else None,
+            'updateTime': note.get('updated_at').isoformat() if note.get('updated_at') else None,
+            'trashed': note.get('trashed', False)
+        })
+        
+    except Exception as e:
+        print(f"Get Note Error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Internal error"}), 500
+
+
 @keep_bp.route('/notes', methods=['POST'])
 def create_note():
     """Create a new note in MongoDB."""
     if 'user' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    if not notes_collection:
+    if notes_collection is None:
         return jsonify({"error": "Database not available"}), 500
 
     data = request.json
@@ -75,10 +228,12 @@ def create_note():
             'color': color,
             'created_at': now,
             'updated_at': now,
-            'trashed': False
+            'trashed': False,
+            'search_terms': build_search_terms(title, body)
         }
         
         result = notes_collection.insert_one(note)
+        emit_change(user_email.lower(), NOTES_UPDATED, action='created', note_ids=[str(result.inserted_id)])
         
         return jsonify({
             'id': str(result.inserted_id),
@@ -101,7 +256,7 @@ def update_note(note_id):
     if 'user' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    if not notes_collection:
+    if notes_collection is None:
         return jsonify({"error": "Database not available"}), 500
 
     data = request.json
@@ -116,6 +271,19 @@ def update_note(note_id):
             update_data['body'] = data['body']
         if 'color' in data:
             update_data['color'] = data['color']
+
+        # Keep the search index in step with the text fields
+        if 'title' in data or 'body' in data:
+            current = notes_collection.find_one(
+                {'_id': ObjectId(note_id), 'owner_email': user_email},
+                {'title': 1, 'body': 1}
+            )
+            if not current:
+                return jsonify({"error": "Note not found"}), 404
+            update_data['search_terms'] = build_search_terms(
+                update_data.get('title', current.get('title')),
+                update_data.get('body', current.get('body'))
+            )
         
         result = notes_collection.update_one(
             {'_id': ObjectId(note_id), 'owner_email': user_email},
@@ -124,6 +292,7 @@ def update_note(note_id):
         
         if result.modified_count == 0:
             return jsonify({"error": "Note not found"}), 404
+        emit_change(user_email.lower(), NOTES_UPDATED, action='updated', note_ids=[note_id])
         
         return jsonify({"success": True})
         
@@ -139,7 +308,7 @@ def delete_note(note_id):
     if 'user' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    if not notes_collection:
+    if notes_collection is None:
         return jsonify({"error": "Database not available"}), 500
 
     try:
@@ -153,6 +322,7 @@ def delete_note(note_id):
         
         if result.modified_count == 0:
             return jsonify({"error": "Note not found"}), 404
+        emit_change(user_email.lower(), NOTES_UPDATED, action='trashed', note_ids=[note_id])
         
         return jsonify({"success": True})
         
@@ -160,3 +330,142 @@ def delete_note(note_id):
         print(f"Delete Note Error: {e}")
         traceback.print_exc()
         return jsonify({"error": "Internal error"}), 500
+
+
+@keep_bp.route('/notes/bulk', methods=['POST'])
+def bulk_update_notes():
+    """
+    Apply one action to many notes in a single bulk_write.
+    Body: {"ids": [...], "action": "trash"|"restore"|"color"|"delete", "color": "..."}
+    """
+    if 'user' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    if notes_collection is None:
+        return jsonify({"error": "Database not available"}), 500
+
+    data = request.json or {}
+    action = data.get('action')
+    ids = data.get('ids') or []
+
+    if action not in BULK_ACTIONS:
+        return jsonify({"error": f"Action must be one of: {', '.join(BULK_ACTIONS)}"}), 400
+    if not isinstance(ids, list) or not ids:
+        return jsonify({"error": "Note IDs required"}), 400
+    if len(ids) > BULK_MAX_NOTES:
+        return jsonify({"error": f"At most {BULK_MAX_NOTES} notes per request"}), 400
+    if action == 'color' and not data.get('color'):
+        return jsonify({"error": "Color required"}), 400
+
+    try:
+        note_oids = list(dict.fromkeys(ObjectId(i) for i in ids))
+    except Exception:
+        return jsonify({"error": "Invalid note ID"}), 400
+
+    try:
+        user_email = session['user'].get('email')
+        now = datetime.utcnow()
+
+        if action == 'delete':
+            ops = [DeleteOne({'_id': oid, 'owner_email': user_email}) for oid in note_oids]
+        else:
+            if action == 'trash':
+                fields = {'trashed': True}
+            elif action == 'restore':
+                fields = {'trashed': False}
+            else:
+                fields = {'color': data['color']}
+            fields['updated_at'] = now
+            ops = [UpdateOne({'_id': oid, 'owner_email': user_email}, {'$set': fields}) for oid in note_oids]
+
+        result = notes_collection.bulk_write(ops, ordered=False)
+        emit_change(user_email.lower(), NOTES_UPDATED, action=action, note_ids=[str(oid) for oid in note_oids])
+
+        return jsonify({
+            "success": True,
+            "matched": result.matched_count,
+            "modified": result.modified_count,
+            "deleted": result.deleted_count
+        })
+        
+    except Exception as e:
+        print(f"Bulk Notes Error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Internal error"}), 500
+
+
+@keep_bp.route('/notes/search', methods=['GET'])
+def search_notes():
+    """
+    Prefix search over the user's notes.
+    Query params: q (required), cursor (from previous page), limit.
+    """
+    if 'user' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    if notes_collection is None:
+        return jsonify({"error": "Database not available"}), 500
+
+    terms = parse_query(request.args.get('q', ''))
+    if not terms:
+        return jsonify({"error": "Search query required"}), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+
+    try:
+        user_email = session['user'].get('email')
+        _ensure_indexes()
+        _backfill_search_terms(user_email)
+
+        query = {
+            'owner_email': user_email,
+            'search_terms': {'$all': terms},
+            'trashed': {'$ne': True}
+        }
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                query.update(_cursor_filter(cursor))
+            except Exception:
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        # Fetch one extra row to know whether another page exists
+        notes = list(notes_collection.find(
+            query,
+            {'search_terms': 0},
+            sort=[('updated_at', -1), ('_id', -1)],
+            limit=limit + 1
+        ))
+        has_more = len(notes) > limit
+        notes = notes[:limit]
+
+        results = []
+        for note in notes:
+            title = note.get('title', '')
+            body = note.get('body', '')
+            snippet, body_ranges = make_snippet(body, highlight(body, terms))
+            results.append({
+                'id': str(note['_id']),
+                'title': title,
+                'snippet': snippet,
+                'color': note.get('color', 'DEFAULT'),
+                'createTime': note.get('created_at').isoformat() if note.get('created_at') else None,
+                'updateTime': note.get('updated_at').isoformat() if note.get('updated_at') else None,
+                'highlights': {
+                    'title': highlight(title, terms),
+                    'snippet': body_ranges
+                }
+            })
+
+        return jsonify({
+            'notes': results,
+            'next_cursor': _encode_cursor(notes[-1]) if has_more and notes else None
+        })
+
+    except Exception as e:
+        print(f"Search Notes Error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Internal error"}), 500
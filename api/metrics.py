@@ -0,0 +1,131 @@
+# api/metrics.py
+# Prometheus metrics (text exposition at /metrics, see api/routes/metrics.py)
+
+import os
+import time
+from flask import request
+from pymongo import monitoring
+from prometheus_client import Counter, Gauge, Histogram
+from api.query_stats import current as current_queries
+
+# With PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py does) every worker
+# writes its samples to files there and /metrics sums them, whichever worker
+# answers the scrape. It must be set before prometheus_client is imported.
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+# Routes are URL rules (/api/v1/attendance/stats/<subject_id>), never raw paths,
+# so label cardinality stays bounded
+HTTP_REQUESTS = Counter('acadhub_http_requests_total', 'HTTP requests', ['method', 'route', 'status'])
+HTTP_LATENCY = Histogram(
+    'acadhub_http_request_duration_seconds', 'Time to produce the response (streams: until the first byte)',
+    ['method', 'route'], buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    'acadhub_http_response_size_bytes', 'Response body size as sent, after compression (streams not counted)',
+    ['method', 'route'], buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+)
+MONGO_COMMANDS = Counter('acadhub_mongo_commands_total', 'Mongo commands issued by requests', ['route'])
+MONGO_COMMAND_SECONDS = Counter('acadhub_mongo_command_seconds_total', 'Time requests spent in Mongo commands', ['route'])
+
+# livesum: summed over the workers that are alive
+MONGO_POOL_MAX = Gauge('acadhub_mongo_pool_max_connections', 'Pool size limit, summed over pools', multiprocess_mode='livesum')
+MONGO_POOL_OPEN = Gauge('acadhub_mongo_pool_open_connections', 'Open pooled connections', multiprocess_mode='livesum')
+MONGO_POOL_IN_USE = Gauge('acadhub_mongo_pool_checked_out_connections', 'Connections checked out by an operation', multiprocess_mode='livesum')
+MONGO_POOL_WAIT = Histogram(
+    'acadhub_mongo_pool_checkout_seconds', 'Time to check a connection out of the pool',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter('acadhub_mongo_pool_checkout_failures_total', 'Failed pool checkouts', ['reason'])
+
+CACHE_LOOKUPS = Counter('acadhub_cache_lookups_total', 'In-process cache lookups', ['cache', 'result'])
+SCRAPER_REFRESH = Histogram(
+    'acadhub_scraper_refresh_seconds', 'IPU notice scrapes', ['result'],
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+)
+ACTIVITY_LOG_WRITES = Counter('acadhub_activity_log_writes_total', 'Activity log inserts (one per /api request)', ['result'])
+# received = emitted + suppressed (merged into another event) + still pending
+REALTIME_EVENTS = Counter('acadhub_realtime_events_total', 'Realtime change events through the coalescer', ['result'])
+REALTIME_PENDING = Gauge('acadhub_realtime_pending_batches', 'Change events waiting out the coalescing window', multiprocess_mode='livesum')
+RATE_LIMITED = Counter('acadhub_rate_limited_total', 'Requests rejected by the rate limiter', ['route'])
+
+
+def route_label():
+    """The matched URL rule of the current request, or <unmatched> (404s, OPTIONS...)."""
+    return request.url_rule.rule if request.url_rule else '<unmatched>'
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Pool utilization for both clients (api/database.py, api/async_db.py)."""
+
+    def pool_created(self, event):
+        MONGO_POOL_MAX.inc(event.options.get('maxPoolSize') or 0)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass  # clients live as long as the process (the connection manager never closes one)
+
+    def connection_created(self, event):
+        MONGO_POOL_OPEN.inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_OPEN.dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(event.reason).inc()
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_IN_USE.inc()
+        # pymongo >= 4.7 reports how long the checkout took
+        duration = getattr(event, 'duration', None)
+        if duration is not None:
+            MONGO_POOL_WAIT.observe(duration)
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_IN_USE.dec()
+
+
+pool_listener = PoolListener()
+
+
+def on_rate_limit_breach(request_limit):
+    """Flask-Limiter on_breach callback; returning None keeps the default 429."""
+    RATE_LIMITED.labels(route_label()).inc()
+    return None
+
+
+def init_metrics(app):
+    """Per-route request count, latency and response size; registered first so they cover the other middleware."""
+
+    @app.before_request
+    def start_request_timer():
+        request.environ['acadhub.started_at'] = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started_at = request.environ.get('acadhub.started_at')
+        if started_at is None:
+            return response
+        method, route = request.method, route_label()
+        HTTP_REQUESTS.labels(method, route, str(response.status_code)).inc()
+        HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - started_at)
+        if not response.is_streamed:
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(response.calculate_content_length() or 0)
+
+        queries = current_queries()
+        if queries is not None and queries.count:
+            MONGO_COMMANDS.labels(route).inc(queries.count)
+            MONGO_COMMAND_SECONDS.labels(route).inc(queries.duration_ms / 1000)
+        return response
+
+    return app
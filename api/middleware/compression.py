@@ -14,8 +14,8 @@ def init_compression(app):
            'gzip' not in accept_encoding.lower():
             return response
             
-        # Compress responses larger than 1KB
-        if response.direct_passthrough or len(response.data) < 1024:
+        # Compress responses larger than 1KB; streams (SSE) must not be buffered
+        if response.direct_passthrough or response.is_streamed or len(response.data) < 1024:
             return response
             
         response.data = gzip.compress(response.data)
@@ -1,6 +1,7 @@
 from flask import request, abort
 from functools import wraps
 from api.database import db
+from pymongo.errors import ConnectionFailure
 from datetime import datetime
 import ipaddress
 
@@ -23,7 +24,11 @@ def init_honeypot(app):
         client_ip = request.remote_addr
         # Check against Redis/MongoDB (using MongoDB for persistence here)
         blacklist_col = db.get_collection('ip_blacklist')
-        is_blocked = blacklist_col.find_one({'ip': client_ip})
+        try:
+            is_blocked = blacklist_col.find_one({'ip': client_ip})
+        except ConnectionFailure:
+            # Database down: let the request through (health checks, cached routes)
+            is_blocked = None
         
         if is_blocked:
             abort(403, description="Access Denied: Network Security Violation Detected.")
@@ -1,5 +1,6 @@
 from flask import request, session
 from api.database import db
+from api.metrics import ACTIVITY_LOG_WRITES
 from datetime import datetime
 
 def init_activity_logger(app):
@@ -24,5 +25,7 @@ def init_activity_logger(app):
         # Optional: Log to DB asynchronously if possible, or just insert for now
         try:
             db.get_collection('activity_logs').insert_one(log_entry)
+            ACTIVITY_LOG_WRITES.labels('ok').inc()
         except:
+            ACTIVITY_LOG_WRITES.labels('error').inc()
             pass # Don't block request on logging failure
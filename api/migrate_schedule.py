@@ -1,101 +1,130 @@
 import os
 import sys
 import uuid
+import argparse
+from datetime import datetime
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
+# Allow running as `python api/migrate_schedule.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.migrations import Migration, MigrationRunner
+
 # Load env from root
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
 
-MONGO_URI = os.getenv('MONGO_URI')
-if not MONGO_URI:
-    print("Error: MONGO_URI not found in .env")
-    sys.exit(1)
-
-try:
-    client = MongoClient(MONGO_URI)
-    db = client.get_database('attendanceDB')
-    timetable_collection = db.get_collection('timetable')
-    print("Connected to MongoDB.")
-except Exception as e:
-    print(f"Connection failed: {e}")
-    sys.exit(1)
-
-def migrate():
-    # Find all timetables
-    cursor = timetable_collection.find({})
-    count = 0
-    migrated_count = 0
-    
-    days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    
-    for doc in cursor:
-        count += 1
-        schedule = doc.get('schedule', {})
-        if not schedule:
-            continue
-            
-        # Check if it's already new format (Day keys)
-        # New format: keys are days, values are lists
-        # Old format: keys are times e.g. "09:00", values are dicts { "Monday": ... }
-        
-        is_new_format = False
-        if any(d in schedule for d in days_of_week):
-            # Check if value structure is list
-            for d in days_of_week:
-                if d in schedule and isinstance(schedule[d], list):
-                    is_new_format = True
-                    break
-        
-        if is_new_format:
-            print(f"Skipping {doc.get('owner_email')}: Already in new format or mixed.")
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def convert_legacy_schedule(schedule):
+    """
+    Convert Old (Time -> Day -> Slot) to New (Day -> List of Slots).
+    Returns None when the schedule is empty or already in the new format.
+    """
+    if not schedule:
+        return None
+
+    # New format: keys are days, values are lists
+    # Old format: keys are times e.g. "09:00", values are dicts { "Monday": ... }
+    for d in DAYS_OF_WEEK:
+        if d in schedule and isinstance(schedule[d], list):
+            return None
+
+    new_schedule = {day: [] for day in DAYS_OF_WEEK}
+
+    # Old structure detected: keys are times e.g. "09:00 - 10:00" or just keys
+    for time_key, days_map in schedule.items():
+        if not isinstance(days_map, dict):
             continue
-            
-        print(f"Migrating {doc.get('owner_email')}...")
-        
-        # Convert Old (Time -> Day -> Slot) to New (Day -> List of Slots)
-        new_schedule = {day: [] for day in days_of_week}
-        
-        # Iterate over times
-        # Old structure detected: keys are times e.g. "09:00 - 10:00" or just keys
-        for time_key, days_map in schedule.items():
-            if not isinstance(days_map, dict):
-                continue
-                
-            for day_name, slot_data in days_map.items():
-                if day_name in days_of_week and isinstance(slot_data, dict):
-                    # Check if it's a class
-                    if slot_data.get('type') == 'class':
-                        
-                        start_time = slot_data.get('startTime') or "09:00"
-                        end_time = slot_data.get('endTime') or "10:00"
-                        
-                        # Try to parse time_key if it looks like "09:00-10:00"
-                        if '-' in time_key:
-                            parts = time_key.split('-')
-                            if len(parts) == 2:
-                                start_time = parts[0].strip()
-                                end_time = parts[1].strip()
-                        
-                        new_slot = {
-                            "_id": str(slot_data.get('id') or slot_data.get('_id') or str(uuid.uuid4())),
-                            "subject_id": slot_data.get('subjectId'),
-                            "day": day_name,
-                            "start_time": start_time,
-                            "end_time": end_time,
-                            "label": slot_data.get('subjectName') # Optional fallback
-                        }
-                        
-                        new_schedule[day_name].append(new_slot)
-        
-        # Update the document
-        timetable_collection.update_one(
-            {'_id': doc['_id']},
-            {'$set': {'schedule': new_schedule}}
-        )
-        migrated_count += 1
-        
-    print(f"Migration complete. Processed {count} docs, Migrated {migrated_count}.")
+
+        for day_name, slot_data in days_map.items():
+            if day_name in DAYS_OF_WEEK and isinstance(slot_data, dict):
+                # Check if it's a class
+                if slot_data.get('type') == 'class':
+
+                    start_time = slot_data.get('startTime') or "09:00"
+                    end_time = slot_data.get('endTime') or "10:00"
+
+                    # Try to parse time_key if it looks like "09:00-10:00"
+                    if '-' in time_key:
+                        parts = time_key.split('-')
+                        if len(parts) == 2:
+                            start_time = parts[0].strip()
+                            end_time = parts[1].strip()
+
+                    new_slot = {
+                        "_id": str(slot_data.get('id') or slot_data.get('_id') or str(uuid.uuid4())),
+                        "subject_id": slot_data.get('subjectId'),
+                        "day": day_name,
+                        "start_time": start_time,
+                        "end_time": end_time,
+                        "label": slot_data.get('subjectName')  # Optional fallback
+                    }
+
+                    new_schedule[day_name].append(new_slot)
+
+    return new_schedule
+
+
+class LegacyScheduleMigration(Migration):
+    """Rewrite time-keyed timetable schedules into the day-keyed format."""
+    name = 'legacy_schedule_to_days_v1'
+    collection = 'timetable'
+    query = {'schedule': {'$exists': True, '$ne': {}}}
+    projection = {'schedule': 1}
+
+    def transform(self, doc):
+        new_schedule = convert_legacy_schedule(doc.get('schedule'))
+        if new_schedule is None:
+            return None
+        # Bump version/updated_at so open editors and compiled caches notice the change
+        return {
+            '$set': {'schedule': new_schedule, 'updated_at': datetime.utcnow()},
+            '$inc': {'version': 1}
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert legacy time-keyed timetables to the day-keyed format.")
+    parser.add_argument('--batch-size', type=int, default=500, help="Documents read and written per batch")
+    parser.add_argument('--workers', type=int, default=1, help="Parallel workers, each owning an _id range")
+    parser.add_argument('--dry-run', action='store_true', help="Print sample diffs and counts without writing")
+    parser.add_argument('--diff-limit', type=int, default=5, help="How many diffs to print in dry-run mode")
+    parser.add_argument('--throttle', type=float, default=0.0, help="Seconds to sleep between batches")
+    parser.add_argument('--reset', action='store_true', help="Discard saved progress and start from the beginning")
+    return parser.parse_args(argv)
+
+
+def migrate(argv=None):
+    args = parse_args(argv)
+
+    mongo_uri = os.getenv('MONGO_URI')
+    if not mongo_uri:
+        print("Error: MONGO_URI not found in .env")
+        sys.exit(1)
+
+    try:
+        client = MongoClient(mongo_uri)
+        db = client.get_database('attendanceDB')
+        print("Connected to MongoDB.")
+    except Exception as e:
+        print(f"Connection failed: {e}")
+        sys.exit(1)
+
+    runner = MigrationRunner(
+        db,
+        LegacyScheduleMigration(),
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        workers=args.workers,
+        diff_limit=args.diff_limit,
+        throttle=args.throttle
+    )
+    if args.reset:
+        runner.reset()
+    runner.run()
+
 
 if __name__ == "__main__":
     migrate()
@@ -0,0 +1,229 @@
+# api/migrations.py
+# Batched, resumable document migrations (used by migrate_schedule.py and friends)
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from bson import json_util
+from pymongo import UpdateOne
+
+CHECKPOINT_COLLECTION = 'migration_checkpoints'
+PROGRESS_EVERY_BATCHES = 20
+
+
+class Migration:
+    """
+    Subclass and implement `transform`. Everything else has sane defaults.
+
+    transform(doc) returns a pymongo update document (e.g. {'$set': {...}})
+    or None when the document needs no change.
+    """
+    name = None
+    collection = None
+    query = {}
+    projection = None
+
+    def transform(self, doc):
+        raise NotImplementedError
+
+
+class MigrationRunner:
+    """
+    Streams a collection in `_id` order with keyset pagination, applies the
+    migration's updates with one unordered bulk_write per batch and records
+    the last processed `_id` so a rerun continues where it stopped.
+    """
+
+    def __init__(self, db, migration, batch_size=500, dry_run=False, workers=1,
+                 resume=True, diff_limit=5, throttle=0.0, log=print):
+        self.db = db
+        self.migration = migration
+        self.collection = db.get_collection(migration.collection)
+        self.checkpoints = db.get_collection(CHECKPOINT_COLLECTION)
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.workers = max(1, workers)
+        self.resume = resume
+        self.diff_limit = diff_limit
+        self.throttle = throttle
+        self.log = log
+
+        self._lock = threading.Lock()
+        self._diffs_shown = 0
+        self._started = time.time()
+        self.stats = {'scanned': 0, 'changed': 0, 'written': 0, 'batches': 0}
+
+    # --- Checkpoints ---
+
+    def _checkpoint_id(self, part):
+        return f"{self.migration.name}:{part}"
+
+    def _load_checkpoint(self, part):
+        if not self.resume or self.dry_run:
+            return None
+        doc = self.checkpoints.find_one({'_id': self._checkpoint_id(part)})
+        if not doc:
+            return None
+        if doc.get('completed'):
+            return 'completed'
+        return doc.get('last_id')
+
+    def _save_checkpoint(self, part, bounds, last_id, completed=False):
+        if self.dry_run:
+            return
+        self.checkpoints.update_one(
+            {'_id': self._checkpoint_id(part)},
+            {'$set': {
+                'migration': self.migration.name,
+                'part': part,
+                'lower': bounds[0],
+                'upper': bounds[1],
+                'last_id': last_id,
+                'completed': completed,
+                'updated_at': datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+    def reset(self):
+        """Forget all progress so the next run starts from the first document."""
+        self.checkpoints.delete_many({'migration': self.migration.name})
+
+    # --- Partitioning ---
+
+    def _ranges(self):
+        """
+        [(part, lower, upper)]: the ranges of an interrupted run, or the `_id`
+        space split into roughly equal ranges, one per worker. A live run saves
+        every range before any worker starts, so a rerun gets all of them back,
+        including ranges that hadn't finished a batch, under the same part numbers.
+        """
+        if self.resume and not self.dry_run:
+            saved = list(self.checkpoints.find({'migration': self.migration.name}).sort('part', 1))
+            if saved:
+                return [(c['part'], c.get('lower'), c.get('upper')) for c in saved]
+        ranges = [(part, lower, upper) for part, (lower, upper) in enumerate(self._split())]
+        if not self.dry_run:
+            self.reset()  # stale checkpoints of a run we're not resuming
+            for part, lower, upper in ranges:
+                self._save_checkpoint(part, (lower, upper), None)
+        return ranges
+
+    def _split(self):
+        """Split the `_id` space into roughly equal ranges, one per worker."""
+        if self.workers == 1:
+            return [(None, None)]
+        buckets = list(self.collection.aggregate([
+            {'$match': self.migration.query},
+            {'$bucketAuto': {'groupBy': '$_id', 'buckets': self.workers}}
+        ], allowDiskUse=True))
+        if not buckets:
+            return [(None, None)]
+        # Bucket bounds are [min, max] inclusive; make them half-open and unbounded at the ends
+        ranges = []
+        for i, bucket in enumerate(buckets):
+            lower = None if i == 0 else bucket['_id']['min']
+            upper = None if i == len(buckets) - 1 else buckets[i + 1]['_id']['min']
+            ranges.append((lower, upper))
+        return ranges
+
+    # --- Execution ---
+
+    def _record(self, scanned=0, changed=0, written=0):
+        with self._lock:
+            self.stats['scanned'] += scanned
+            self.stats['changed'] += changed
+            self.stats['written'] += written
+            self.stats['batches'] += 1
+            batches = self.stats['batches']
+            snapshot = dict(self.stats)
+        if batches % PROGRESS_EVERY_BATCHES == 0:
+            elapsed = max(time.time() - self._started, 1e-6)
+            self.log(f"  ... {snapshot['scanned']} scanned, {snapshot['changed']} changed "
+                     f"({round(snapshot['scanned'] / elapsed, 1)} docs/s)")
+
+    def _show_diff(self, doc, update):
+        with self._lock:
+            if self._diffs_shown >= self.diff_limit:
+                return
+            self._diffs_shown += 1
+        self.log(f"--- {self.migration.collection} {doc['_id']}")
+        self.log(json.dumps(json.loads(json_util.dumps(update)), indent=2, sort_keys=True))
+
+    def _run_range(self, part, lower, upper):
+        last_id = self._load_checkpoint(part)
+        if last_id == 'completed':
+            self.log(f"[{part}] already completed, skipping")
+            return
+
+        while True:
+            id_filter = {}
+            if last_id is not None:
+                id_filter['$gt'] = last_id
+            elif lower is not None:
+                id_filter['$gte'] = lower
+            if upper is not None:
+                id_filter['$lt'] = upper
+
+            query = dict(self.migration.query)
+            if id_filter:
+                query['_id'] = id_filter
+
+            batch = list(
+                self.collection.find(query, self.migration.projection)
+                .sort('_id', 1)
+                .limit(self.batch_size)
+                .batch_size(self.batch_size)
+            )
+            if not batch:
+                break
+
+            ops = []
+            for doc in batch:
+                update = self.migration.transform(doc)
+                if not update:
+                    continue
+                if self.dry_run:
+                    self._show_diff(doc, update)
+                ops.append(UpdateOne({'_id': doc['_id']}, update))
+
+            written = 0
+            if ops and not self.dry_run:
+                result = self.collection.bulk_write(ops, ordered=False)
+                written = result.modified_count
+
+            last_id = batch[-1]['_id']
+            self._save_checkpoint(part, (lower, upper), last_id)
+            self._record(scanned=len(batch), changed=len(ops), written=written)
+
+            if self.throttle:
+                time.sleep(self.throttle)
+
+        self._save_checkpoint(part, (lower, upper), last_id, completed=True)
+
+    def run(self):
+        started = self._started = time.time()
+        mode = 'DRY RUN' if self.dry_run else 'LIVE'
+        self.log(f"Migration '{self.migration.name}' on '{self.migration.collection}' "
+                 f"({mode}, batch_size={self.batch_size}, workers={self.workers})")
+
+        ranges = self._ranges()
+        if len(ranges) == 1:
+            self._run_range(*ranges[0])
+        else:
+            with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+                futures = [pool.submit(self._run_range, part, lower, upper) for part, lower, upper in ranges]
+                for future in futures:
+                    future.result()
+
+        elapsed = max(time.time() - started, 1e-6)
+        self.stats['elapsed_seconds'] = round(elapsed, 2)
+        self.stats['docs_per_second'] = round(self.stats['scanned'] / elapsed, 1)
+        self.log(
+            f"Done in {self.stats['elapsed_seconds']}s: scanned {self.stats['scanned']}, "
+            f"{'would change' if self.dry_run else 'changed'} {self.stats['changed']}, "
+            f"written {self.stats['written']} ({self.stats['docs_per_second']} docs/s)"
+        )
+        return self.stats
@@ -0,0 +1,179 @@
+# api/notifications.py
+# Materialized per-user notifications, refreshed on attendance/preference writes and by a periodic sweep
+
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, InsertOne, DeleteOne
+from pymongo.errors import BulkWriteError
+from api.database import db
+from api.calculations_v2 import AttendanceCalculator
+from api.async_db import run, find, find_one, in_thread
+
+notifications_collection = db.get_collection('notifications')
+subjects_collection = db.get_collection('subjects')
+preferences_collection = db.get_collection('user_preferences')
+
+DEFAULT_TARGET = 75
+LOW_ATTENDANCE = 'low_attendance'
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+_indexes_ready = False
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    try:
+        # Listing: owner + newest first (the _id order is creation order)
+        notifications_collection.create_index([('owner_email', ASCENDING), ('_id', DESCENDING)])
+        # One live notification per (owner, key); concurrent refreshes can't duplicate it
+        notifications_collection.create_index([('owner_email', ASCENDING), ('key', ASCENDING)], unique=True)
+        _indexes_ready = True
+    except Exception as e:
+        print(f"⚠️ Could not create notifications indexes: {e}")
+
+
+def _target(prefs_doc):
+    try:
+        return float(((prefs_doc or {}).get('preferences') or {}).get('attendance_threshold', DEFAULT_TARGET))
+    except (TypeError, ValueError):
+        return DEFAULT_TARGET
+
+
+def low_attendance_alarms(subjects, target=DEFAULT_TARGET):
+    """{key: notification fields} for subjects below target that need classes to recover."""
+    stats = AttendanceCalculator.calculate_batch(
+        [sub.get('attended', 0) for sub in subjects],
+        [sub.get('total', 0) for sub in subjects],
+        target
+    )
+    target_label = int(target) if float(target).is_integer() else target
+    alarms = {}
+    for i, sub in enumerate(subjects):
+        can_bunk = bool(stats['can_bunk'][i])
+        count = int(stats['count'][i])
+        if can_bunk or count <= 0:
+            continue
+        alarms[f"{LOW_ATTENDANCE}:{sub['_id']}"] = {
+            "type": "warning",
+            "title": "Attendance Warning",
+            "message": f"Critical: {sub.get('name')} is at {float(stats['percentage'][i])}%. {AttendanceCalculator.bunk_status_message(can_bunk, count, target_label)}",
+            "priority": "high",
+            "subject_id": str(sub['_id'])
+        }
+    return alarms
+
+
+def refresh_notifications(user_email, subject_ids=None):
+    """
+    Bring a user's low-attendance notifications in line with their subjects.
+    With subject_ids only those subjects are re-checked (one write path);
+    without, everything is (preference change, import, sweep). A notification
+    whose text changes is re-inserted so it sorts as new and shows unread.
+    Never raises: the write that triggered it has already happened.
+    """
+    try:
+        _ensure_indexes()
+        prefs_doc = preferences_collection.find_one(
+            {'owner_email': user_email},
+            {'preferences.attendance_threshold': 1, 'notifications_refreshed_at': 1}
+        )
+        if not (prefs_doc or {}).get('notifications_refreshed_at'):
+            subject_ids = None  # never materialized: build everything once
+        query = {'owner_email': user_email}
+        key_filter = {'$regex': f'^{LOW_ATTENDANCE}:'}
+        if subject_ids is not None:
+            oids = [ObjectId(sid) if not isinstance(sid, ObjectId) else sid for sid in subject_ids if sid]
+            query['_id'] = {'$in': oids}
+            key_filter = {'$in': [f"{LOW_ATTENDANCE}:{oid}" for oid in oids]}
+
+        subjects = list(subjects_collection.find(query, {'name': 1, 'attended': 1, 'total': 1}))
+        wanted = low_attendance_alarms(subjects, _target(prefs_doc))
+        existing = {
+            doc['key']: doc for doc in notifications_collection.find(
+                {'owner_email': user_email, 'key': key_filter}, {'key': 1, 'message': 1}
+            )
+        }
+
+        now = datetime.utcnow()
+        ops = []
+        for key, doc in existing.items():
+            if key not in wanted or wanted[key]['message'] != doc.get('message'):
+                ops.append(DeleteOne({'_id': doc['_id']}))
+        for key, fields in wanted.items():
+            if key in existing and existing[key].get('message') == fields['message']:
+                continue
+            ops.append(InsertOne({**fields, 'owner_email': user_email, 'key': key, 'read': False, 'created_at': now}))
+        if ops:
+            try:
+                # Unordered: one duplicate must not skip the deletes and inserts after it
+                notifications_collection.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                # Duplicate keys mean a concurrent refresh got there first; anything else is real
+                if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])) \
+                        or e.details.get('writeConcernErrors'):
+                    raise
+        if subject_ids is None:
+            preferences_collection.update_one(
+                {'owner_email': user_email},
+                {'$set': {'notifications_refreshed_at': now}},
+                upsert=True
+            )
+    except Exception as e:
+        print(f"⚠️ Notification refresh failed for {user_email}: {e}")
+
+
+def _item(doc):
+    return {
+        'id': str(doc['_id']),
+        'type': doc.get('type'),
+        'title': doc.get('title'),
+        'message': doc.get('message'),
+        'priority': doc.get('priority'),
+        'subject_id': doc.get('subject_id'),
+        'read': bool(doc.get('read')),
+        'created_at': doc['created_at'].isoformat() if isinstance(doc.get('created_at'), datetime) else doc.get('created_at')
+    }
+
+
+async def list_notifications_async(user_email, before=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    (items, next_cursor): newest first, `limit` per page, continuing below the
+    `before` cursor. Users who were never materialized are built on first use;
+    the first page is read together with the marker that says whether they were.
+    """
+    if not _indexes_ready:
+        await in_thread(_ensure_indexes)
+    query = {'owner_email': user_email}
+    if before:
+        query['_id'] = {'$lt': ObjectId(before)}
+    page = find('notifications', query, sort=[('_id', DESCENDING)], limit=limit + 1)
+
+    if before:
+        docs = await page
+    else:
+        docs, prefs_doc = await asyncio.gather(
+            page, find_one('user_preferences', {'owner_email': user_email}, {'notifications_refreshed_at': 1})
+        )
+        if not docs and not (prefs_doc or {}).get('notifications_refreshed_at'):
+            await in_thread(refresh_notifications, user_email)
+            docs = await find('notifications', query, sort=[('_id', DESCENDING)], limit=limit + 1)
+
+    next_cursor = str(docs[limit - 1]['_id']) if len(docs) > limit else None
+    return [_item(doc) for doc in docs[:limit]], next_cursor
+
+
+def list_notifications(user_email, before=None, limit=DEFAULT_PAGE_SIZE):
+    """Blocking list_notifications_async."""
+    return run(list_notifications_async(user_email, before, limit))
+
+
+def mark_read(user_email, ids=None):
+    """Mark the given notification ids (or all of them) read; returns how many changed."""
+    query = {'owner_email': user_email, 'read': False}
+    if ids is not None:
+        query['_id'] = {'$in': [ObjectId(i) for i in ids]}
+    return notifications_collection.update_many(query, {'$set': {'read': True}}).modified_count
@@ -0,0 +1,259 @@
+# api/profiling.py
+# On-demand request profiling: a sampling profiler plus the request's Mongo commands, stored per request ID
+
+import os
+import sys
+import html
+import time
+import uuid
+import random
+import sysconfig
+import threading
+from collections import Counter
+from datetime import datetime
+from flask import request, session
+from pymongo import DESCENDING
+from api.database import db
+from api.query_stats import current as current_queries
+
+# Which requests are profiled: any request of an admin sending `X-Profile: 1`,
+# a random PROFILE_SAMPLE_RATE share of all requests, and every request of the
+# users in PROFILE_EMAILS (comma-separated, for the "my dashboard is slow" reports)
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_EMAILS = {e.strip().lower() for e in os.getenv('PROFILE_EMAILS', '').split(',') if e.strip()}
+PROFILE_HEADER = 'X-Profile'
+PROFILE_INTERVAL_SECONDS = float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000
+PROFILE_TTL_SECONDS = 7 * 24 * 3600
+# Distinct stacks kept per profile (the rarest are dropped), to stay far below the 16MB document limit
+PROFILE_MAX_STACKS = 2000
+PROFILE_MAX_COMMANDS = 2000
+
+profiles_collection = db.get_collection('request_profiles')
+_indexes_ready = False
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_STDLIB = sysconfig.get_paths()['stdlib'] + os.sep
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    try:
+        profiles_collection.create_index('created_at', expireAfterSeconds=PROFILE_TTL_SECONDS)
+        profiles_collection.create_index([('user_email', 1), ('created_at', DESCENDING)])
+        _indexes_ready = True
+    except Exception as e:
+        print(f"⚠️ Could not create request_profiles indexes: {e}")
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = filename[len(_ROOT):]
+    elif 'site-packages' + os.sep in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    elif filename.startswith(_STDLIB):
+        filename = filename[len(_STDLIB):]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ',')
+
+
+class Sampler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a
+    background thread; the result is collapsed stacks (root;...;leaf -> samples),
+    the input format of flamegraph.pl and speedscope. Sampling instead of
+    tracing keeps the overhead flat, so slow requests stay slow for the same
+    reasons. Needs real threads: under gevent's or eventlet's patched
+    threading the sampler would only run when the request yields.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self._started_at
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        labels = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                names.append(label)
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+                self.samples += 1
+
+
+def _green_threads():
+    gevent_monkey = sys.modules.get('gevent.monkey')
+    if gevent_monkey is not None and gevent_monkey.is_module_patched('threading'):
+        return True
+    eventlet_patcher = sys.modules.get('eventlet.patcher')
+    return eventlet_patcher is not None and eventlet_patcher.is_monkey_patched('thread')
+
+
+def _requested(user_email):
+    if user_email and user_email in PROFILE_EMAILS:
+        return True
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return True
+    if request.headers.get(PROFILE_HEADER) == '1' and user_email:
+        from api.auth import is_admin
+        return is_admin(user_email)
+    return False
+
+
+def _save(profile_id, sampler, queries, response, user_email):
+    stacks = sampler.stacks.most_common(PROFILE_MAX_STACKS)
+    profile = {
+        '_id': profile_id,
+        'user_email': user_email,
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'route': request.url_rule.rule if request.url_rule else None,
+        'status': response.status_code,
+        'duration_ms': round(sampler.elapsed * 1000, 1),
+        'interval_ms': sampler.interval * 1000,
+        'samples': sampler.samples,
+        'stacks': [[stack, count] for stack, count in stacks],
+        'mongo': {
+            'commands': queries.count if queries else 0,
+            'duration_ms': round(queries.duration_ms, 2) if queries else 0,
+            'trace': queries.trace[:PROFILE_MAX_COMMANDS] if queries else []
+        },
+        'created_at': datetime.utcnow()
+    }
+    _ensure_indexes()
+    profiles_collection.insert_one(profile)
+
+
+def collapsed(profile):
+    """The profile's stacks in collapsed format, one `frame;frame;... count` per line."""
+    return ''.join(f"{stack} {count}\n" for stack, count in profile['stacks'])
+
+
+def _tree(stacks):
+    root = {'samples': 0, 'children': {}}
+    for stack, count in stacks:
+        root['samples'] += count
+        node = root
+        for name in stack.split(';'):
+            node = node['children'].setdefault(name, {'samples': 0, 'children': {}})
+            node['samples'] += count
+    return root
+
+
+def _render_node(name, node, total, out):
+    share = node['samples'] / total * 100
+    label = f"<span class=bar style='width:{share:.1f}%'></span><b>{share:.1f}%</b> {html.escape(name)}"
+    children = sorted(node['children'].items(), key=lambda item: item[1]['samples'], reverse=True)
+    if not children:
+        out.append(f"<div class=leaf>{label}</div>")
+        return
+    # Expanded down the hot path, collapsed below 5%
+    out.append(f"<details{' open' if share >= 5 else ''}><summary>{label}</summary>")
+    for child_name, child in children:
+        _render_node(child_name, child, total, out)
+    out.append("</details>")
+
+
+def render_html(profile):
+    """A self-contained page: the call tree by share of samples, then the Mongo commands in order."""
+    tree = _tree(profile['stacks'])
+    out = []
+    for name, node in sorted(tree['children'].items(), key=lambda item: item[1]['samples'], reverse=True):
+        _render_node(name, node, tree['samples'] or 1, out)
+    rows = ''.join(
+        f"<tr><td>{c['at_ms']}</td><td>{c['duration_ms']}</td><td>{html.escape(c['command'])}</td>"
+        f"<td>{c['docs']}</td><td>{'failed' if c['failed'] else ''}</td></tr>"
+        for c in profile['mongo']['trace']
+    )
+    title = html.escape(f"{profile['method']} {profile['path']}")
+    return f"""<!doctype html>
+<html><head><meta charset=utf-8><title>Profile {html.escape(profile['_id'])}</title>
+<style>
+body {{ font: 13px/1.5 ui-monospace, monospace; margin: 24px; color: #222; }}
+details {{ margin-left: 16px; }} .leaf {{ margin-left: 32px; }}
+summary, .leaf {{ position: relative; white-space: nowrap; }}
+.bar {{ position: absolute; left: 0; top: 2px; bottom: 2px; background: #fdd9b5; z-index: -1; }}
+table {{ border-collapse: collapse; }} td, th {{ padding: 2px 12px 2px 0; text-align: left; }}
+</style></head><body>
+<h2>{title}</h2>
+<p>{profile['status']} &middot; {profile['duration_ms']} ms &middot; {profile['samples']} samples every {profile['interval_ms']:g} ms
+&middot; {profile['mongo']['commands']} Mongo commands, {profile['mongo']['duration_ms']} ms
+&middot; {html.escape(str(profile.get('user_email')))} &middot; {profile['created_at']:%Y-%m-%d %H:%M:%S} UTC</p>
+<h3>Call tree</h3>
+{''.join(out) or '<p>No samples (the request finished within one interval).</p>'}
+<h3>Mongo commands</h3>
+<table><tr><th>at ms</th><th>ms</th><th>command</th><th>docs</th><th></th></tr>{rows}</table>
+</body></html>
+"""
+
+
+def init_profiling(app):
+    """
+    Profiles the requests picked by _requested() and answers them with an
+    X-Profile-Id header; the profile is served under /api/v1/profiles/<id>.
+    Registered after the JWT middleware, so mobile admins are recognised.
+    """
+
+    @app.before_request
+    def start_profiler():
+        if _green_threads():
+            return
+        user = session.get('user')
+        user_email = user.get('email', '').lower() if user else None
+        try:
+            if not _requested(user_email):
+                return
+        except Exception:
+            return  # the admin check needs Mongo; never fail the request over profiling
+        queries = current_queries()
+        if queries is not None:
+            queries.trace = []
+        request.environ['acadhub.profiler'] = (
+            uuid.uuid4().hex, Sampler(threading.get_ident()).start(), user_email
+        )
+
+    @app.after_request
+    def finish_profiler(response):
+        entry = request.environ.pop('acadhub.profiler', None)
+        if entry is None:
+            return response
+        profile_id, sampler, user_email = entry
+        sampler.stop()
+        try:
+            _save(profile_id, sampler, current_queries(), response, user_email)
+            response.headers['X-Profile-Id'] = profile_id
+        except Exception as e:
+            print(f"⚠️ Could not store profile {profile_id}: {e}")
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # after_request didn't run (an error escaped the handlers)
+        entry = request.environ.pop('acadhub.profiler', None)
+        if entry is not None:
+            entry[1].stop()
+
+    return app
@@ -0,0 +1,189 @@
+# api/query_stats.py
+# Mongo command monitoring: every command is counted against the Flask request that issued it
+
+import os
+import time
+import logging
+import threading
+import contextvars
+from collections import Counter
+from flask import request
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# A request issuing more commands than this (or waiting on Mongo longer) is
+# logged with its commands grouped by collection, which is where N+1 loops show
+QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', '25'))
+QUERY_TIME_BUDGET_MS = float(os.getenv('QUERY_TIME_BUDGET_MS', '500'))
+
+# The current request's RequestQueries. A context variable rather than flask.g:
+# Motor runs commands on its executor threads, which get a copy of the
+# caller's context but no Flask context (async_db.run and batch.py pass it on)
+_current = contextvars.ContextVar('request_queries', default=None)
+
+_routes = {}
+_routes_lock = threading.Lock()
+
+
+class RequestQueries:
+    """Commands one request issued: count, time spent, documents returned, and by command/collection."""
+
+    __slots__ = ('started_at', 'count', 'duration_ms', 'docs', 'failed', 'by_command', 'trace', '_pending', '_lock')
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.count = 0
+        self.duration_ms = 0.0
+        self.docs = 0
+        self.failed = 0
+        self.by_command = Counter()
+        # Set to a list to keep every command (api/profiling.py does for profiled requests)
+        self.trace = None
+        self._pending = {}
+        # Fan-out (async_db, batch) records from several threads at once
+        self._lock = threading.Lock()
+
+    def command_started(self, request_id, command, collection):
+        with self._lock:
+            self._pending[request_id] = (f"{command} {collection}" if collection else command, time.perf_counter())
+
+    def command_finished(self, request_id, micros, docs=0, failed=False):
+        with self._lock:
+            pending = self._pending.pop(request_id, None)
+            if pending is None:
+                return  # started before the request did
+            label, started_at = pending
+            self.count += 1
+            self.duration_ms += micros / 1000
+            self.docs += docs
+            self.failed += failed
+            self.by_command[label] += 1
+            if self.trace is not None:
+                self.trace.append({
+                    'command': label,
+                    'at_ms': round((started_at - self.started_at) * 1000, 2),
+                    'duration_ms': round(micros / 1000, 2),
+                    'docs': docs,
+                    'failed': failed
+                })
+
+
+def _collection(event):
+    if event.command_name == 'getMore':
+        return event.command.get('collection')
+    target = event.command.get(event.command_name)
+    return target if isinstance(target, str) else None
+
+
+def _docs_returned(reply):
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        return len(cursor.get('firstBatch') or cursor.get('nextBatch') or ())
+    if reply.get('value') is not None:  # findAndModify
+        return 1
+    return 0
+
+
+class QueryListener(monitoring.CommandListener):
+    """Passed to both clients (api/database.py, api/async_db.py) as an event listener."""
+
+    def started(self, event):
+        queries = _current.get()
+        if queries is not None:
+            queries.command_started(event.request_id, event.command_name, _collection(event))
+
+    def succeeded(self, event):
+        queries = _current.get()
+        if queries is not None:
+            queries.command_finished(event.request_id, event.duration_micros, _docs_returned(event.reply))
+
+    def failed(self, event):
+        queries = _current.get()
+        if queries is not None:
+            queries.command_finished(event.request_id, event.duration_micros, failed=True)
+
+
+listener = QueryListener()
+
+
+def current():
+    """The current request's RequestQueries, or None outside a request."""
+    return _current.get()
+
+
+def bind(queries):
+    """Count commands issued from here on (in this context) against `queries`; returns a token for unbind()."""
+    return _current.set(queries)
+
+
+def unbind(token):
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Token from another context (a streamed response finishing elsewhere)
+        _current.set(None)
+
+
+def _record_route(route, queries):
+    with _routes_lock:
+        stats = _routes.get(route)
+        if stats is None:
+            stats = _routes[route] = {'requests': 0, 'commands': 0, 'db_ms': 0.0, 'docs': 0, 'max_commands': 0, 'over_budget': 0}
+        stats['requests'] += 1
+        stats['commands'] += queries.count
+        stats['db_ms'] += queries.duration_ms
+        stats['docs'] += queries.docs
+        stats['max_commands'] = max(stats['max_commands'], queries.count)
+        if queries.count > QUERY_BUDGET or queries.duration_ms > QUERY_TIME_BUDGET_MS:
+            stats['over_budget'] += 1
+
+
+def route_stats():
+    """Per-route totals since the process started, the routes spending the most time in Mongo first."""
+    with _routes_lock:
+        rows = [dict(stats, route=route) for route, stats in _routes.items()]
+    for row in rows:
+        row['avg_commands'] = round(row['commands'] / row['requests'], 1)
+        row['avg_db_ms'] = round(row['db_ms'] / row['requests'], 1)
+        row['db_ms'] = round(row['db_ms'], 1)
+    return sorted(rows, key=lambda row: row['db_ms'], reverse=True)
+
+
+def init_query_stats(app):
+    """
+    Counts each request's Mongo commands, adds a Server-Timing header
+    (visible in the browser's network panel) and logs requests over budget.
+    """
+
+    @app.before_request
+    def start_query_stats():
+        request.environ['acadhub.query_token'] = bind(RequestQueries())
+
+    @app.after_request
+    def finish_query_stats(response):
+        queries = current()
+        if queries is None:
+            return response
+        total_ms = (time.perf_counter() - queries.started_at) * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={queries.duration_ms:.1f};desc="{queries.count} queries", app;dur={total_ms:.1f}'
+        )
+        route = f"{request.method} {request.url_rule.rule if request.url_rule else '<unmatched>'}"
+        _record_route(route, queries)
+        if queries.count > QUERY_BUDGET or queries.duration_ms > QUERY_TIME_BUDGET_MS:
+            breakdown = ', '.join(f"{label} x{n}" for label, n in queries.by_command.most_common(5))
+            logger.warning(
+                f"⚠️  {route}: {queries.count} Mongo commands in {queries.duration_ms:.0f}ms "
+                f"(budget {QUERY_BUDGET} / {QUERY_TIME_BUDGET_MS:.0f}ms): {breakdown}"
+            )
+        return response
+
+    @app.teardown_request
+    def clear_query_stats(exc):
+        token = request.environ.pop('acadhub.query_token', None)
+        if token is not None:
+            unbind(token)
+
+    return app
@@ -1,5 +1,6 @@
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from api.metrics import on_rate_limit_breach
 
 # Rate limiting for production use (50+ concurrent users)
 # Create global limiter instance
@@ -7,7 +8,8 @@ limiter = Limiter(
     key_func=get_remote_address,
     default_limits=["2000 per day", "500 per hour"],
     storage_uri="memory://",  # Use Redis in production for distributed systems
-    strategy="fixed-window"
+    strategy="fixed-window",
+    on_breach=on_rate_limit_breach  # counts rejections per route for /metrics
 )
 
 def init_limiter(app):
@@ -0,0 +1,262 @@
+# api/realtime.py
+# Socket.IO push channel: authenticated per-user rooms and typed change events
+
+import os
+import jwt
+import threading
+from datetime import datetime
+from flask import request, session
+from api import get_socketio
+from api.events import publish_event
+from api.metrics import REALTIME_EVENTS, REALTIME_PENDING
+
+# Event names clients subscribe to; every payload carries the same `type` plus
+# what changed, so a client can refetch only the affected screen
+ATTENDANCE_UPDATED = 'attendance_updated'
+TIMETABLE_UPDATED = 'timetable_updated'
+SUBJECTS_UPDATED = 'subjects_updated'
+RESULTS_UPDATED = 'results_updated'
+NOTES_UPDATED = 'notes_updated'
+EVENTS = (ATTENDANCE_UPDATED, TIMETABLE_UPDATED, SUBJECTS_UPDATED, RESULTS_UPDATED, NOTES_UPDATED)
+
+# Bulk writes (imports, timetable saves, marking a whole day) fire many events
+# for one user; they are held this long and sent as one. 0 sends immediately.
+COALESCE_WINDOW_SECONDS = float(os.getenv('REALTIME_COALESCE_WINDOW', '0.25'))
+
+
+_attached = False
+_attach_lock = threading.Lock()
+
+
+def _attach(app):
+    global _attached
+    with _attach_lock:
+        if 'socketio' in app.extensions:
+            return
+        socketio = get_socketio()
+        if not _attached:
+            socketio.on_event('connect', handle_connect)
+            socketio.on_event('join', handle_join)
+        message_queue = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+        socketio.init_app(app, message_queue=message_queue)
+        if message_queue:
+            print(f"✅ Socket.IO message queue: {message_queue.split('@')[-1]}")
+        _attached = True
+
+
+class _AttachOnFirstSocket:
+    """WSGI wrapper that attaches Socket.IO when the first /socket.io request arrives."""
+
+    def __init__(self, app, wsgi_app):
+        self.app = app
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if 'socketio' not in self.app.extensions and environ.get('PATH_INFO', '').startswith('/socket.io'):
+            _attach(self.app)
+            # Socket.IO's middleware now wraps this one; it passes everything else back here
+            return self.app.wsgi_app(environ, start_response)
+        return self.wsgi_app(environ, start_response)
+
+
+def init_realtime(app, lazy=False):
+    """
+    Attach Socket.IO to the app. With SOCKETIO_MESSAGE_QUEUE (e.g.
+    redis://localhost:6379/0) emits go through the queue, so a write handled
+    by one worker reaches sockets connected to any other.
+
+    lazy: attach on the first /socket.io request instead. Until then no
+    socket can be connected to this process, so emits only go to the SSE
+    feed. A message queue is always attached up front, since other workers'
+    sockets are listening on it.
+    """
+    if lazy and not os.getenv('SOCKETIO_MESSAGE_QUEUE'):
+        app.wsgi_app = _AttachOnFirstSocket(app, app.wsgi_app)
+    else:
+        _attach(app)
+
+
+def authenticated_email(auth=None):
+    """Email of the connecting user from the session cookie or a JWT (auth payload, header or ?token=)."""
+    user = session.get('user')
+    if user and user.get('email'):
+        return user['email'].lower()
+
+    token = auth.get('token') if isinstance(auth, dict) else None
+    if not token:
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            token = header.split(' ', 1)[1]
+    token = token or request.args.get('token')
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, os.getenv('FLASK_SECRET_KEY', 'dev-secret-key'), algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+    return (payload.get('email') or '').lower() or None
+
+
+def handle_connect(auth=None):
+    from flask_socketio import join_room, ConnectionRefusedError
+    user_email = authenticated_email(auth)
+    if not user_email:
+        raise ConnectionRefusedError('unauthorized')
+    session['realtime_email'] = user_email
+    join_room(user_email)
+
+
+def handle_join(data=None):
+    """
+    Older clients ask to join {'room': email} after connecting. The only room
+    a socket may be in is its own user's, whatever is requested.
+    """
+    from flask_socketio import join_room
+    user_email = session.get('realtime_email')
+    if not user_email:
+        return {'ok': False, 'error': 'unauthorized'}
+    join_room(user_email)
+    return {'ok': True, 'room': user_email}
+
+
+def merge_payloads(payloads):
+    """
+    One payload describing a burst of same-type events: the union of the
+    dates, subjects, notes and semesters they touched, the actions in order, and
+    how many events it stands for. Single-valued fields (date, semester)
+    are kept when every event agreed on them; a lone event keeps all of its
+    own fields.
+    """
+    dates, subject_ids, note_ids, semesters, actions = set(), set(), set(), set(), []
+    for payload in payloads:
+        for key in ('date', 'previous_date'):
+            if payload.get(key):
+                dates.add(payload[key])
+        dates.update(payload.get('dates') or ())
+        subject_ids.update(str(sid) for sid in payload.get('subject_ids') or () if sid)
+        if payload.get('subject_id'):
+            subject_ids.add(str(payload['subject_id']))
+        note_ids.update(payload.get('note_ids') or ())
+        if payload.get('semester') is not None:
+            semesters.add(payload['semester'])
+        semesters.update(payload.get('semesters') or ())
+        for action in payload.get('actions') or [payload.get('action')]:
+            if action and action not in actions:
+                actions.append(action)
+
+    last = payloads[-1]
+    if len(payloads) == 1:
+        merged = dict(last)
+    else:
+        merged = {'type': last['type'], 'email': last.get('email'), 'at': last.get('at'), 'action': last.get('action')}
+    if len(dates) == 1:
+        merged['date'] = next(iter(dates))
+    if len(semesters) == 1:
+        merged['semester'] = next(iter(semesters))
+    merged.update({
+        'dates': sorted(dates),
+        'subject_ids': sorted(subject_ids),
+        'note_ids': sorted(note_ids),
+        'semesters': sorted(semesters, key=str),
+        'actions': actions,
+        'coalesced': sum(payload.get('coalesced', 1) for payload in payloads)
+    })
+    return merged
+
+
+class EmitCoalescer:
+    """
+    Buffers change events per (room, event) for `window` seconds and sends
+    one merged payload per key. Keeps counters of what was received, sent
+    and suppressed.
+    """
+
+    def __init__(self, send, window=COALESCE_WINDOW_SECONDS):
+        self._send = send
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.received = 0
+        self.emitted = 0
+
+    def submit(self, room, event, payload):
+        key = (room, event)
+        with self._lock:
+            self.received += 1
+            REALTIME_EVENTS.labels('received').inc()
+            if self.window <= 0:
+                start = False
+            elif key in self._pending:
+                self._pending[key].append(payload)
+                return
+            else:
+                self._pending[key] = [payload]
+                REALTIME_PENDING.set(len(self._pending))
+                start = True
+        if start:
+            # First event of a burst: the flush runs once the window closes
+            timer = threading.Timer(self.window, self.flush, args=(key,))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._emit(room, event, merge_payloads([payload]))
+
+    def flush(self, key=None):
+        """Send pending batches now (one key, or all of them)."""
+        with self._lock:
+            keys = [key] if key is not None else list(self._pending)
+            batches = [(k, self._pending.pop(k)) for k in keys if k in self._pending]
+            REALTIME_PENDING.set(len(self._pending))
+        for (room, event), payloads in batches:
+            if len(payloads) > 1:
+                REALTIME_EVENTS.labels('suppressed').inc(len(payloads) - 1)
+            self._emit(room, event, merge_payloads(payloads))
+
+    def _emit(self, room, event, payload):
+        try:
+            self._send(event, payload, room)
+        except Exception as e:
+            print(f"⚠️ Realtime emit '{event}' failed for {room}: {e}")
+        with self._lock:
+            self.emitted += 1
+        REALTIME_EVENTS.labels('emitted').inc()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'received': self.received,
+                'emitted': self.emitted,
+                'suppressed': self.received - self.emitted - sum(len(p) for p in self._pending.values()),
+                'pending_batches': len(self._pending),
+                'window_seconds': self.window
+            }
+
+
+def _deliver(event, payload, room):
+    # Socket.IO clients and the SSE feed (/api/v1/events) get the same merged event
+    publish_event(room, event, payload)
+    if _attached:
+        get_socketio().emit(event, payload, to=room)
+
+
+_coalescer = EmitCoalescer(_deliver)
+
+
+def emit_stats():
+    """Coalescer counters (events received, emitted and suppressed by merging); /metrics has them as acadhub_realtime_events_total."""
+    return _coalescer.stats()
+
+
+def emit_change(user_email, event, **fields):
+    """
+    Queue a change event for every socket of `user_email`; bursts of the
+    same event are merged (see EmitCoalescer). Called after the write has
+    succeeded; never raises, since the write already happened and clients
+    fall back to refetching on their own.
+    """
+    try:
+        payload = {'type': event, 'email': user_email, 'at': datetime.utcnow().isoformat()}
+        payload.update(fields)
+        _coalescer.submit(user_email, event, payload)
+    except Exception as e:
+        print(f"⚠️ Realtime emit '{event}' failed for {user_email}: {e}")
@@ -0,0 +1,67 @@
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+
+# Allow running as `python api/rebuild_result_summaries.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load env from root before api.database connects
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
+
+from api.results_summary import (
+    semester_results_collection, summaries_collection,
+    verify_result_summary, rebuild_result_summary
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Verify or rebuild the per-user CGPA/SGPA summary documents.")
+    parser.add_argument('--email', action='append', help="Only check this user (repeatable)")
+    parser.add_argument('--fix', action='store_true', help="Rebuild summaries that are out of sync")
+    parser.add_argument('--rebuild-all', action='store_true', help="Rebuild every summary without comparing first")
+    parser.add_argument('--quiet', action='store_true', help="Only print the final counts")
+    return parser.parse_args(argv)
+
+
+def _all_users():
+    """Everyone with results, plus summaries left behind by users who no longer have any."""
+    emails = {row['_id'] for row in semester_results_collection.aggregate(
+        [{'$group': {'_id': '$owner_email'}}], allowDiskUse=True
+    )}
+    emails.update(doc['_id'] for doc in summaries_collection.find({}, {'_id': 1}))
+    emails.discard(None)
+    return sorted(emails)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    emails = [e.lower() for e in args.email] if args.email else _all_users()
+
+    checked = drifted = rebuilt = 0
+    for email in emails:
+        checked += 1
+        if args.rebuild_all:
+            rebuild_result_summary(email)
+            rebuilt += 1
+            continue
+
+        problems = verify_result_summary(email)
+        if not problems:
+            continue
+        drifted += 1
+        if not args.quiet:
+            print(f"✗ {email}")
+            for problem in problems:
+                print(f"    {problem}")
+        if args.fix:
+            rebuild_result_summary(email)
+            rebuilt += 1
+
+    print(f"Checked {checked} users: {drifted} out of sync, {rebuilt} rebuilt.")
+    # Non-zero exit lets cron/CI flag drift when not fixing
+    return 1 if drifted and not args.fix else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
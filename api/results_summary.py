@@ -0,0 +1,190 @@
+# api/results_summary.py
+# Per-user running totals of credits and grade points, kept in step with semester_results
+
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from api.database import db
+from api.grading import sgpa_totals
+
+semester_results_collection = db.get_collection('semester_results')
+summaries_collection = db.get_collection('result_summaries')
+
+# A summary still marked with pending writes this long after the last one
+# started belongs to a save that died between its two writes: reads rebuild it
+PENDING_WRITE_GRACE_SECONDS = 60
+
+
+def semester_totals(subjects):
+    """(credits, grade_points) for one semester's processed subjects."""
+    credits, points = sgpa_totals(subjects or [])
+    return credits, round(points, 2)
+
+
+def _semester_entry(semester, subjects):
+    credits, points = semester_totals(subjects)
+    return {
+        'semester': semester,
+        'credits': credits,
+        'grade_points': points,
+        'sgpa': round(points / credits, 2) if credits else 0.0,
+        'courses': len(subjects or [])
+    }
+
+
+def build_summary(user_email, results):
+    """Summary document computed from scratch from a user's semester_results docs."""
+    semesters = {}
+    for res in results:
+        semester = res.get('semester')
+        if semester is None:
+            continue
+        semesters[str(semester)] = _semester_entry(semester, res.get('subjects', []))
+    return {
+        '_id': user_email,
+        'semesters': semesters,
+        'total_credits': sum(s['credits'] for s in semesters.values()),
+        'total_grade_points': round(sum(s['grade_points'] for s in semesters.values()), 2),
+        'updated_at': datetime.utcnow()
+    }
+
+
+def summary_view(doc):
+    """API shape: cumulative CGPA plus per-semester SGPA and running CGPA, in semester order."""
+    if not doc:
+        return {'cgpa': 0.0, 'total_credits': 0, 'total_grade_points': 0.0, 'semesters': []}
+    semesters = sorted(doc.get('semesters', {}).values(), key=lambda s: s['semester'])
+    credits = points = 0
+    for sem in semesters:
+        credits += sem['credits']
+        points += sem['grade_points']
+        sem['cgpa'] = round(points / credits, 2) if credits else 0.0
+    total_credits = doc.get('total_credits', 0)
+    total_points = doc.get('total_grade_points', 0.0)
+    return {
+        'cgpa': round(total_points / total_credits, 2) if total_credits else 0.0,
+        'total_credits': total_credits,
+        'total_grade_points': round(total_points, 2),
+        'semesters': semesters
+    }
+
+
+def rebuild_result_summary(user_email):
+    """Recompute a user's summary from semester_results and replace the stored one."""
+    results = list(semester_results_collection.find({'owner_email': user_email}, {'semester': 1, 'subjects': 1}))
+    if not results:
+        summaries_collection.delete_one({'_id': user_email})
+        return None
+    summary = build_summary(user_email, results)
+    summaries_collection.replace_one({'_id': user_email}, summary, upsert=True)
+    return summary
+
+
+def _interrupted(doc):
+    if doc.get('pending_writes', 0) <= 0:
+        return False
+    started = doc.get('pending_since') or datetime.min
+    return datetime.utcnow() - started > timedelta(seconds=PENDING_WRITE_GRACE_SECONDS)
+
+
+def get_result_summary(user_email):
+    """Stored summary, rebuilt on first use (results predating it) and after an interrupted save."""
+    doc = summaries_collection.find_one({'_id': user_email})
+    if doc is None or _interrupted(doc):
+        doc = rebuild_result_summary(user_email)
+    return doc
+
+
+def _mark_pending(user_email):
+    """
+    Flag the summary before the result write; _apply_delta clears the flag in
+    the same update that moves the totals. A counter, so overlapping saves
+    don't clear each other's mark.
+    """
+    summaries_collection.update_one(
+        {'_id': user_email},
+        {'$inc': {'pending_writes': 1}, '$set': {'pending_since': datetime.utcnow()}}
+    )
+
+
+def _apply_delta(user_email, semester, old_subjects, new_subjects):
+    """
+    Shift the running totals from the old semester contents to the new ones
+    and clear this save's pending mark, in a single update. A user without a
+    summary yet gets a full rebuild.
+    """
+    old_credits, old_points = semester_totals(old_subjects) if old_subjects is not None else (0, 0.0)
+    update = {'$set': {'updated_at': datetime.utcnow()}}
+    if new_subjects is None:
+        new_credits, new_points = 0, 0.0
+        update['$unset'] = {f'semesters.{semester}': ''}
+    else:
+        entry = _semester_entry(semester, new_subjects)
+        new_credits, new_points = entry['credits'], entry['grade_points']
+        update['$set'][f'semesters.{semester}'] = entry
+    update['$inc'] = {
+        'total_credits': new_credits - old_credits,
+        'total_grade_points': round(new_points - old_points, 2),
+        'pending_writes': -1
+    }
+
+    # No pending mark: a rebuild ran since ours was set and may already include this write
+    result = summaries_collection.update_one({'_id': user_email, 'pending_writes': {'$gt': 0}}, update)
+    if result.matched_count == 0:
+        rebuild_result_summary(user_email)
+
+
+def save_semester_result(user_email, semester, result_doc):
+    """
+    Upsert one semester's result and move the summary totals by the
+    difference. The BEFORE image comes back from the same atomic write, so
+    concurrent saves of a semester each apply their own delta.
+    """
+    _mark_pending(user_email)
+    previous = semester_results_collection.find_one_and_update(
+        {'owner_email': user_email, 'semester': semester},
+        {'$set': result_doc},
+        projection={'subjects': 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    _apply_delta(user_email, semester, previous.get('subjects', []) if previous else None,
+                 result_doc.get('subjects', []))
+
+
+def delete_semester_result(user_email, semester):
+    """Delete one semester's result and take it out of the summary."""
+    _mark_pending(user_email)
+    previous = semester_results_collection.find_one_and_delete(
+        {'owner_email': user_email, 'semester': semester},
+        projection={'subjects': 1}
+    )
+    if previous:
+        _apply_delta(user_email, semester, previous.get('subjects', []), None)
+    else:
+        summaries_collection.update_one({'_id': user_email, 'pending_writes': {'$gt': 0}}, {'$inc': {'pending_writes': -1}})
+    return previous is not None
+
+
+def verify_result_summary(user_email):
+    """
+    Compare the stored summary against a from-scratch build.
+    Returns a list of human-readable differences (empty when in sync).
+    """
+    stored = summaries_collection.find_one({'_id': user_email}) or {}
+    results = list(semester_results_collection.find({'owner_email': user_email}, {'semester': 1, 'subjects': 1}))
+    expected = build_summary(user_email, results) if results else {}
+
+    problems = []
+    for field in ('total_credits', 'total_grade_points'):
+        if round(stored.get(field, 0), 2) != round(expected.get(field, 0), 2):
+            problems.append(f"{field}: stored {stored.get(field)} expected {expected.get(field)}")
+    stored_sems = stored.get('semesters', {})
+    expected_sems = expected.get('semesters', {})
+    for key in sorted(set(stored_sems) | set(expected_sems)):
+        have, want = stored_sems.get(key), expected_sems.get(key)
+        if have is None or want is None:
+            problems.append(f"semester {key}: {'missing' if have is None else 'unexpected'} in summary")
+        elif (have['credits'], round(have['grade_points'], 2)) != (want['credits'], round(want['grade_points'], 2)):
+            problems.append(f"semester {key}: stored {have['credits']}cr/{have['grade_points']}gp "
+                            f"expected {want['credits']}cr/{want['grade_points']}gp")
+    return problems
@@ -2,7 +2,13 @@ from flask import Blueprint, request, session, jsonify, Response, send_file
 from api.database import db
 from api.utils.response import success_response, error_response
 
-from api.calculations_v2 import GradeCalculator
+from api.grading import grade_semester
+from api.calculations_v2 import CGPAPlanner
+from api.timetable_index import invalidate_timetable_cache
+from api.attendance_bitmap import drop_user_bitmaps
+from api.notifications import refresh_notifications
+from api.realtime import emit_change, ATTENDANCE_UPDATED, SUBJECTS_UPDATED, RESULTS_UPDATED
+from api.results_summary import get_result_summary, summary_view, save_semester_result, delete_semester_result
 from bson import ObjectId, json_util
 from datetime import datetime
 import logging
@@ -91,6 +97,7 @@ def add_subject():
     
     result = subjects_collection.insert_one(new_subject)
     log_user_action(user_email, "Subject Added", f"Added '{name}' to semester {semester}")
+    emit_change(user_email, SUBJECTS_UPDATED, action='created', subject_id=str(result.inserted_id), semester=int(semester))
     
     return success_response({"id": str(result.inserted_id)})
 
@@ -120,6 +127,10 @@ def delete_subject(subject_id):
         subjects_collection.delete_one({"_id": sid})
         # Cleanup logs
         db.get_collection('attendance_logs').delete_many({"subject_id": sid})
+        drop_user_bitmaps(user_email, sid)
+        refresh_notifications(user_email, [sid])
+        invalidate_timetable_cache(user_email)
+        emit_change(user_email, SUBJECTS_UPDATED, action='deleted', subject_id=subject_id, semester=subject.get('semester'))
         
         log_user_action(user_email, "Subject Deleted", f"Deleted subject '{subject.get('name')}'")
         return success_response({"message": "Subject deleted"})
@@ -177,6 +188,15 @@ def update_subject_details(subject_id):
         
         if result.matched_count == 0:
             return error_response("Subject not found during update", "UPDATE_FAILED", status_code=404)
+
+        # Compiled timetables embed subject names/codes
+        if 'name' in update_data or 'code' in update_data:
+            invalidate_timetable_cache(user_email)
+        # Notification text names the subject
+        if 'name' in update_data:
+            refresh_notifications(user_email, [sid])
+        emit_change(user_email, SUBJECTS_UPDATED, action='updated', subject_id=subject_id,
+                    semester=update_data.get('semester', subject.get('semester')))
             
         return success_response({"message": "Subject updated"})
     except Exception as e:
@@ -199,6 +219,8 @@ def update_attendance_count(subject_id):
             {"_id": sid, "owner_email": user_email},
             {"$set": {"attended": attended, "total": total}}
         )
+        refresh_notifications(user_email, [sid])
+        emit_change(user_email, ATTENDANCE_UPDATED, action='count_set', subject_ids=[subject_id])
         return success_response({"message": "Attendance count updated"})
     except Exception as e:
         logger.error(f"Failed to update attendance count {subject_id}: {str(e)}")
@@ -213,13 +235,11 @@ def handle_results(semester=None):
     
     if request.method == 'GET':
         results = list(semester_results_collection.find({'owner_email': user_email}).sort('semester', 1))
-        # Recalculate CGPA for the response
+        # CGPA comes from the running totals instead of re-grading every semester
         if results:
-            # Prepare data for CGPA calculation: list of list of courses
-            semesters_data = [res.get('subjects', []) for res in results]
-            cgpa_calc = GradeCalculator.calculate_cgpa(semesters_data)
+            cgpa = summary_view(get_result_summary(user_email))['cgpa']
             for res in results:
-                res['cgpa'] = cgpa_calc['cgpa']
+                res['cgpa'] = cgpa
         import json
         return success_response(json.loads(json_util.dumps(results)))
     
@@ -228,20 +248,10 @@ def handle_results(semester=None):
         semester = int(data.get('semester'))
         subjects_data = data.get('subjects', [])
         
-        processed_subjects = []
-        for sub in subjects_data:
-            processed = GradeCalculator.calculate_subject_result(sub)
-            # Preserve original input data (marks)
-            final_sub = sub.copy()
-            final_sub.update(processed)
-            final_sub.update({
-                'name': sub.get('name'),
-                'code': sub.get('code', ''),
-                'credits': int(sub.get('credits', 0))
-            })
-            processed_subjects.append(final_sub)
-            
-        sgpa_calc = GradeCalculator.calculate_sgpa(processed_subjects)
+        # One pass grades every subject and totals the semester
+        graded = grade_semester(subjects_data)
+        processed_subjects = graded['subjects']
+        sgpa_calc = {'sgpa': graded['sgpa'], 'total_credits': graded['total_credits']}
         
         result_doc = {
             'owner_email': user_email,
@@ -252,13 +262,10 @@ def handle_results(semester=None):
             'updated_at': datetime.utcnow()
         }
         
-        semester_results_collection.update_one(
-            {'owner_email': user_email, 'semester': semester},
-            {'$set': result_doc},
-            upsert=True
-        )
+        save_semester_result(user_email, semester, result_doc)
         
         log_user_action(user_email, "Result Updated", f"Semester {semester} result saved. SGPA: {sgpa_calc['sgpa']}")
+        emit_change(user_email, RESULTS_UPDATED, action='saved', semester=semester)
         return success_response({"sgpa": sgpa_calc['sgpa']})
 
     if request.method == 'DELETE':
@@ -267,10 +274,63 @@ def handle_results(semester=None):
             # Frontend calls DELETE /api/semester_results/1
             return error_response("Semester required", "MISSING_FIELD")
         
-        semester_results_collection.delete_one({'owner_email': user_email, 'semester': semester})
+        delete_semester_result(user_email, semester)
         log_user_action(user_email, "Result Deleted", f"Deleted results for Semester {semester}")
+        emit_change(user_email, RESULTS_UPDATED, action='deleted', semester=semester)
         return success_response({"message": f"Semester {semester} results deleted"})
 
+@academic_bp.route('/results/summary', methods=['GET'])
+def get_results_summary():
+    """CGPA, total credits and per-semester SGPA from the stored running totals."""
+    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", status_code=401)
+    user_email = session['user']['email'].lower()
+    return success_response(summary_view(get_result_summary(user_email)))
+
+PLAN_MAX_SEMESTERS = 12
+PLAN_MAX_COURSES = 20
+
+@academic_bp.route('/results/plan', methods=['POST'])
+def plan_target_cgpa():
+    """
+    Minimum SGPA, and per-course grades, needed to reach a target CGPA.
+    Body: {"target_cgpa": 8.5, "remaining": [
+        {"semester": 5, "courses": [{"name": "DBMS", "credits": 4}, ...]},
+        {"semester": 6, "total_credits": 24}
+    ]}
+    Completed credits and points come from the stored results summary.
+    """
+    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", status_code=401)
+    user_email = session['user']['email'].lower()
+    data = request.json or {}
+
+    try:
+        target = float(data.get('target_cgpa'))
+    except (TypeError, ValueError):
+        return error_response("target_cgpa is required", "MISSING_FIELD", status_code=400)
+    if not 0 < target <= 10:
+        return error_response("target_cgpa must be between 0 and 10", "INVALID_PARAMS", status_code=400)
+
+    remaining = data.get('remaining') or []
+    if not isinstance(remaining, list) or len(remaining) > PLAN_MAX_SEMESTERS:
+        return error_response(f"remaining must be a list of at most {PLAN_MAX_SEMESTERS} semesters", "INVALID_PARAMS", status_code=400)
+    cleaned = []
+    try:
+        for sem in remaining:
+            courses = sem.get('courses') or []
+            if len(courses) > PLAN_MAX_COURSES:
+                return error_response(f"At most {PLAN_MAX_COURSES} courses per semester", "INVALID_PARAMS", status_code=400)
+            courses = [{'name': c.get('name'), 'credits': int(c.get('credits', 0) or 0)} for c in courses]
+            total_credits = int(sem.get('total_credits', 0) or 0)
+            if any(not 0 <= c['credits'] <= 10 for c in courses) or not 0 <= total_credits <= 60:
+                return error_response("Credits out of range", "INVALID_PARAMS", status_code=400)
+            cleaned.append({'semester': sem.get('semester'), 'courses': courses, 'total_credits': total_credits})
+    except (AttributeError, TypeError, ValueError):
+        return error_response("Invalid remaining semesters", "INVALID_PARAMS", status_code=400)
+
+    summary = summary_view(get_result_summary(user_email))
+    plan = CGPAPlanner.plan(summary['total_credits'], summary['total_grade_points'], cleaned, target)
+    return success_response(plan)
+
 @academic_bp.route('/courses/manual', methods=['GET', 'POST'])
 def handle_manual_courses():
     """Handles online courses (Python, Digital Marketing, etc.) distinct from academic subjects."""
@@ -3,6 +3,10 @@ import json
 from api.database import db
 from api.utils.response import success_response, error_response
 from api.calculations_v2 import AttendanceCalculator
+from api.timetable_index import get_slots_for_date
+from api import attendance_bitmap
+from api.notifications import refresh_notifications
+from api.realtime import emit_change, ATTENDANCE_UPDATED
 from bson import ObjectId, json_util
 from datetime import datetime
 import calendar
@@ -26,6 +30,13 @@ def create_system_log(user_email, action, description):
         'timestamp': datetime.utcnow()
     })
 
+def _log_semester(log):
+    """Semester a log belongs to; older logs only have it on the subject."""
+    if log.get('semester') is not None:
+        return log['semester']
+    subject = subjects_collection.find_one({'_id': log.get('subject_id')}, {'semester': 1})
+    return (subject or {}).get('semester')
+
 @attendance_bp.route('/mark', methods=['POST'])
 def mark_attendance():
     if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", 401)
@@ -74,6 +85,8 @@ def mark_attendance():
             except: pass 
         
         attendance_log_collection.insert_one(log_entry)
+        attendance_bitmap.record_change(user_email, subject_id, subject.get('semester'), 'mark',
+                                        log_entry['_id'], date_str, status)
         
         # 2. Update stats
         update_query = {}
@@ -90,7 +103,7 @@ def mark_attendance():
             sub_id = sub_oid
             sub_subject = subjects_collection.find_one({'_id': sub_id})
             if sub_subject:
-                 attendance_log_collection.insert_one({
+                 sub_log = attendance_log_collection.insert_one({
                     "subject_id": sub_id,
                     "owner_email": user_email,
                     "date": date_str,
@@ -100,9 +113,17 @@ def mark_attendance():
                     "semester": sub_subject.get('semester'),
                     "notes": f"Substituted {subject.get('name')}"
                 })
+                 attendance_bitmap.record_change(user_email, sub_id, sub_subject.get('semester'), 'mark',
+                                                 sub_log.inserted_id, date_str, 'present')
                  subjects_collection.update_one({'_id': sub_id}, {'$inc': {'total': 1, 'attended': 1}})
+                 refresh_notifications(user_email, [sub_id])
+
+        if update_query:
+            refresh_notifications(user_email, [subject_id])
             
         create_system_log(user_email, "Attendance Marked", f"Marked '{subject.get('name')}' as {status} for {date_str}.")
+        changed = [subject_id_str] + ([str(sub_oid)] if status == 'substituted' and sub_oid else [])
+        emit_change(user_email, ATTENDANCE_UPDATED, action='marked', date=date_str, subject_ids=changed)
         return success_response({"message": "Attendance marked successfully"})
 
     except Exception as e:
@@ -186,67 +207,30 @@ def get_attendance_logs():
         # Don't return 500, return empty list or specific error to prevent app crash
         return error_response("Failed to fetch logs", "FETCH_FAILED")
 
-@attendance_bp.route('/classes-for-date', methods=['GET'])
-def get_classes_for_date():
-    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", 401)
-    date_str = request.args.get('date')
-    if not date_str: return error_response("Date parameter required", "MISSING_PARAM")
-
-    try:
-        target_date = datetime.strptime(date_str, "%Y-%m-%d")
-    except: return error_response("Invalid date format", "INVALID_DATE")
-
-    user_email = session['user']['email'].lower()  # ✅ Normalized
-    semester = request.args.get('semester', type=int)
-    
-    print(f"DTO Classes Fetch: {date_str} (sem: {semester}) user: {user_email}")
-    
-    # Use hardcoded English day names to match Timetable.tsx exactly
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    day_name = days[target_date.weekday()]
-    
-    timetable_doc = timetable_collection.find_one({'owner_email': user_email, 'semester': semester})
-    if not timetable_doc and semester == 1:
-        timetable_doc = timetable_collection.find_one({'owner_email': user_email})
-
-    if not timetable_doc: 
-        print("DTO No Timetable found")
-        return success_response([])
-
+def match_slots_to_logs(day_slots, logs):
+    """
+    Pair a day's compiled slots with that day's logs and return the
+    classes-for-date rows (marked_status/log_id filled where a log matched).
+    """
     slots_to_return = []
-    schedule = timetable_doc.get('schedule', {})
-    day_slots = schedule.get(day_name, []) if isinstance(schedule, dict) else []
-
-    print(f"DTO Found {len(day_slots)} slots for {day_name}")
-
     for slot in day_slots:
-        sid = slot.get('subject_id') or slot.get('subjectId')
-        if sid:
-            # Handle ObjectId conversion if string
-            if isinstance(sid, str):
-                try: sid = ObjectId(sid)
-                except: pass
-                
-            subject = subjects_collection.find_one({"_id": sid})
-            if subject:
-                slots_to_return.append({
-                    "id": str(sid),
-                    "name": subject.get('name'),
-                    "time": slot.get('start_time', '09:00 AM'),
-                    "end_time": slot.get('end_time', '10:00 AM'),
-                    "type": slot.get('type', 'Lecture'),
-                    "marked_status": "pending"
-                })
-            else:
-                 print(f"DTO Subject not found for ID: {sid}")
+        slots_to_return.append({
+            "id": slot['subject_id'],
+            "name": slot['name'],
+            "time": slot['start_time'],
+            "end_time": slot['end_time'],
+            "type": slot['type'],
+            "marked_status": "pending",
+            "_start_min": slot['start_min'],
+            "_end_min": slot['end_min']
+        })
 
-    logs = list(attendance_log_collection.find({'owner_email': user_email, 'date': date_str}))
     processed_log_ids = set()
     
     # Matching logic: Assign logs to slots based on chronological order of same subject
     for sid in set([s['id'] for s in slots_to_return]):
-        # Get slots for this specific subject, sorted by time
-        subj_slots = sorted([s for s in slots_to_return if s['id'] == sid], key=lambda x: x.get('time', ''))
+        # Slots are already in start-time order from the compiled index
+        subj_slots = [s for s in slots_to_return if s['id'] == sid]
         # Get logs for this specific subject on this date, sorted by mark-time (timestamp)
         subj_logs = sorted([l for l in logs if str(l.get('subject_id')) == sid], key=lambda x: x.get('timestamp', datetime.min))
         
@@ -267,10 +251,11 @@ def get_classes_for_date():
                 # (This handles double blocks with 1 mark vs separate marks)
                 if (i + 1) < len(subj_slots):
                     next_slot = subj_slots[i+1]
-                    # Simple continuity check: if end_time of current == start_time of next
-                    # We normalize "09:30 AM" -> "09:30" for comparison if needed, 
-                    # but usually they match exactly if from same system
-                    is_contiguous = (slot.get('end_time') == next_slot.get('time'))
+                    # Continuity check on parsed minutes, falling back to the raw strings
+                    if slot['_end_min'] is not None and next_slot['_start_min'] is not None:
+                        is_contiguous = slot['_end_min'] == next_slot['_start_min']
+                    else:
+                        is_contiguous = (slot.get('end_time') == next_slot.get('time'))
                     
                     logs_remaining = len(subj_logs) - (current_log_idx + 1)
                     if not is_contiguous or logs_remaining > 0:
@@ -283,8 +268,32 @@ def get_classes_for_date():
                 if log.get('substituted_by'):
                     slot['substituted_by'] = str(log.get('substituted_by'))
 
-    import json
-    return success_response(json.loads(json_util.dumps(slots_to_return)))
+    for slot in slots_to_return:
+        slot.pop('_start_min', None)
+        slot.pop('_end_min', None)
+
+    return slots_to_return
+
+@attendance_bp.route('/classes-for-date', methods=['GET'])
+def get_classes_for_date():
+    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", 401)
+    date_str = request.args.get('date')
+    if not date_str: return error_response("Date parameter required", "MISSING_PARAM")
+
+    try:
+        target_date = datetime.strptime(date_str, "%Y-%m-%d")
+    except: return error_response("Invalid date format", "INVALID_DATE")
+
+    user_email = session['user']['email'].lower()  # ✅ Normalized
+    semester = request.args.get('semester', type=int)
+    
+    # Compiled per-weekday slots: one cached dict lookup instead of re-reading the timetable
+    day_slots = get_slots_for_date(user_email, semester, target_date)
+    if not day_slots:
+        return success_response([])
+
+    logs = list(attendance_log_collection.find({'owner_email': user_email, 'date': date_str}))
+    return success_response(json.loads(json_util.dumps(match_slots_to_logs(day_slots, logs))))
 
 @attendance_bp.route('/logs/<log_id>', methods=['PUT'])
 @attendance_bp.route('/edit_attendance/<log_id>', methods=['POST'])
@@ -311,6 +320,8 @@ def edit_attendance(log_id):
             {"_id": ObjectId(log_id)},
             {'$set': update_fields}
         )
+        attendance_bitmap.record_change(user_email, log.get('subject_id'), _log_semester(log), 'edit', log['_id'],
+                                        update_fields.get('date'), update_fields.get('status'))
         
         # Update Stats if status changed
         if old_status != new_status:
@@ -334,8 +345,11 @@ def edit_attendance(log_id):
                 final_inc = {k: v for k, v in inc_updates.items() if v != 0}
                 if final_inc:
                     subjects_collection.update_one({'_id': subject_id}, {'$inc': final_inc})
+                    refresh_notifications(user_email, [subject_id])
 
         create_system_log(user_email, "Attendance Updated", f"Updated record for {log.get('subject_name')}")
+        emit_change(user_email, ATTENDANCE_UPDATED, action='edited', date=update_fields.get('date', log.get('date')),
+                    previous_date=log.get('date'), subject_ids=[str(log.get('subject_id'))], log_id=log_id)
         return success_response({"message": "Updated successfully"})
         
     except Exception as e:
@@ -374,13 +388,51 @@ def delete_attendance(log_id):
                  logger.error(f"Failed to update stats on delete: {e}")
         
         attendance_log_collection.delete_one({"_id": log_oid})
+        attendance_bitmap.record_change(user_email, subject_id, _log_semester(log), 'delete', log_oid)
+        if update_query and subject_id:
+            refresh_notifications(user_email, [subject_id])
         create_system_log(user_email, "Attendance Deleted", f"Deleted record for {log.get('subject_name', 'Unknown Class')}")
+        emit_change(user_email, ATTENDANCE_UPDATED, action='deleted', date=log.get('date'),
+                    subject_ids=[str(subject_id)], log_id=log_id)
         
         return success_response({"message": "Deleted successfully"})
     except Exception as e:
         logger.error(f"Delete failed: {e}")
         return error_response("Failed to delete", "DELETE_FAILED")
 
+@attendance_bp.route('/stats/<subject_id>', methods=['GET'])
+def get_subject_stats(subject_id):
+    """
+    Percentage, windowed stats and trend for one subject from its compact
+    attendance bitmap (no log scan).
+    Query params: last (classes), from / to (YYYY-MM-DD), bucket (classes per trend point).
+    """
+    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", status_code=401)
+    user_email = session['user']['email'].lower()
+
+    try:
+        sid = ObjectId(subject_id)
+    except Exception:
+        return error_response("Invalid Subject ID", "INVALID_ID", status_code=400)
+    subject = subjects_collection.find_one({'_id': sid, 'owner_email': user_email}, {'name': 1, 'semester': 1})
+    if not subject: return error_response("Subject not found", "NOT_FOUND", status_code=404)
+
+    last = request.args.get('last', type=int)
+    bucket = max(1, min(request.args.get('bucket', type=int, default=attendance_bitmap.TREND_BUCKET), 100))
+    doc = attendance_bitmap.get_bitmap(user_email, sid, subject.get('semester'))
+
+    return success_response({
+        'subject_id': subject_id,
+        'name': subject.get('name'),
+        'attended': doc.get('attended_count', 0),
+        'total': doc.get('total', 0),
+        'percentage': attendance_bitmap.percentage(doc),
+        'window': attendance_bitmap.window_stats(
+            doc, start=request.args.get('from'), end=request.args.get('to'), last=last
+        ),
+        'trend': attendance_bitmap.trend(doc, bucket)
+    })
+
 @attendance_bp.route('/calendar_data', methods=['GET'])
 def get_calendar_data():
     if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", 401)
@@ -0,0 +1,145 @@
+from flask import Blueprint, session, request, current_app
+from api.utils.response import success_response, error_response
+from api.rate_limiter import limiter, MODERATE_LIMIT
+from api import query_stats
+from api.middleware.honeypot import HONEYPOT_PATHS
+from werkzeug.exceptions import HTTPException
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qsl, unquote
+import copy
+import logging
+
+logger = logging.getLogger(__name__)
+
+batch_bp = Blueprint('batch', __name__)
+
+BATCH_MAX_REQUESTS = 20
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+_batch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='batch')
+
+
+def _parse_item(index, item):
+    """Validated (id, method, path, query, body) for one sub-request, or an error message."""
+    if not isinstance(item, dict):
+        return None, f"requests[{index}] must be an object"
+    method = str(item.get('method', 'GET')).upper()
+    if method not in BATCH_METHODS:
+        return None, f"requests[{index}]: unsupported method {method}"
+    parts = urlsplit(str(item.get('path') or ''))
+    if not parts.path.startswith('/api/') or parts.scheme or parts.netloc:
+        return None, f"requests[{index}]: path must be an /api/ path"
+    # Sub-requests skip the before_request chain, so the honeypot never sees them
+    path = unquote(parts.path).lower()
+    if '..' in path.split('/') or any(path.startswith(hp) for hp in HONEYPOT_PATHS):
+        return None, f"requests[{index}]: path not allowed"
+    query = item.get('query') or {}
+    if not isinstance(query, dict):
+        return None, f"requests[{index}]: query must be an object"
+    if parts.query:
+        # ?a=1 in the path and an explicit query object are merged, the object wins
+        query = {**dict(parse_qsl(parts.query, keep_blank_values=True)), **query}
+    return (item.get('id', index), method, parts.path, query, item.get('body')), None
+
+
+def _dispatch(app, shared_session, remote_addr, item):
+    """
+    Run one sub-request through the URL map inside its own request context.
+    The before_request chain (JWT, honeypot, activity log) already ran for the
+    batch itself, so only routing and the view run here.
+    """
+    req_id, method, path, query, body = item
+    kwargs = {'method': method, 'query_string': query, 'environ_base': {'REMOTE_ADDR': remote_addr}}
+    if body is not None:
+        kwargs['json'] = body
+
+    with app.test_request_context(path, **kwargs) as ctx:
+        # Each sub-request gets its own copy; writes are merged back below
+        ctx.session.update(copy.deepcopy(shared_session))
+        if request.endpoint == 'batch.batch_requests':
+            response = app.make_response(error_response("Nested batches are not allowed", "INVALID_PARAMS", status_code=400))
+        elif request.endpoint == 'events.change_feed':
+            response = app.make_response(error_response("Streams can't be batched", "INVALID_PARAMS", status_code=400))
+        else:
+            try:
+                response = app.make_response(app.dispatch_request())
+            except HTTPException as e:
+                response = app.make_response(error_response(e.description, e.name.upper().replace(' ', '_'), status_code=e.code))
+            except Exception as e:
+                # The message stays in the log: it can carry Mongo errors and query fragments
+                logger.error(f"Batch sub-request {method} {path} failed: {e}")
+                response = app.make_response(error_response("Internal server error", "INTERNAL_ERROR", status_code=500))
+
+        if method != 'GET' and ctx.session.modified and 'user' in ctx.session:
+            # e.g. a profile update refreshing the session user
+            shared_session['user'] = copy.deepcopy(ctx.session['user'])
+
+    result = {'id': req_id, 'status': response.status_code}
+    if response.is_json:
+        result['body'] = response.get_json(silent=True)
+    else:
+        result['body'] = response.get_data(as_text=True)
+    return result
+
+
+@batch_bp.route('', methods=['POST'])
+@limiter.limit(MODERATE_LIMIT)
+def batch_requests():
+    """
+    Body: {"requests": [{"id"?, "method"?, "path", "query"?, "body"?}, ...]}
+    Returns {"responses": [{"id", "status", "body"}, ...]} in request order.
+    Consecutive GETs run in parallel; any other method waits for everything
+    before it and blocks everything after it, so reads see earlier writes.
+    """
+    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", status_code=401)
+
+    data = request.get_json(silent=True) or {}
+    items = data.get('requests')
+    if not isinstance(items, list) or not items:
+        return error_response("requests must be a non-empty list", "INVALID_PARAMS", status_code=400)
+    if len(items) > BATCH_MAX_REQUESTS:
+        return error_response(f"At most {BATCH_MAX_REQUESTS} requests per batch", "BATCH_TOO_LARGE",
+                              details={'max': BATCH_MAX_REQUESTS}, status_code=400)
+
+    parsed = []
+    for index, item in enumerate(items):
+        entry, problem = _parse_item(index, item)
+        if problem:
+            return error_response(problem, "INVALID_PARAMS", status_code=400)
+        parsed.append(entry)
+
+    app = current_app._get_current_object()
+    shared_session = copy.deepcopy(dict(session))
+    remote_addr = request.remote_addr
+
+    queries = query_stats.current()
+    responses = []
+    reads = []
+
+    def dispatch_read(entry):
+        # Count the pool thread's queries against this request (see api/query_stats.py)
+        token = query_stats.bind(queries)
+        try:
+            return _dispatch(app, shared_session, remote_addr, entry)
+        finally:
+            query_stats.unbind(token)
+
+    def flush_reads():
+        if len(reads) == 1:
+            responses.append(_dispatch(app, shared_session, remote_addr, reads[0]))
+        elif reads:
+            responses.extend(_batch_pool.map(dispatch_read, reads))
+        reads.clear()
+
+    for entry in parsed:
+        if entry[1] == 'GET':
+            reads.append(entry)
+            continue
+        flush_reads()
+        responses.append(_dispatch(app, shared_session, remote_addr, entry))
+    flush_reads()
+
+    if shared_session.get('user') != session.get('user'):
+        session['user'] = shared_session['user']
+        session.modified = True
+
+    return success_response({'responses': responses})
@@ -1,9 +1,18 @@
 from flask import Blueprint, session, request, jsonify, Response
 from api.database import db
 from api.utils.response import success_response, error_response
-from api.calculations_v2 import AttendanceCalculator
+from api.calculations_v2 import AttendanceCalculator, AttendanceProjector, AttendanceSimulator
+from api.timetable_index import get_compiled_timetable, get_slots_for_date, weekly_class_counts
+from api.utils.cache import LRUCache
+from api.routes.attendance import match_slots_to_logs
+from api.routes.profile import profile_view, preferences_view
+from api.scraper import cached_notices, stale_notices, scrape_executor
+from api.notifications import list_notifications, list_notifications_async, mark_read, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from api.async_db import run_all, find, find_one, in_thread
 from bson import ObjectId, json_util
 from datetime import datetime, timedelta
+import asyncio
+import json
 import logging
 import traceback
 
@@ -14,40 +23,75 @@ dashboard_bp = Blueprint('dashboard', __name__)
 attendance_log_collection = db.get_collection('attendance_logs')
 subjects_collection = db.get_collection('subjects')
 system_logs_collection = db.get_collection('system_logs')
+preferences_collection = db.get_collection('user_preferences')
+holidays_collection = db.get_collection('holidays')
+users_collection = db.get_collection('users')
 
-@dashboard_bp.route('/data', methods=['GET'])
-def get_dashboard_data():
-    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", 401)
-    user_email = session['user']['email'].lower()  # ✅ Normalized
-    semester = request.args.get('semester', type=int, default=1)
-    
-    subjects = list(subjects_collection.find({"owner_email": user_email, "semester": semester}))
+# Projections are keyed by request params and validated against a fingerprint of
+# the attendance counts, timetable and holidays they were computed from
+PROJECTION_CACHE_SECONDS = 300
+_projection_cache = LRUCache(max_entries=2000, max_age=PROJECTION_CACHE_SECONDS, name='projection')
+# Simulations are only recomputed after an attendance write (see _attendance_write_stamp)
+_simulation_cache = LRUCache(max_entries=1000, name='risk_simulation')
+
+COUNTED_STATUSES = ['present', 'absent', 'late', 'approved_medical']
+ATTENDED_STATUSES = ['present', 'late', 'approved_medical']
+
+# /bundle: sections are named after the legacy endpoints they replace
+BUNDLE_SECTIONS = ('dashboard_data', 'notifications', 'classes_for_date', 'preferences', 'current_user', 'notices')
+# Shared fetches each section is built from
+BUNDLE_FETCHES = {
+    'dashboard_data': ('subjects',),
+    'notifications': ('notifications',),
+    'classes_for_date': ('slots', 'logs'),
+    'preferences': ('prefs',),
+    'current_user': ('user', 'prefs'),
+    'notices': ('notices',),
+}
+# A cold notice cache means a live scrape; don't hold first paint for it
+BUNDLE_NOTICES_WAIT_SECONDS = 2
+
+def _dashboard_payload(subjects):
+    """/data response body for one semester's subjects."""
     summary = AttendanceCalculator.get_attendance_summary(subjects)
     
+    # Per-subject stats for subjects without a stored percentage, in one batch pass
+    pending = [sub for sub in subjects if 'attendance_percentage' not in sub]
+    if pending:
+        stats = AttendanceCalculator.calculate_batch(
+            [sub.get('attended', 0) for sub in pending],
+            [sub.get('total', 0) for sub in pending],
+            75
+        )
+        for i, sub in enumerate(pending):
+            # Frontend uses subject.attendance_percentage and status_message
+            sub['attendance_percentage'] = float(stats['percentage'][i])
+            sub['status_message'] = AttendanceCalculator.bunk_status_message(
+                bool(stats['can_bunk'][i]), int(stats['count'][i]), 75
+            )
+
     # Serialize subjects
     serialized_subjects = []
     for sub in subjects:
         sub['_id'] = str(sub['_id'])
-        if 'attendance_percentage' not in sub:
-             # Ensure percentage is calculated if not present (AttendanceCalculator does summary, but maybe we need per-subject too)
-             # Frontend uses subject.attendance_percentage
-             attended = sub.get('attended', 0)
-             total = sub.get('total', 0)
-             sub['attendance_percentage'] = AttendanceCalculator.calculate_percentage(attended, total)
-             
-             # Also status message
-             guard = AttendanceCalculator.calculate_bunk_guard(attended, total, 75)
-             sub['status_message'] = guard['status_message']
-             
         serialized_subjects.append(sub)
 
-    return success_response({
+    return {
         "overall_attendance": summary['overall_percentage'],
         "total_subjects": len(subjects),
         "subjects": serialized_subjects,
         "summary": summary, # Keep for backward compat if needed
         "last_updated": datetime.utcnow().isoformat()
-    })
+    }
+
+@dashboard_bp.route('/data', methods=['GET'])
+def get_dashboard_data():
+    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", 401)
+    user_email = session['user']['email'].lower()  # ✅ Normalized
+    semester = request.args.get('semester', type=int, default=1)
+    
+    subjects = list(subjects_collection.find({"owner_email": user_email, "semester": semester}))
+    return success_response(_dashboard_payload(subjects))
 
 @dashboard_bp.route('/reports_data', methods=['GET'])
 def get_reports_data():
@@ -55,9 +99,12 @@ def get_reports_data():
     user_email = session['user']['email'].lower()  # ✅ Normalized
     semester = request.args.get('semester', type=int, default=1)
     
-    # Fetch Data
-    subjects = list(subjects_collection.find({"owner_email": user_email, "semester": semester}))
-    logs = list(attendance_log_collection.find({"owner_email": user_email, "semester": semester}))
+    # Fetch Data (both queries at once, see api/async_db.py)
+    fetched = run_all(
+        subjects=find('subjects', {"owner_email": user_email, "semester": semester}),
+        logs=find('attendance_logs', {"owner_email": user_email, "semester": semester})
+    )
+    subjects, logs = fetched['subjects'], fetched['logs']
     
     # 1. Subject Breakdown
     processed_subjects = []
@@ -168,25 +215,315 @@ def get_achievements():
 
 @dashboard_bp.route('/notifications')
 def get_notifications():
+    """
+    Materialized notifications, newest first (see api/notifications.py).
+    Query params: limit (default 20, max 100), before (cursor from X-Next-Cursor).
+    """
     if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", 401)
     user_email = session['user']['email'].lower()  # ✅ Normalized
-    
-    # Fetch recent important notifications
-    notifications = []
-    
-    # 1. Bunk Alarms
-    subjects = list(subjects_collection.find({'owner_email': user_email}))
-    for sub in subjects:
-        target = 75 # default
-        attended = sub.get('attended', 0)
-        total = sub.get('total', 0)
-        guard = AttendanceCalculator.calculate_bunk_guard(attended, total, target)
-        if not guard['can_bunk'] and guard['count'] > 0:
-            notifications.append({
-                "type": "warning",
-                "title": "Attendance Warning",
-                "message": f"Critical: {sub['name']} is at {guard['percentage']}%. {guard['status_message']}",
-                "priority": "high"
-            })
 
-    return success_response(notifications)
+    limit = max(1, min(request.args.get('limit', type=int, default=DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    before = request.args.get('before')
+    if before and not ObjectId.is_valid(before):
+        return error_response("Invalid cursor", "INVALID_PARAMS", status_code=400)
+
+    items, next_cursor = list_notifications(user_email, before, limit)
+    response, status = success_response(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, status
+
+@dashboard_bp.route('/notifications/read', methods=['POST'])
+def mark_notifications_read():
+    """Body: {"ids": [...]} to mark some notifications read, or {} for all of them."""
+    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", status_code=401)
+    user_email = session['user']['email'].lower()
+
+    ids = (request.get_json(silent=True) or {}).get('ids')
+    if ids is not None and (not isinstance(ids, list) or not all(ObjectId.is_valid(i) for i in ids)):
+        return error_response("ids must be a list of notification ids", "INVALID_PARAMS", status_code=400)
+    return success_response({"updated": mark_read(user_email, ids)})
+
+def _projection_params(user_email, list_param='targets'):
+    """
+    Shared parsing for the forward-looking endpoints.
+    Returns (start, end, values, None) or (None, None, None, error_response).
+    """
+    prefs_doc = preferences_collection.find_one({'owner_email': user_email}, {'preferences': 1})
+    prefs = (prefs_doc or {}).get('preferences', {})
+
+    end_str = request.args.get('end_date') or prefs.get('semester_end_date')
+    if not end_str:
+        return None, None, None, error_response("end_date required (or set semester_end_date in preferences)", "MISSING_PARAM", status_code=400)
+    try:
+        end = datetime.strptime(end_str, "%Y-%m-%d").date()
+        from_str = request.args.get('from')
+        start = datetime.strptime(from_str, "%Y-%m-%d").date() if from_str else (datetime.now() + timedelta(days=1)).date()
+    except ValueError:
+        return None, None, None, error_response("Dates must be YYYY-MM-DD", "INVALID_DATE", status_code=400)
+
+    try:
+        raw_values = request.args.get(list_param)
+        values = [float(t) for t in raw_values.split(',')] if raw_values else [float(prefs.get('attendance_threshold', 75))]
+    except ValueError:
+        return None, None, None, error_response(f"Invalid {list_param}", "INVALID_PARAMS", status_code=400)
+    if not values or any(t <= 0 or t > 100 for t in values):
+        return None, None, None, error_response(f"{list_param.capitalize()} must be between 0 and 100", "INVALID_PARAMS", status_code=400)
+    return start, end, values, None
+
+
+def _holidays_between(user_email, start, end):
+    return sorted({
+        datetime.strptime(h['date'], "%Y-%m-%d").date()
+        for h in holidays_collection.find(
+            {'owner_email': user_email, 'date': {'$gte': start.isoformat(), '$lte': end.isoformat()}},
+            {'date': 1}
+        )
+        if isinstance(h.get('date'), str) and len(h['date']) == 10
+    })
+
+
+@dashboard_bp.route('/projection', methods=['GET'])
+def get_attendance_projection():
+    """
+    Project each subject's attendance to the end of the semester using the
+    weekly timetable and holidays.
+    Query params: semester, end_date (or the semester_end_date preference),
+    from (defaults to tomorrow), targets (comma separated, defaults to the
+    attendance_threshold preference or 75).
+    """
+    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", status_code=401)
+    user_email = session['user']['email'].lower()
+    semester = request.args.get('semester', type=int, default=1)
+
+    start, end, targets, error = _projection_params(user_email)
+    if error:
+        return error
+
+    subjects = list(subjects_collection.find(
+        {'owner_email': user_email, 'semester': semester},
+        {'name': 1, 'attended': 1, 'total': 1}
+    ))
+    weekly = weekly_class_counts(get_compiled_timetable(user_email, semester))
+    holidays = _holidays_between(user_email, start, end)
+
+    key = (user_email, semester, start, end, tuple(targets))
+    fingerprint = (
+        tuple((str(s['_id']), s.get('attended', 0), s.get('total', 0)) for s in subjects),
+        tuple(sorted((sid, tuple(counts)) for sid, counts in weekly.items())),
+        tuple(holidays)
+    )
+    payload = _projection_cache.get(key, stamp=fingerprint)
+    if payload is None:
+        projected = []
+        for sub in subjects:
+            sid = str(sub['_id'])
+            projection = AttendanceProjector.project_subject(
+                sub.get('attended', 0), sub.get('total', 0), weekly.get(sid, [0] * 7),
+                start, end, holidays, targets
+            )
+            projection.update({'subject_id': sid, 'name': sub.get('name')})
+            projected.append(projection)
+
+        payload = {
+            'from': start.isoformat(),
+            'end_date': end.isoformat(),
+            'holidays_skipped': len(holidays),
+            'subjects': projected
+        }
+        _projection_cache.put(key, payload, stamp=fingerprint)
+
+    response, status = success_response(payload)
+    response.headers['Cache-Control'] = f'private, max-age={PROJECTION_CACHE_SECONDS}'
+    return response, status
+
+def _attendance_write_stamp(user_email, subject_ids):
+    """
+    (log count, latest log timestamp) for the subjects. Marking, editing and
+    deleting a log all move one of the two, so this changes on every write.
+    """
+    rows = list(attendance_log_collection.aggregate([
+        {'$match': {'owner_email': user_email, 'subject_id': {'$in': subject_ids}}},
+        {'$group': {'_id': None, 'count': {'$sum': 1}, 'last': {'$max': '$timestamp'}}}
+    ]))
+    return (rows[0]['count'], rows[0]['last']) if rows else (0, None)
+
+
+def _weekday_history(user_email, subject_ids):
+    """{subject_id: ([attended Mon..Sun], [held Mon..Sun])} from the attendance logs."""
+    history = {}
+    for row in attendance_log_collection.aggregate([
+        {'$match': {'owner_email': user_email, 'subject_id': {'$in': subject_ids},
+                    'status': {'$in': COUNTED_STATUSES}}},
+        {'$project': {
+            'subject_id': 1,
+            'attended': {'$cond': [{'$in': ['$status', ATTENDED_STATUSES]}, 1, 0]},
+            'day': {'$isoDayOfWeek': {'$dateFromString': {'dateString': '$date', 'format': '%Y-%m-%d', 'onError': None}}}
+        }},
+        {'$match': {'day': {'$ne': None}}},
+        {'$group': {'_id': {'subject_id': '$subject_id', 'day': '$day'},
+                    'attended': {'$sum': '$attended'}, 'held': {'$sum': 1}}}
+    ]):
+        attended, held = history.setdefault(str(row['_id']['subject_id']), ([0] * 7, [0] * 7))
+        idx = row['_id']['day'] - 1  # ISO: 1 = Monday
+        attended[idx] = row['attended']
+        held[idx] = row['held']
+    return history
+
+
+@dashboard_bp.route('/risk', methods=['GET'])
+def get_attendance_risk():
+    """
+    Monte Carlo risk of finishing the semester below each threshold, sampled
+    from the user's own per-weekday attendance rates.
+    Query params: semester, end_date / from (as for /projection), thresholds
+    (comma separated, defaults to the attendance_threshold preference or 75),
+    samples (default 5000, max 20000).
+    """
+    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", status_code=401)
+    user_email = session['user']['email'].lower()
+    semester = request.args.get('semester', type=int, default=1)
+    samples = request.args.get('samples', type=int, default=AttendanceSimulator.DEFAULT_SAMPLES)
+    samples = max(100, min(samples, AttendanceSimulator.MAX_SAMPLES))
+
+    start, end, thresholds, error = _projection_params(user_email, list_param='thresholds')
+    if error:
+        return error
+
+    subjects = list(subjects_collection.find(
+        {'owner_email': user_email, 'semester': semester},
+        {'name': 1, 'attended': 1, 'total': 1}
+    ))
+    subject_ids = [s['_id'] for s in subjects]
+    weekly = weekly_class_counts(get_compiled_timetable(user_email, semester))
+    holidays = _holidays_between(user_email, start, end)
+
+    key = (user_email, semester, start, end, tuple(thresholds), samples)
+    stamp = (
+        _attendance_write_stamp(user_email, subject_ids),
+        tuple((str(s['_id']), s.get('attended', 0), s.get('total', 0)) for s in subjects),
+        tuple(sorted((sid, tuple(counts)) for sid, counts in weekly.items())),
+        tuple(holidays)
+    )
+    payload = _simulation_cache.get(key, stamp=stamp)
+    if payload is None:
+        history = _weekday_history(user_email, subject_ids)
+        empty = ([0] * 7, [0] * 7)
+        ids = [str(s['_id']) for s in subjects]
+        results = AttendanceSimulator.simulate(
+            [s.get('attended', 0) for s in subjects],
+            [s.get('total', 0) for s in subjects],
+            [history.get(sid, empty)[0] for sid in ids],
+            [history.get(sid, empty)[1] for sid in ids],
+            [AttendanceProjector.classes_by_weekday(weekly.get(sid, [0] * 7), start, end, holidays) for sid in ids],
+            thresholds,
+            samples=samples
+        )
+        for sub, sid, result in zip(subjects, ids, results):
+            result.update({'subject_id': sid, 'name': sub.get('name'), 'logged_classes': sum(history.get(sid, empty)[1])})
+
+        payload = {
+            'from': start.isoformat(),
+            'end_date': end.isoformat(),
+            'samples': samples,
+            'subjects': results
+        }
+        _simulation_cache.put(key, payload, stamp=stamp)
+
+    response, status = success_response(payload)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response, status
+
+
+@dashboard_bp.route('/bundle', methods=['GET'])
+def get_dashboard_bundle():
+    """
+    Everything the dashboard needs for first paint in one round trip.
+    Query params: sections (comma separated, default all of BUNDLE_SECTIONS),
+    semester (default 1 for dashboard_data; classes_for_date uses it as given),
+    date (YYYY-MM-DD for classes_for_date, default today).
+    Each section has the same shape as the legacy endpoint it replaces. The
+    queries they share run once, concurrently on the async data layer
+    (api/async_db.py); a failed section is reported as
+    `errors: {"<section>": "failed"}` (details go to the log) instead of
+    failing the bundle.
+    """
+    if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", status_code=401)
+    user_email = session['user']['email'].lower()
+
+    raw_sections = request.args.get('sections')
+    sections = [name.strip() for name in raw_sections.split(',') if name.strip()] if raw_sections else list(BUNDLE_SECTIONS)
+    unknown = [name for name in sections if name not in BUNDLE_SECTIONS]
+    if unknown:
+        return error_response(f"Unknown sections: {', '.join(unknown)}", "INVALID_PARAMS",
+                              details={'allowed': list(BUNDLE_SECTIONS)}, status_code=400)
+
+    semester = request.args.get('semester', type=int)
+    date_str = request.args.get('date') or datetime.now().strftime("%Y-%m-%d")
+    try:
+        target_date = datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        return error_response("Invalid date format", "INVALID_DATE", status_code=400)
+
+    async def first_page_of_notifications():
+        return (await list_notifications_async(user_email))[0]
+
+    async def notices():
+        # Not in_thread: a slow scrape must not hold a thread the queries need
+        scrape = asyncio.get_running_loop().run_in_executor(scrape_executor, cached_notices)
+        try:
+            return await asyncio.wait_for(scrape, BUNDLE_NOTICES_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            # The scrape keeps going in its thread and fills the cache for the next load
+            return stale_notices()
+
+    fetchers = {
+        'subjects': lambda: find('subjects', {'owner_email': user_email, 'semester': semester or 1}),
+        'slots': lambda: in_thread(get_slots_for_date, user_email, semester, target_date),
+        'logs': lambda: find('attendance_logs', {'owner_email': user_email, 'date': date_str}),
+        'prefs': lambda: find_one('user_preferences', {'owner_email': user_email}),
+        'user': lambda: find_one('users', {'email': user_email}),
+        'notifications': first_page_of_notifications,
+        'notices': notices,
+    }
+    needed = {fetch for name in sections for fetch in BUNDLE_FETCHES[name]}
+    results = run_all(return_exceptions=True, **{fetch: fetchers[fetch]() for fetch in needed})
+
+    fetched, failed = {}, set()
+    for fetch, result in results.items():
+        if isinstance(result, Exception):
+            logger.error(f"Bundle fetch '{fetch}' failed for {user_email}: {result}")
+            failed.add(fetch)
+        else:
+            fetched[fetch] = result
+
+    # Exception text can carry hostnames and query fragments; it stays in the log
+    data, errors = {}, {}
+    for name in sections:
+        if any(fetch in failed for fetch in BUNDLE_FETCHES[name]):
+            errors[name] = "failed"
+            continue
+        try:
+            if name == 'dashboard_data':
+                data[name] = _dashboard_payload(fetched['subjects'])
+            elif name == 'notifications':
+                data[name] = fetched['notifications']
+            elif name == 'classes_for_date':
+                data[name] = match_slots_to_logs(fetched['slots'], fetched['logs']) if fetched['slots'] else []
+            elif name == 'preferences':
+                data[name] = preferences_view(fetched['prefs'])
+            elif name == 'current_user':
+                if fetched['user'] is None:
+                    errors[name] = "User profile not found"
+                    continue
+                data[name] = profile_view(dict(fetched['user']), fetched['prefs'])
+            elif name == 'notices':
+                data[name] = fetched['notices']
+        except Exception as e:
+            logger.error(f"Bundle section '{name}' failed for {user_email}: {e}")
+            errors[name] = "failed"
+
+    payload = {'sections': json.loads(json_util.dumps(data))}
+    if errors:
+        payload['errors'] = errors
+    return success_response(payload)
@@ -1,6 +1,11 @@
 from flask import Blueprint, request, session, jsonify, Response, make_response
 from api.database import db
 from api.utils.response import success_response, error_response
+from api.results_summary import rebuild_result_summary
+from api.attendance_bitmap import drop_user_bitmaps
+from api.notifications import refresh_notifications
+from api.realtime import emit_change, EVENTS
+from api.async_db import run_all, find, find_one
 from bson import ObjectId, json_util
 import json
 from datetime import datetime, timedelta
@@ -45,17 +50,21 @@ def export_data():
             'data': {}
         }
 
+        # Profile and every collection are read at once (see api/async_db.py)
+        # Check if holiday collection has owner_email (it usually does for user items)
+        # Some might be global? Assuming structure follows owner_email pattern.
+        fetched = run_all(
+            user_profile=find_one('users', {'email': user_email}, {'password_hash': 0, '_id': 0, 'google_id': 0}),
+            **{key: find(coll_name, {'owner_email': user_email}) for key, coll_name in COLLECTIONS_MAP.items()}
+        )
+
         # Export User Profile (Generic info)
-        user_doc = db.get_collection('users').find_one({'email': user_email}, {'password_hash': 0, '_id': 0, 'google_id': 0})
-        if user_doc:
-            export_payload['data']['user_profile'] = user_doc
+        if fetched['user_profile']:
+            export_payload['data']['user_profile'] = fetched['user_profile']
 
         # Export Collections
-        for key, coll_name in COLLECTIONS_MAP.items():
-            # Check if holiday collection has owner_email (it usually does for user items)
-            # Some might be global? Assuming structure follows owner_email pattern.
-            items = list(db.get_collection(coll_name).find({'owner_email': user_email}))
-            export_payload['data'][key] = json.loads(json_util.dumps(items))
+        for key in COLLECTIONS_MAP:
+            export_payload['data'][key] = json.loads(json_util.dumps(fetched[key]))
 
         # Create JSON File Response
         response_json = json.dumps(export_payload, default=str)
@@ -196,6 +205,13 @@ def import_data():
                 {'$set': profile}
             )
 
+        # Results and logs were replaced wholesale, so reset the data derived from them
+        rebuild_result_summary(user_email)
+        drop_user_bitmaps(user_email)
+        refresh_notifications(user_email)
+        for event in EVENTS:
+            emit_change(user_email, event, action='imported')
+
         return success_response({"message": "Data imported successfully"})
         
     except Exception as e:
@@ -355,6 +371,11 @@ def delete_all_data():
             logger.info(f"🗑️ Deleted {result.deleted_count} records from {coll_name} for {user_email}")
             
         logger.info(f"✅ User {user_email} wiped their data: {deleted_summary}")
+        rebuild_result_summary(user_email)
+        drop_user_bitmaps(user_email)
+        refresh_notifications(user_email)
+        for event in EVENTS:
+            emit_change(user_email, event, action='wiped')
         
         # Log the action (RE-INSERT after wipe)
         db.get_collection('system_logs').insert_one({
@@ -424,6 +445,11 @@ def restore_backup(backup_id):
                 if items:
                     db.get_collection(coll_name).insert_many(items)
         
+        rebuild_result_summary(user_email)
+        drop_user_bitmaps(user_email)
+        refresh_notifications(user_email)
+        for event in EVENTS:
+            emit_change(user_email, event, action='restored')
         logger.info(f"✅ Backup {backup_id} restored for {user_email}")
         
         return success_response({"message": "Backup restored successfully"})
@@ -0,0 +1,26 @@
+from flask import Blueprint, request, Response, stream_with_context
+from api.utils.response import error_response
+from api.realtime import authenticated_email
+from api.events import event_stream
+
+events_bp = Blueprint('events', __name__)
+
+
+@events_bp.route('', methods=['GET'])
+def change_feed():
+    """
+    Server-Sent Events feed of the signed-in user's changes (the same events
+    the Socket.IO channel carries). EventSource can't set headers, so besides
+    the session cookie a JWT is accepted as ?token=. Reconnects resume from
+    the Last-Event-ID header (or ?lastEventId=); a `reset` event means the
+    resume point is gone and the client should refetch.
+    """
+    user_email = authenticated_email()
+    if not user_email: return error_response("Unauthorized", "UNAUTHORIZED", status_code=401)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    return Response(
+        stream_with_context(event_stream(user_email, last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
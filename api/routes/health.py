@@ -0,0 +1,47 @@
+from flask import Blueprint, jsonify
+import os
+from api.database import connection
+from api.rate_limiter import limiter
+from api.auth import admin_required
+from api.query_stats import route_stats, QUERY_BUDGET, QUERY_TIME_BUDGET_MS
+from api.utils.response import success_response
+
+health_bp = Blueprint('health', __name__)
+
+
+@health_bp.route('', methods=['GET'])
+@limiter.exempt
+def health_check():
+    """
+    Health check for load balancers: env vars, and the database as the
+    connection manager sees it. Pings only when the circuit lets it (a ping
+    is the probe once an open period ends); 503 while the database is out.
+    """
+    status = {
+        "status": "ok",
+        "mongo_uri_set": bool(os.getenv('MONGO_URI')),
+        "flask_secret_set": bool(os.getenv('FLASK_SECRET_KEY'))
+    }
+    try:
+        connection.ping()
+        status["db_pingable"] = True
+    except Exception as e:
+        status["db_pingable"] = False
+        status["db_error"] = str(e)
+
+    database = connection.health()
+    status["db_connected"] = database["connected"]
+    status["database"] = database
+    if not status["db_pingable"]:
+        status["status"] = "degraded"
+    return jsonify(status), 200 if status["db_pingable"] else 503
+
+
+@health_bp.route('/queries', methods=['GET'])
+@admin_required
+def query_stats():
+    """Mongo commands per route in this process (count, time, documents), heaviest first."""
+    return success_response({
+        'budget': {'commands': QUERY_BUDGET, 'db_ms': QUERY_TIME_BUDGET_MS},
+        'routes': route_stats()
+    })
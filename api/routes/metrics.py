@@ -0,0 +1,29 @@
+from flask import Blueprint, Response, request
+import os
+import hmac
+from prometheus_client import CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client import multiprocess
+from api.metrics import MULTIPROCESS
+from api.rate_limiter import limiter
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('', methods=['GET'])
+@limiter.exempt
+def metrics():
+    """
+    Prometheus text exposition. Under gunicorn the samples of every worker
+    (PROMETHEUS_MULTIPROC_DIR) are merged; otherwise this process's. Set
+    METRICS_TOKEN to require `Authorization: Bearer <token>`.
+    """
+    token = os.getenv('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
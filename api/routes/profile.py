@@ -1,6 +1,7 @@
 from flask import Blueprint, session, request, jsonify, Response
 from api.database import db
 from api.utils.response import success_response, error_response
+from api.notifications import refresh_notifications
 from bson import ObjectId, json_util
 from datetime import datetime
 import logging
@@ -24,6 +25,35 @@ def create_system_log(user_email, action, description):
         'timestamp': datetime.utcnow()
     })
 
+def profile_view(user, prefs_doc):
+    """User document as /profile returns it, with thresholds merged in from preferences."""
+    # CRITICAL: Merge thresholds from preferences collection if missing or newer
+    # This ensures settings changed on Web (which uses /preferences) reflect on Mobile (which uses /profile)
+    if prefs_doc and 'preferences' in prefs_doc:
+        p = prefs_doc['preferences']
+        # Standardize names: Web might send 'min_attendance' instead of 'warning_threshold'
+        if 'attendance_threshold' in p: user['attendance_threshold'] = p['attendance_threshold']
+        if 'warning_threshold' in p: user['warning_threshold'] = p['warning_threshold']
+        elif 'min_attendance' in p: user['warning_threshold'] = p['min_attendance'] # Alias for web
+
+    # Sync field aliases for cross-platform matching
+    if user.get('course') and not user.get('branch'): user['branch'] = user['course']
+    if user.get('branch') and not user.get('course'): user['course'] = user['branch']
+    return user
+
+def preferences_view(prefs_doc):
+    """Stored preferences over the defaults new users get."""
+    # Default fallback for new users
+    default_prefs = {
+        'attendance_threshold': 75,
+        'warning_threshold': 76,
+        'notifications_enabled': False,
+        'accent_color': '#6750A4'
+    }
+    if prefs_doc:
+        default_prefs.update(prefs_doc.get('preferences', {}))
+    return default_prefs
+
 @profile_bp.route('/', methods=['GET', 'PUT', 'POST'])
 def handle_profile():
     try:
@@ -43,21 +73,8 @@ def handle_profile():
                 if not user:
                     return error_response("User profile not found", "USER_NOT_FOUND", status_code=404)
                 
-                # CRITICAL: Merge thresholds from preferences collection if missing or newer
-                # This ensures settings changed on Web (which uses /preferences) reflect on Mobile (which uses /profile)
                 prefs_doc = preferences_collection.find_one({'owner_email': user_email})
-                if prefs_doc and 'preferences' in prefs_doc:
-                    p = prefs_doc['preferences']
-                    # Standardize names: Web might send 'min_attendance' instead of 'warning_threshold'
-                    if 'attendance_threshold' in p: user['attendance_threshold'] = p['attendance_threshold']
-                    if 'warning_threshold' in p: user['warning_threshold'] = p['warning_threshold']
-                    elif 'min_attendance' in p: user['warning_threshold'] = p['min_attendance'] # Alias for web
-
-                # Sync field aliases for cross-platform matching
-                if user.get('course') and not user.get('branch'): user['branch'] = user['course']
-                if user.get('branch') and not user.get('course'): user['course'] = user['branch']
-                
-                return success_response(json.loads(json_util.dumps(user)))
+                return success_response(json.loads(json_util.dumps(profile_view(user, prefs_doc))))
             except Exception as e:
                 logger.error(f"Error fetching profile for {user_email}: {e}")
                 traceback.print_exc()
@@ -137,16 +154,7 @@ def handle_preferences():
     
     if request.method == 'GET':
         prefs = preferences_collection.find_one({'owner_email': user_email})
-        # Default fallback for new users
-        default_prefs = {
-            'attendance_threshold': 75,
-            'warning_threshold': 76,
-            'notifications_enabled': False,
-            'accent_color': '#6750A4'
-        }
-        if prefs:
-            default_prefs.update(prefs.get('preferences', {}))
-        return success_response(default_prefs)
+        return success_response(preferences_view(prefs))
         
     if request.method == 'POST':
         data = request.json
@@ -173,6 +181,8 @@ def handle_preferences():
         
         if mirror_data:
             users_collection.update_one({'email': user_email}, {'$set': mirror_data})
+        if 'attendance_threshold' in data:
+            refresh_notifications(user_email)
 
         return success_response({"message": "Preferences saved"})
 
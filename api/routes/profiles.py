@@ -0,0 +1,61 @@
+from flask import Blueprint, request, Response
+from pymongo import DESCENDING
+from api.auth import admin_required
+from api.profiling import profiles_collection, collapsed, render_html
+from api.utils.response import success_response, error_response
+
+profiles_bp = Blueprint('profiles', __name__)
+
+
+@profiles_bp.route('', methods=['GET'])
+@admin_required
+def list_profiles():
+    """Most recent profiles, newest first (`email` to filter by user, `limit` up to 100)."""
+    query = {}
+    if request.args.get('email'):
+        query['user_email'] = request.args['email'].strip().lower()
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return error_response("limit must be a number", "INVALID_PARAMS", status_code=400)
+
+    profiles = profiles_collection.find(
+        query, {'stacks': 0, 'mongo.trace': 0}
+    ).sort('created_at', DESCENDING).limit(limit)
+    return success_response([{
+        'id': p['_id'],
+        'user_email': p.get('user_email'),
+        'method': p['method'],
+        'path': p['path'],
+        'status': p['status'],
+        'duration_ms': p['duration_ms'],
+        'mongo_commands': p['mongo']['commands'],
+        'mongo_ms': p['mongo']['duration_ms'],
+        'created_at': p['created_at'].isoformat()
+    } for p in profiles])
+
+
+@profiles_bp.route('/<profile_id>', methods=['GET'])
+@admin_required
+def get_profile(profile_id):
+    """
+    One profile. ?format=collapsed downloads the stacks for flamegraph.pl or
+    speedscope, ?format=html a standalone call tree; otherwise JSON.
+    """
+    profile = profiles_collection.find_one({'_id': profile_id})
+    if not profile:
+        return error_response("Profile not found", "NOT_FOUND", status_code=404)
+
+    fmt = request.args.get('format', 'json')
+    if fmt == 'collapsed':
+        return Response(collapsed(profile), mimetype='text/plain', headers={
+            'Content-Disposition': f'attachment; filename=profile_{profile_id}.collapsed.txt'
+        })
+    if fmt == 'html':
+        download = request.args.get('download') == 'true'
+        headers = {'Content-Disposition': f'attachment; filename=profile_{profile_id}.html'} if download else {}
+        return Response(render_html(profile), mimetype='text/html', headers=headers)
+
+    profile['id'] = profile.pop('_id')
+    profile['created_at'] = profile['created_at'].isoformat()
+    return success_response(profile)
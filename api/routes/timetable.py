@@ -3,6 +3,8 @@ from api.database import db
 from api.utils.response import success_response, error_response
 from bson import ObjectId, json_util
 from datetime import datetime
+from pymongo import ReturnDocument
+from api.realtime import emit_change, TIMETABLE_UPDATED
 import logging
 import traceback
 
@@ -11,6 +13,8 @@ logger = logging.getLogger(__name__)
 timetable_bp = Blueprint('timetable', __name__)
 timetable_collection = db.get_collection('timetable')
 
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
 def log_user_action(user_email, action, description):
     db.get_collection('system_logs').insert_one({
         'owner_email': user_email,
@@ -29,10 +33,11 @@ def handle_timetable():
         data = request.json.get('schedule', {})
         timetable_collection.update_one(
             {'owner_email': user_email, 'semester': semester}, 
-            {'$set': {'schedule': data, 'semester': semester, 'updated_at': datetime.utcnow()}}, 
+            {'$set': {'schedule': data, 'semester': semester, 'updated_at': datetime.utcnow()}, '$inc': {'version': 1}}, 
             upsert=True
         )
         log_user_action(user_email, "Schedule Updated", f"User updated timetable for Semester {semester}.")
+        emit_change(user_email, TIMETABLE_UPDATED, semester=semester, action='schedule_saved')
         return success_response({"message": "Timetable updated"})
 
     doc = timetable_collection.find_one({'owner_email': user_email, 'semester': semester})
@@ -52,9 +57,10 @@ def save_structure():
     
     timetable_collection.update_one(
         {'owner_email': user_email, 'semester': semester},
-        {'$set': {'periods': data, 'updated_at': datetime.utcnow()}},
+        {'$set': {'periods': data, 'updated_at': datetime.utcnow()}, '$inc': {'version': 1}},
         upsert=True
     )
+    emit_change(user_email, TIMETABLE_UPDATED, semester=semester, action='structure_saved')
     return success_response({"message": "Timetable structure saved"})
 
 @timetable_bp.route('/holidays', methods=['GET', 'POST'])
@@ -71,6 +77,7 @@ def handle_holidays():
             'name': data.get('name'),
             'timestamp': datetime.utcnow()
         })
+        emit_change(user_email, TIMETABLE_UPDATED, action='holiday_added', date=data.get('date'))
         return success_response({"message": "Holiday added", "id": str(result.inserted_id)})
     
     holidays = list(holidays_collection.find({'owner_email': user_email}).sort('date', 1))
@@ -87,10 +94,71 @@ def delete_holiday(holiday_id):
         result = holidays_collection.delete_one({'_id': ObjectId(holiday_id), 'owner_email': user_email})
         if result.deleted_count == 0:
             return error_response("Holiday not found", "NOT_FOUND", 404)
+        emit_change(user_email, TIMETABLE_UPDATED, action='holiday_deleted')
         return success_response({"message": "Holiday deleted"})
     except Exception as e:
         return error_response("Invalid holiday ID", "INVALID_ID")
 
+def _expected_version():
+    """Optimistic-lock version sent by the client (If-Match header or ?version=), if any."""
+    raw = request.headers.get('If-Match') or request.args.get('version')
+    if raw is None:
+        return None
+    try:
+        return int(str(raw).strip('"'))
+    except ValueError:
+        return None
+
+def _version_filter(expected):
+    # Documents written before versioning have no field; treat them as version 0
+    if expected == 0:
+        return {'version': {'$in': [0, None]}}
+    return {'version': expected}
+
+def _slot_match(slot_id, prefix=''):
+    """
+    Condition matching a slot by either of its id fields (string or ObjectId).
+    `prefix` names the arrayFilters identifier, e.g. 'slot.'.
+    """
+    candidates = [slot_id]
+    if ObjectId.is_valid(slot_id):
+        candidates.append(ObjectId(slot_id))
+    return {'$or': [{f'{prefix}id': {'$in': candidates}}, {f'{prefix}_id': {'$in': candidates}}]}
+
+def _slot_write_failed(base_filter, expected):
+    """Explain a write that matched nothing: version conflict or missing slot."""
+    if expected is not None:
+        current = timetable_collection.find_one(base_filter, {'version': 1})
+        if current is not None and current.get('version', 0) != expected:
+            return error_response(
+                "Timetable was changed elsewhere. Reload and try again.",
+                "VERSION_CONFLICT",
+                details={"current_version": current.get('version', 0)},
+                status_code=409
+            )
+    return error_response("Slot not found", "NOT_FOUND", status_code=404)
+
+def _locate_slot_day(base_filter, slot_id):
+    """
+    Day whose slot list holds `slot_id`, for clients that didn't pass ?day=.
+    Legacy documents can still keep a day as a dict, so only array days count.
+    """
+    projection = {}
+    for d in DAYS_OF_WEEK:
+        projection[f'schedule.{d}.id'] = 1
+        projection[f'schedule.{d}._id'] = 1
+    located = timetable_collection.find_one(
+        {**base_filter, '$or': [{f'schedule.{d}': {'$elemMatch': _slot_match(slot_id)}} for d in DAYS_OF_WEEK]},
+        projection
+    )
+    if not located:
+        return None
+    return next(
+        (d for d, slots in (located.get('schedule') or {}).items()
+         if isinstance(slots, list) and any(str(s.get('id') or s.get('_id') or '') == slot_id for s in slots)),
+        None
+    )
+
 @timetable_bp.route('/slot', methods=['POST'])
 def add_slot():
     if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", 401)
@@ -100,94 +168,113 @@ def add_slot():
     
     # Needs a day to know where to insert
     day = slot_data.get('day')
-    if not day: return error_response("Day required", "MISSING_FIELD")
+    if not day: return error_response("Day required", "MISSING_FIELD", status_code=400)
+    if day not in DAYS_OF_WEEK: return error_response("Invalid day", "INVALID_DAY", status_code=400)
     
     # Ensure ID
     if 'id' not in slot_data and '_id' not in slot_data:
         slot_data['id'] = str(ObjectId())
-        
-    doc = timetable_collection.find_one({'owner_email': user_email, 'semester': semester})
-    if not doc:
-        # Create new
-        schedule = {day: [slot_data]}
-        timetable_collection.insert_one({
-            'owner_email': user_email, 
-            'semester': semester, 
-            'schedule': schedule,
-            'updated_at': datetime.utcnow()
-        })
-    else:
-        schedule = doc.get('schedule', {})
-        if day not in schedule: schedule[day] = []
-        schedule[day].append(slot_data)
-        
-        timetable_collection.update_one(
-            {'_id': doc['_id']},
-            {'$set': {'schedule': schedule, 'updated_at': datetime.utcnow()}}
+
+    expected = _expected_version()
+    query = {'owner_email': user_email, 'semester': semester}
+    if expected is not None:
+        query.update(_version_filter(expected))
+
+    # Single atomic append; only upsert when the client isn't asserting a version
+    doc = timetable_collection.find_one_and_update(
+        query,
+        {
+            '$push': {f'schedule.{day}': slot_data},
+            '$set': {'updated_at': datetime.utcnow()},
+            '$inc': {'version': 1}
+        },
+        projection={'version': 1},
+        upsert=expected is None,
+        return_document=ReturnDocument.AFTER
+    )
+    if doc is None:
+        return error_response(
+            "Timetable was changed elsewhere. Reload and try again.",
+            "VERSION_CONFLICT",
+            status_code=409
         )
         
-    return success_response({"message": "Slot added", "id": slot_data.get('id')})
+    emit_change(user_email, TIMETABLE_UPDATED, semester=semester, action='slot_added', version=doc.get('version'))
+    return success_response({"message": "Slot added", "id": slot_data.get('id'), "version": doc.get('version')})
 
 @timetable_bp.route('/slot/<slot_id>', methods=['PUT'])
 def update_slot(slot_id):
     if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", 401)
     user_email = session['user']['email'].lower()  # ✅ Normalized
     semester = request.args.get('semester', type=int, default=1)
-    updates = request.json
-    
-    doc = timetable_collection.find_one({'owner_email': user_email, 'semester': semester})
-    if not doc or 'schedule' not in doc:
-        return error_response("Timetable not found", "NOT_FOUND", 404)
-        
-    schedule = doc['schedule']
-    found = False
+    updates = request.json or {}
+
+    # Field names become update paths, so reject anything that could escape the slot
+    fields = {k: v for k, v in updates.items() if k not in ('id', '_id') and '.' not in k and not k.startswith('$')}
+
+    base_filter = {'owner_email': user_email, 'semester': semester}
+    expected = _expected_version()
     
-    for day, slots in schedule.items():
-        for i, slot in enumerate(slots):
-            current_id = str(slot.get('id') or slot.get('_id') or '')
-            if current_id == slot_id:
-                # Update fields
-                schedule[day][i].update(updates)
-                found = True
-                break
-        if found: break
-            
-    if found:
-        timetable_collection.update_one(
-            {'_id': doc['_id']},
-            {'$set': {'schedule': schedule, 'updated_at': datetime.utcnow()}}
-        )
-        return success_response({"message": "Slot updated"})
-    else:
-        return error_response("Slot not found", "NOT_FOUND", 404)
+    day = request.args.get('day')
+    if day not in DAYS_OF_WEEK:
+        day = _locate_slot_day(base_filter, slot_id)
+        if day is None:
+            return error_response("Slot not found", "NOT_FOUND", status_code=404)
+
+    query = {**base_filter, f'schedule.{day}': {'$elemMatch': _slot_match(slot_id)}}
+    if expected is not None:
+        query.update(_version_filter(expected))
+
+    set_fields = {f'schedule.{day}.$[slot].{k}': v for k, v in fields.items()}
+    set_fields['updated_at'] = datetime.utcnow()
+
+    doc = timetable_collection.find_one_and_update(
+        query,
+        {'$set': set_fields, '$inc': {'version': 1}},
+        array_filters=[_slot_match(slot_id, prefix='slot.')],
+        projection={'version': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if doc is None:
+        return _slot_write_failed(base_filter, expected)
+
+    emit_change(user_email, TIMETABLE_UPDATED, semester=semester, action='slot_updated', version=doc.get('version'))
+    return success_response({"message": "Slot updated", "version": doc.get('version')})
 
 @timetable_bp.route('/slot/<slot_id>', methods=['DELETE'])
 def delete_slot(slot_id):
     if 'user' not in session: return error_response("Unauthorized", "UNAUTHORIZED", 401)
     user_email = session['user']['email'].lower()  # ✅ Normalized
     semester = request.args.get('semester', type=int, default=1)
-    
-    doc = timetable_collection.find_one({'owner_email': user_email, 'semester': semester})
-    if not doc or 'schedule' not in doc:
-        return error_response("Timetable not found", "NOT_FOUND", 404)
-        
-    schedule = doc['schedule']
-    found = False
-    
-    # Iterate keys to allow modification
-    for day in list(schedule.keys()):
-        slots = schedule[day]
-        original_len = len(slots)
-        # Filter out slot with matching ID
-        schedule[day] = [s for s in slots if str(s.get('id') or s.get('_id') or '') != slot_id]
-        if len(schedule[day]) < original_len:
-            found = True
-            
-    if found:
-        timetable_collection.update_one(
-            {'_id': doc['_id']},
-            {'$set': {'schedule': schedule, 'updated_at': datetime.utcnow()}}
-        )
-        return success_response({"message": "Slot deleted"})
-    else:
-        return error_response("Slot not found", "NOT_FOUND", 404)
+
+    base_filter = {'owner_email': user_email, 'semester': semester}
+    expected = _expected_version()
+
+    day = request.args.get('day')
+    if day not in DAYS_OF_WEEK:
+        # $pull fails on a non-array field, so target only the day that holds the slot
+        day = _locate_slot_day(base_filter, slot_id)
+        if day is None:
+            return error_response("Slot not found", "NOT_FOUND", status_code=404)
+    match = _slot_match(slot_id)
+
+    # Only match documents that actually hold the slot, so a miss is a clean 404
+    query = {**base_filter, f'schedule.{day}': {'$elemMatch': match}}
+    if expected is not None:
+        query.update(_version_filter(expected))
+
+    doc = timetable_collection.find_one_and_update(
+        query,
+        {
+            '$pull': {f'schedule.{day}': match},
+            '$set': {'updated_at': datetime.utcnow()},
+            '$inc': {'version': 1}
+        },
+        projection={'version': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if doc is None:
+        return _slot_write_failed(base_filter, expected)
+
+    emit_change(user_email, TIMETABLE_UPDATED, semester=semester, action='slot_deleted', version=doc.get('version'))
+    return success_response({"message": "Slot deleted", "version": doc.get('version')})
@@ -1,8 +1,10 @@
 import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, jsonify, request
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime
+from datetime import datetime, timedelta
+from api.metrics import CACHE_LOOKUPS, SCRAPER_REFRESH
 from api.utils.response import success_response, error_response
 
 scraper_bp = Blueprint('scraper', __name__)
@@ -28,35 +30,74 @@ def categorize_notice(title):
 
 # Simple in-memory cache
 CACHE_TIMEOUT = 3600  # 1 hour
+# After a failed or empty scrape, wait this long before the next one (doubling up to CACHE_TIMEOUT)
+RETRY_BACKOFF_SECONDS = 30
 _notice_cache = {
     "data": [],
-    "last_updated": None
+    "last_updated": None,
+    "retry_at": None,
+    "backoff": RETRY_BACKOFF_SECONDS
 }
+# One scrape at a time; everyone else is served the cached notices meanwhile
+_refresh_lock = threading.Lock()
+# Scrapes block for up to 15s; callers that can't wait (the dashboard bundle)
+# run them here instead of a shared pool whose threads serve queries
+scrape_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='notice-scrape')
+
+def _needs_refresh(now, force_refresh):
+    if _notice_cache["retry_at"] and now < _notice_cache["retry_at"]:
+        return False  # the site was failing; even a forced refresh waits out the backoff
+    if force_refresh or not _notice_cache["last_updated"]:
+        return True
+    return (now - _notice_cache["last_updated"]).total_seconds() > CACHE_TIMEOUT
+
+def _refresh(now):
+    print("Fetching fresh notices via scraper...")
+    started = time.perf_counter()
+    result = 'error'
+    try:
+        notices = scrape_ipu_notices()
+        result = 'ok' if notices else 'empty'
+    except Exception as e:
+        notices = None
+        print(f"Scraper update failed: {e}")
+    if notices: # Only update cache if successful
+        _notice_cache["data"] = notices
+        _notice_cache["last_updated"] = now
+        _notice_cache["retry_at"] = None
+        _notice_cache["backoff"] = RETRY_BACKOFF_SECONDS
+    else:
+        # Serve stale data if available, and don't hammer the site meanwhile
+        _notice_cache["retry_at"] = datetime.now() + timedelta(seconds=_notice_cache["backoff"])
+        _notice_cache["backoff"] = min(_notice_cache["backoff"] * 2, CACHE_TIMEOUT)
+    SCRAPER_REFRESH.labels(result).observe(time.perf_counter() - started)
+
+def stale_notices(category=None):
+    """The cached notices as they are, never scraping."""
+    notices = _notice_cache["data"]
+    if category:
+        notices = [n for n in notices if n.get('category') == category]
+    return notices
+
+def cached_notices(category=None, force_refresh=False):
+    """Notices from the in-memory cache, re-scraped when older than CACHE_TIMEOUT."""
+    now = datetime.now()
+    if _needs_refresh(now, force_refresh) and _refresh_lock.acquire(blocking=False):
+        CACHE_LOOKUPS.labels('notices', 'miss').inc()
+        try:
+            if _needs_refresh(now, force_refresh):
+                _refresh(now)
+        finally:
+            _refresh_lock.release()
+    else:
+        CACHE_LOOKUPS.labels('notices', 'hit').inc()
+    return stale_notices(category)
 
 @scraper_bp.route('/notices', methods=['GET'])
 def get_notices():
-    global _notice_cache
     category_filter = request.args.get('category')
     force_refresh = request.args.get('force') == 'true'
-    
-    now = datetime.now()
-    if force_refresh or not _notice_cache["last_updated"] or (now - _notice_cache["last_updated"]).total_seconds() > CACHE_TIMEOUT:
-        print("Fetching fresh notices via scraper...")
-        try:
-            notices = scrape_ipu_notices()
-            if notices: # Only update cache if successful
-                _notice_cache["data"] = notices
-                _notice_cache["last_updated"] = now
-        except Exception as e:
-             print(f"Scraper update failed: {e}")
-             # Serve stale data if available
-    
-    notices = _notice_cache["data"]
-    
-    if category_filter:
-        notices = [n for n in notices if n.get('category') == category_filter]
-        
-    return success_response(notices)
+    return success_response(cached_notices(category_filter, force_refresh))
 
 @scraper_bp.route('/stats', methods=['GET'])
 def get_notice_stats():
@@ -68,6 +109,8 @@ def get_notice_stats():
     return success_response(stats)
 
 def scrape_ipu_notices():
+    import requests
+    from bs4 import BeautifulSoup
     url = "http://www.ipu.ac.in/notices.php"
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
@@ -0,0 +1,81 @@
+# api/startup.py
+# Startup mode switch and per-phase timing of the import + create_app() path
+
+import os
+import sys
+import time
+import importlib
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Lazy startup (default on Vercel): no Mongo connection at import, Socket.IO
+# attached on the first /socket.io request, heavy libraries imported by the
+# code that needs them. Off: everything is connected and imported up front,
+# so a long-running server never pays for it on a request.
+LAZY_STARTUP = os.getenv('LAZY_STARTUP', '1' if os.getenv('VERCEL') == '1' else '0') == '1'
+
+# Imported lazily by the code that uses them; preloaded when LAZY_STARTUP is off
+HEAVY_MODULES = (
+    'numpy',                                # calculations_v2 batch/simulation paths
+    'requests',                             # auth code exchange, notice scraper
+    'bs4',                                  # notice scraper
+    'authlib.integrations.flask_client',    # api.auth.oauth
+    'flask_socketio',                       # realtime
+)
+
+# api/__init__.py imports this module first, so this is when the package started loading
+_started_at = time.perf_counter()
+_phases = {}
+_first_response_ms = None
+
+
+@contextmanager
+def phase(name):
+    """Time a block of startup; repeated names add up."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = _phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def record_phase(name, start):
+    """Record a phase that began at `start` (time.perf_counter()) and ends now."""
+    _phases[name] = _phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def preload_heavy_modules():
+    """Import HEAVY_MODULES now; missing optional ones are skipped."""
+    for name in HEAVY_MODULES:
+        with phase(f"preload:{name.split('.')[0]}"):
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
+
+
+def mark_first_response():
+    """Called once, after the first response of the process is built."""
+    global _first_response_ms
+    if _first_response_ms is None:
+        _first_response_ms = (time.perf_counter() - _started_at) * 1000
+        print(f"⏱️  First response {_first_response_ms:.0f}ms after import started")
+
+
+def startup_report():
+    """{'lazy', 'phases_ms', 'total_ms', 'first_response_ms', 'heavy_loaded'}."""
+    return {
+        'lazy': LAZY_STARTUP,
+        'phases_ms': {name: round(ms, 1) for name, ms in _phases.items()},
+        'total_ms': round(sum(_phases.values()), 1),
+        'first_response_ms': round(_first_response_ms, 1) if _first_response_ms is not None else None,
+        'heavy_loaded': [name for name in HEAVY_MODULES if name in sys.modules]
+    }
+
+
+def print_startup_report():
+    report = startup_report()
+    breakdown = ', '.join(f"{name} {ms:.0f}" for name, ms in report['phases_ms'].items())
+    print(f"⏱️  Startup {report['total_ms']:.0f}ms ({'lazy' if report['lazy'] else 'eager'}): {breakdown}")
@@ -0,0 +1,49 @@
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+
+# Allow running as `python api/sweep_notifications.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load env from root before api.database connects
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
+
+from api.notifications import subjects_collection, notifications_collection, refresh_notifications
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate materialized notifications (run periodically, e.g. from cron).")
+    parser.add_argument('--email', action='append', help="Only sweep this user (repeatable)")
+    parser.add_argument('--quiet', action='store_true', help="Only print the final counts")
+    return parser.parse_args(argv)
+
+
+def _all_users():
+    """Everyone with subjects, plus users holding notifications for subjects they no longer have."""
+    emails = {row['_id'] for row in subjects_collection.aggregate(
+        [{'$group': {'_id': '$owner_email'}}], allowDiskUse=True
+    )}
+    emails.update(row['_id'] for row in notifications_collection.aggregate(
+        [{'$group': {'_id': '$owner_email'}}], allowDiskUse=True
+    ))
+    emails.discard(None)
+    return sorted(emails)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    emails = [e.lower() for e in args.email] if args.email else _all_users()
+
+    for email in emails:
+        refresh_notifications(email)
+        if not args.quiet:
+            print(f"✓ {email}")
+
+    unread = notifications_collection.count_documents({'owner_email': {'$in': emails}, 'read': False}) if emails else 0
+    print(f"Swept {len(emails)} users: {unread} unread notifications.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# api/timetable_index.py
+# Compiled, cached view of a user's weekly timetable for fast day lookups
+
+from datetime import datetime
+from bson import ObjectId
+from api.database import db
+from api.utils.cache import LRUCache
+
+timetable_collection = db.get_collection('timetable')
+subjects_collection = db.get_collection('subjects')
+
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+SKIPPED_SLOT_TYPES = ('break', 'free')
+
+# Bounded so a busy worker can't grow without limit
+CACHE_MAX_ENTRIES = 5000
+# Subject renames in another worker can't invalidate our copy; cap how stale names get
+CACHE_MAX_AGE_SECONDS = 600
+
+_TIME_FORMATS = ('%I:%M %p', '%I:%M%p', '%H:%M', '%H:%M:%S')
+
+
+def time_to_minutes(time_str):
+    """'09:30 AM' / '9:30am' / '14:00' -> minutes since midnight, or None."""
+    if not time_str:
+        return None
+    value = str(time_str).strip().upper()
+    for fmt in _TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+            return parsed.hour * 60 + parsed.minute
+        except ValueError:
+            continue
+    return None
+
+
+def _iter_day_slots(schedule):
+    """
+    Yield (weekday_index, slot) for every slot, handling both formats:
+    new   {"Monday": [slot, ...]}
+    old   {"09:00 - 10:00": {"Monday": slot}}
+    """
+    if not isinstance(schedule, dict):
+        return
+    if any(d in schedule for d in DAYS_OF_WEEK):
+        for idx, day in enumerate(DAYS_OF_WEEK):
+            slots = schedule.get(day)
+            if isinstance(slots, list):
+                for slot in slots:
+                    if isinstance(slot, dict):
+                        yield idx, slot
+        return
+    for time_key, days in schedule.items():
+        if not isinstance(days, dict):
+            continue
+        for idx, day in enumerate(DAYS_OF_WEEK):
+            slot = days.get(day)
+            if isinstance(slot, dict):
+                yield idx, {**slot, 'time': time_key}
+
+
+def _slot_subject_id(slot):
+    sid = slot.get('subject_id') or slot.get('subjectId')
+    return str(sid) if sid else None
+
+
+def compile_schedule(schedule, subjects_by_id):
+    """
+    Build {weekday_index: [slot, ...]} with slots sorted by start time.
+    Slots whose subject no longer exists are dropped.
+    """
+    compiled = {idx: [] for idx in range(len(DAYS_OF_WEEK))}
+    for idx, slot in _iter_day_slots(schedule):
+        if slot.get('type') in SKIPPED_SLOT_TYPES:
+            continue
+        sid = _slot_subject_id(slot)
+        subject = subjects_by_id.get(sid) if sid else None
+        if not subject:
+            continue
+
+        start_time = slot.get('start_time') or slot.get('startTime')
+        end_time = slot.get('end_time') or slot.get('endTime')
+        legacy_range = slot.get('time')
+        if legacy_range and not start_time:
+            parts = [p.strip() for p in str(legacy_range).split('-')]
+            start_time = parts[0]
+            if len(parts) == 2 and not end_time:
+                end_time = parts[1]
+        start_time = start_time or '09:00 AM'
+        end_time = end_time or '10:00 AM'
+
+        compiled[idx].append({
+            'slot_id': str(slot.get('id') or slot.get('_id') or ''),
+            'subject_id': sid,
+            'name': subject.get('name'),
+            'code': subject.get('code', ''),
+            'start_time': start_time,
+            'end_time': end_time,
+            'start_min': time_to_minutes(start_time),
+            'end_min': time_to_minutes(end_time),
+            'type': slot.get('type', 'Lecture')
+        })
+
+    for slots in compiled.values():
+        # Unparseable times sort last but keep a stable order among themselves
+        slots.sort(key=lambda s: (s['start_min'] if s['start_min'] is not None else 24 * 60, s['start_time']))
+    return compiled
+
+
+# Entries are validated by the timetable doc's (_id, updated_at, version) stamp
+_cache = LRUCache(max_entries=CACHE_MAX_ENTRIES, max_age=CACHE_MAX_AGE_SECONDS, name='timetable')
+
+
+def _find_timetable(user_email, semester, projection=None):
+    # Same lookup the routes have always used, including the legacy semester-less doc
+    doc = timetable_collection.find_one({'owner_email': user_email, 'semester': semester}, projection)
+    if not doc and semester == 1:
+        doc = timetable_collection.find_one({'owner_email': user_email}, projection)
+    return doc
+
+
+def get_compiled_timetable(user_email, semester):
+    """
+    Return {weekday_index: [slot, ...]} for the user, or None if there is no
+    timetable. A cache hit costs one projected read of updated_at/version.
+    """
+    probe = _find_timetable(user_email, semester, {'updated_at': 1, 'version': 1})
+    if not probe:
+        return None
+
+    key = (user_email, semester)
+    stamp = (probe['_id'], probe.get('updated_at'), probe.get('version'))
+    compiled = _cache.get(key, stamp=stamp)
+    if compiled is not None:
+        return compiled
+
+    doc = timetable_collection.find_one({'_id': probe['_id']}, {'schedule': 1, 'updated_at': 1, 'version': 1})
+    if not doc:
+        return None
+    schedule = doc.get('schedule', {})
+
+    # One batched subject lookup instead of a find_one per slot
+    subject_oids = set()
+    for _, slot in _iter_day_slots(schedule):
+        sid = _slot_subject_id(slot)
+        if sid and ObjectId.is_valid(sid):
+            subject_oids.add(ObjectId(sid))
+    subjects_by_id = {}
+    if subject_oids:
+        for sub in subjects_collection.find(
+            {'_id': {'$in': list(subject_oids)}, 'owner_email': user_email},
+            {'name': 1, 'code': 1}
+        ):
+            subjects_by_id[str(sub['_id'])] = sub
+
+    compiled = compile_schedule(schedule, subjects_by_id)
+    _cache.put(key, compiled, stamp=(doc['_id'], doc.get('updated_at'), doc.get('version')))
+    return compiled
+
+
+def get_slots_for_date(user_email, semester, target_date):
+    """Sorted compiled slots for the weekday of `target_date`."""
+    compiled = get_compiled_timetable(user_email, semester)
+    if not compiled:
+        return []
+    return compiled.get(target_date.weekday(), [])
+
+
+def invalidate_timetable_cache(user_email):
+    """Drop compiled timetables for a user, e.g. after subjects are renamed or removed."""
+    _cache.invalidate(lambda key: key[0] == user_email)
+
+
+def weekly_class_counts(compiled):
+    """{subject_id: [classes on Monday, ..., classes on Sunday]} from a compiled timetable."""
+    counts = {}
+    for idx, slots in (compiled or {}).items():
+        for slot in slots:
+            counts.setdefault(slot['subject_id'], [0] * len(DAYS_OF_WEEK))[idx] += 1
+    return counts
@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import OrderedDict
+from api.metrics import CACHE_LOOKUPS
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process LRU with an optional max age.
+    Each gunicorn/Vercel worker has its own copy, so entries must be
+    validated by the caller (stamps/fingerprints) or tolerate staleness.
+    """
+
+    def __init__(self, max_entries=1000, max_age=None, name=None):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        # Label for acadhub_cache_lookups_total; unnamed caches aren't exported
+        self.name = name
+
+    def get(self, key, stamp=None):
+        """Return the cached value, or None if missing, expired or stored under another stamp."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, stored_stamp, value = entry
+                fresh = self.max_age is None or time.time() - stored_at < self.max_age
+                if fresh and stored_stamp == stamp:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    if self.name:
+                        CACHE_LOOKUPS.labels(self.name, 'hit').inc()
+                    return value
+            self.misses += 1
+            if self.name:
+                CACHE_LOOKUPS.labels(self.name, 'miss').inc()
+            return None
+
+    def put(self, key, value, stamp=None):
+        with self._lock:
+            self._entries[key] = (time.time(), stamp, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate):
+        """Drop every entry whose key satisfies `predicate(key)`."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,83 @@
+import re
+
+# Tokens are lowercase alphanumeric runs
+# Long tokens (URLs, hashes) only get their first MAX_PREFIX_LENGTH prefixes indexed
+MAX_PREFIX_LENGTH = 16
+# Hard cap so one huge note can't blow up the multikey index
+MAX_TERMS_PER_DOC = 2000
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+", re.IGNORECASE)
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    if not text:
+        return []
+    return [t.lower() for t in _TOKEN_RE.findall(str(text))]
+
+
+def build_search_terms(*texts):
+    """
+    Build the inverted-index terms for a document.
+
+    Every token contributes itself plus its prefixes (edge n-grams), so a
+    `$all` match on the stored array gives prefix search from a plain
+    multikey index.
+    """
+    terms = set()
+    for text in texts:
+        for token in tokenize(text):
+            upper = min(len(token), MAX_PREFIX_LENGTH)
+            keys = [token[:i] for i in range(1, upper + 1)]
+            if len(token) > MAX_PREFIX_LENGTH:
+                keys.append(token)
+            for key in keys:
+                terms.add(key)
+                if len(terms) >= MAX_TERMS_PER_DOC:
+                    return sorted(terms)
+    return sorted(terms)
+
+
+def parse_query(query):
+    """Turn a user query into the list of terms that must all match."""
+    terms = []
+    for token in tokenize(query):
+        token = token[:MAX_PREFIX_LENGTH]
+        if token not in terms:
+            terms.append(token)
+    return terms
+
+
+def highlight(text, terms):
+    """
+    Return [start, end] character ranges in `text` where a token starts with
+    one of the query terms. Ranges cover the matched prefix only.
+    """
+    if not text or not terms:
+        return []
+    ranges = []
+    for match in _TOKEN_RE.finditer(str(text)):
+        token = match.group(0).lower()
+        best = 0
+        for term in terms:
+            if token.startswith(term) and len(term) > best:
+                best = len(term)
+        if best:
+            ranges.append([match.start(), match.start() + best])
+    return ranges
+
+
+def make_snippet(text, ranges, width=120):
+    """
+    Cut a window of roughly `width` characters around the first highlight.
+    Returns (snippet, shifted_ranges) so highlights stay aligned.
+    """
+    text = str(text or '')
+    if len(text) <= width:
+        return text, ranges
+    start = 0
+    if ranges:
+        start = max(0, ranges[0][0] - width // 4)
+    end = min(len(text), start + width)
+    shifted = [[s - start, e - start] for s, e in ranges if s >= start and e <= end]
+    return text[start:end], shifted
@@ -0,0 +1,114 @@
+# gunicorn.conf.py
+# Production runner: gunicorn -c gunicorn.conf.py index:app
+#
+# WORKER_MODE picks the worker model (sizes below are defaults; WEB_CONCURRENCY
+# and GUNICORN_THREADS override them):
+#   sync      one request at a time per process; 2 x cores + 1 workers.
+#             SSE streams (/api/v1/events) hold a whole worker, avoid if used.
+#   gthread   (default) cores workers x threads; threads are capped by each
+#             worker's Mongo pool, since more would only queue for a connection.
+#             Each open SSE stream holds one of those threads for up to
+#             EVENTS_STREAM_MAX_SECONDS, so 16 open dashboards can starve a
+#             worker at the default 16 threads: raise GUNICORN_THREADS (or use
+#             gevent) when the change feed is in use.
+#   gevent    green threads, 1 worker unless WEB_CONCURRENCY says otherwise:
+#             Socket.IO long-polling needs every request of a session on the
+#             same process, which gunicorn can't do across workers.
+#   eventlet  as gevent, for gunicorn releases that still ship the worker.
+#
+# Every worker has its own two clients, pymongo and Motor (api/async_db.py),
+# each with the per-worker pool. MONGO_CONNECTION_BUDGET (connections this
+# host may open, e.g. your Atlas tier's limit divided by hosts) caps that
+# pool; otherwise it's what the worker's concurrency can use.
+
+import os
+import sys
+import shutil
+import tempfile
+import importlib.util
+
+WORKER_MODE = os.getenv('WORKER_MODE', 'gthread')
+WORKER_CLASSES = {'sync': 'sync', 'gthread': 'gthread', 'gevent': 'gevent', 'eventlet': 'eventlet'}
+if WORKER_MODE not in WORKER_CLASSES:
+    raise RuntimeError(f"WORKER_MODE must be one of {', '.join(WORKER_CLASSES)}, not {WORKER_MODE!r}")
+
+# The app is imported in the master (preload_app), before gunicorn would patch
+# the worker, so green modes patch here, first
+if WORKER_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'gevent')
+elif WORKER_MODE == 'eventlet':
+    if importlib.util.find_spec('gunicorn.workers.geventlet') is None:
+        raise RuntimeError("This gunicorn has no eventlet worker; use WORKER_MODE=gevent")
+    import eventlet
+    eventlet.monkey_patch()
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'eventlet')
+
+# Workers write their metrics here and /metrics merges them (api/metrics.py).
+# Set up before the preloaded app imports prometheus_client, and emptied, or
+# the samples of a previous run would be summed into this one's
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'acadhub-metrics'))
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+# Concurrent Mongo operations one request can run (bundle/export fan-out, batch pool)
+REQUEST_FANOUT = 8
+
+cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+pool_size = int(os.getenv('MONGO_MAX_POOL_SIZE', '200'))
+connection_budget = int(os.getenv('MONGO_CONNECTION_BUDGET', '0'))
+
+if WORKER_MODE == 'sync':
+    default_workers, threads = 2 * cores + 1, 1
+elif WORKER_MODE == 'gthread':
+    default_workers, threads = max(2, cores), None
+else:
+    default_workers, threads = 1, 1
+
+workers = int(os.getenv('WEB_CONCURRENCY', default_workers))
+worker_class = WORKER_CLASSES[WORKER_MODE]
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+per_worker_pool = pool_size
+if connection_budget:
+    per_worker_pool = max(1, min(per_worker_pool, connection_budget // (workers * 2)))
+if threads is None:
+    threads = int(os.getenv('GUNICORN_THREADS', min(per_worker_pool, 16)))
+# Requests one worker serves at once; it can't use more connections than these need
+concurrency = threads if WORKER_MODE in ('sync', 'gthread') else worker_connections
+per_worker_pool = min(per_worker_pool, concurrency * REQUEST_FANOUT)
+# Read by api/database.py in every worker
+os.environ['MONGO_MAX_POOL_SIZE'] = str(per_worker_pool)
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+# Above EVENTS_STREAM_MAX_SECONDS, so SSE streams end on their own first
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '35'))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then; jitter keeps them from restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    server.log.info(
+        f"✅ {WORKER_MODE}: {workers} workers x {concurrency} concurrent requests, Mongo pool {per_worker_pool}/worker ({workers * per_worker_pool * 2} max), preload={'on' if preload_app else 'off'}"
+    )
+
+
+def post_fork(server, worker):
+    # The preloaded app's MongoClient was built in the master; each worker needs its own
+    if 'api.database' in sys.modules:
+        from api.database import reset_after_fork
+        reset_after_fork()
+
+
+def child_exit(server, worker):
+    # Drop a dead worker's live gauges (pool connections, pending batches)
+    if 'prometheus_client' in sys.modules:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,6 +1,7 @@
 import { useEffect } from 'react';
 import { io } from 'socket.io-client';
 import { useQueryClient } from '@tanstack/react-query';
+import * as SecureStore from 'expo-secure-store';
 import { useAuth } from '../contexts/AuthContext';
 import { API_URL } from '../services/api';
 
@@ -14,6 +15,12 @@ const useRealTimeSync = () => {
         console.log('🔌 Connecting to real-time sync server...');
         const socket = io(API_URL, {
             autoConnect: true,
+            // The server authenticates the connection and joins the user's room
+            auth: (cb) => {
+                SecureStore.getItemAsync('auth_token')
+                    .then((token) => cb({ token }))
+                    .catch(() => cb({}));
+            },
         });
 
         socket.on('connect', () => {
@@ -34,6 +41,11 @@ const useRealTimeSync = () => {
             queryClient.invalidateQueries({ queryKey: ['timetable'] });
         });
 
+        socket.on('subjects_updated', (data) => {
+            console.log('📚 Subjects updated event received:', data);
+            queryClient.invalidateQueries({ queryKey: ['subjects'] });
+        });
+
         socket.on('disconnect', () => {
             console.log('❌ Real-time sync disconnected');
         });
@@ -26,6 +26,8 @@ if __name__ == '__main__':
     print(f"📍 Server running at: http://localhost:5000")
     print(f"🔧 Mode: {'Development' if is_dev else 'Production'}")
     print(f"🛑 Press Ctrl+C to stop")
+    if not is_dev:
+        print("⚠️  This is the single-process dev server; run `gunicorn -c gunicorn.conf.py index:app` in production")
     
     # Start Background Worker (Notification Polling)
     # Background worker removed as Classroom integration is disabled
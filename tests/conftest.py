@@ -0,0 +1,73 @@
+import os
+import sys
+
+import mongomock
+import pytest
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+# Importing api.* must not try to reach a real MongoDB
+os.environ.setdefault('LAZY_STARTUP', '1')
+os.environ.pop('MONGO_URI', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """A fresh mongomock database behind every api.database collection."""
+    import api.database as database
+    mdb = mongomock.MongoClient().get_database('attendanceDB')
+    monkeypatch.setattr(database, '_db_instance', mdb)
+    return mdb
+
+
+@pytest.fixture(scope='session')
+def app():
+    from api import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def login(app, mongo):
+    """login(email) -> a test client whose session is signed in as `email`."""
+    def make(email='u@x.com', **user):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user'] = dict({'email': email, 'name': 'U'}, **user)
+        return client
+    return make
+
+
+class BulkResult:
+    def __init__(self):
+        self.inserted_count = self.matched_count = self.modified_count = self.deleted_count = 0
+
+
+def _bulk_write(self, requests, ordered=True):
+    # mongomock's bulk_write doesn't accept current pymongo request objects
+    result, errors = BulkResult(), []
+    for index, op in enumerate(requests):
+        try:
+            if isinstance(op, InsertOne):
+                self.insert_one(op._doc)
+                result.inserted_count += 1
+            elif isinstance(op, UpdateOne):
+                updated = self.update_one(op._filter, op._doc, upsert=op._upsert)
+                result.matched_count += updated.matched_count
+                result.modified_count += updated.modified_count
+            elif isinstance(op, DeleteOne):
+                result.deleted_count += self.delete_one(op._filter).deleted_count
+        except DuplicateKeyError as e:
+            errors.append({'index': index, 'code': 11000, 'errmsg': str(e)})
+            if ordered:
+                break
+    if errors:
+        raise BulkWriteError({'writeErrors': errors, 'writeConcernErrors': [], 'nInserted': result.inserted_count})
+    return result
+
+
+@pytest.fixture
+def bulk_write(monkeypatch):
+    monkeypatch.setattr(mongomock.collection.Collection, 'bulk_write', _bulk_write)
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from api import calculations_v2
+from api.calculations_v2 import AttendanceCalculator
+
+
+@pytest.fixture(params=['numpy', 'scalar'])
+def sampler(request, monkeypatch):
+    if request.param == 'scalar':
+        monkeypatch.setattr(calculations_v2, '_numpy', lambda: None)
+    return request.param
+
+
+def rows(seed, n=3000):
+    rng = random.Random(seed)
+    out = [(0, 0), (0, 1), (1, 1), (3, 4), (5, 3), (75, 100), (74, 100), (2, 3), (1, 7)]
+    for _ in range(n):
+        total = rng.randint(0, 200)
+        attended = rng.randint(0, total + 5)  # a few rows with attended > total
+        out.append((attended, total))
+    return out
+
+
+def expected(attended, total, target):
+    guard = AttendanceCalculator.calculate_bunk_guard(attended, total, target)
+    risk, color = AttendanceCalculator.get_risk_level(AttendanceCalculator.calculate_percentage(attended, total))
+    return guard['percentage'], guard['can_bunk'], guard['count'], risk, color
+
+
+def as_rows(batch):
+    keys = ('percentage', 'can_bunk', 'count', 'risk_level', 'color')
+    columns = [list(batch[k].tolist() if hasattr(batch[k], 'tolist') else batch[k]) for k in keys]
+    return list(zip(*columns))
+
+
+@pytest.mark.parametrize('target', [1, 50, 60, 75, 85, 99])
+def test_batch_matches_scalar_methods(sampler, target):
+    data = rows(target)
+    batch = AttendanceCalculator.calculate_batch([a for a, _ in data], [t for _, t in data], target)
+    assert as_rows(batch) == [expected(a, t, target) for a, t in data]
+    for row, can_bunk, count, bunk, must in zip(data, batch['can_bunk'], batch['count'], batch['bunk_count'], batch['must_attend']):
+        assert (bunk, must) == ((count, 0) if can_bunk else (0, count)), row
+
+
+def test_batch_with_per_row_targets(sampler):
+    data = rows(7, n=500)
+    targets = [random.Random(i).choice([40, 65, 75, 90]) for i in range(len(data))]
+    batch = AttendanceCalculator.calculate_batch([a for a, _ in data], [t for _, t in data], targets)
+    assert as_rows(batch) == [expected(a, t, tgt) for (a, t), tgt in zip(data, targets)]
+
+
+def test_batch_results_are_exact_integers(sampler):
+    batch = AttendanceCalculator.calculate_batch([3, 0, 150], [4, 10, 100], 75)
+    assert [type(v) for v in as_rows(batch)[0][2:3]] == [int]
+    assert [row[2] for row in as_rows(batch)] == [0, 30, 100]
+
+
+def test_target_100(sampler):
+    # Reachable only while nothing has been missed
+    batch = AttendanceCalculator.calculate_batch([4, 6], [4, 5], 100)
+    assert as_rows(batch) == [expected(4, 4, 100), expected(6, 5, 100)]
+    with pytest.raises(ZeroDivisionError):
+        AttendanceCalculator.calculate_bunk_guard(3, 4, 100)
+    with pytest.raises(ZeroDivisionError):
+        AttendanceCalculator.calculate_batch([4, 3], [4, 4], 100)
+
+
+def test_target_0(sampler):
+    with pytest.raises(ZeroDivisionError):
+        AttendanceCalculator.calculate_bunk_guard(3, 4, 0)
+    with pytest.raises(ZeroDivisionError):
+        AttendanceCalculator.calculate_batch([3], [4], 0)
+
+
+def test_mismatched_lengths(sampler):
+    with pytest.raises(ValueError):
+        AttendanceCalculator.calculate_batch([1, 2], [3], 75)
@@ -0,0 +1,95 @@
+import mongomock
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from api import attendance_bitmap as bitmap
+
+
+def log(_id, date, status='present'):
+    return {'_id': _id, 'date': date, 'status': status}
+
+
+LOGS = [
+    log(3, '2024-01-03', 'absent'),
+    log(1, '2024-01-01'),
+    log(2, '2024-01-02', 'late'),
+    log(4, '2024-01-04', 'cancelled'),
+    log(5, '2024-01-05', 'approved_medical'),
+]
+
+
+def test_build_state_orders_by_date_and_sets_bits():
+    state = bitmap.build_state(LOGS)
+    assert state['dates'] == ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']
+    assert state['log_ids'] == [1, 2, 3, 4, 5]
+    assert state['counted'] == 0b10111  # the cancelled class isn't counted
+    assert state['attended'] == 0b10011
+
+
+def test_encode_decode_round_trip():
+    state = bitmap.build_state(LOGS)
+    doc = bitmap._encode(state)
+    assert (doc['total'], doc['attended_count']) == (4, 3)
+    assert bitmap.percentage(doc) == 75.0
+    assert bitmap._decode(doc) == state
+
+
+def test_encode_empty_and_byte_boundary():
+    empty = bitmap._encode(bitmap.build_state([]))
+    assert bytes(empty['counted']) == b'' and bitmap.percentage(empty) == 0.0
+
+    eight = bitmap.build_state([log(i, f'2024-01-{i + 1:02d}') for i in range(8)])
+    doc = bitmap._encode(eight)
+    assert bytes(doc['counted']) == b'\xff'
+    assert bitmap._decode(doc) == eight
+
+
+def test_apply_matches_a_rebuild():
+    state = bitmap.build_state(LOGS)
+    bitmap._apply(state, 'mark', 6, '2024-01-02', 'absent')   # same date: after the existing class
+    bitmap._apply(state, 'edit', 3, None, 'present')          # status only
+    bitmap._apply(state, 'edit', 1, '2024-01-06')             # date moves, bits kept
+    bitmap._apply(state, 'delete', 4)
+    expected = bitmap.build_state([
+        log(2, '2024-01-02', 'late'), log(6, '2024-01-02', 'absent'), log(3, '2024-01-03'),
+        log(5, '2024-01-05', 'approved_medical'), log(1, '2024-01-06'),
+    ])
+    assert state == expected
+
+
+def test_apply_refuses_edit_of_unknown_log():
+    state = bitmap.build_state(LOGS)
+    assert bitmap._apply(state, 'edit', 99, '2024-01-09', 'present') is False
+    assert bitmap._apply(state, 'delete', 99) is True
+
+
+def test_window_stats_and_trend():
+    doc = bitmap._encode(bitmap.build_state(LOGS))
+    assert bitmap.window_stats(doc, start='2024-01-02', end='2024-01-03')['percentage'] == 50.0
+    assert bitmap.window_stats(doc, last=2) == {
+        'attended': 1, 'total': 1, 'percentage': 100.0, 'from': '2024-01-04', 'to': '2024-01-05'
+    }
+    assert bitmap.window_stats(doc, start='2024-02-01')['total'] == 0
+    assert [p['percentage'] for p in bitmap.trend(doc, bucket=2)] == [100.0, 0.0, 100.0]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    db = mongomock.MongoClient().get_database('attendanceDB')
+    monkeypatch.setattr(bitmap, 'bitmaps_collection', db.attendance_bitmaps)
+    monkeypatch.setattr(bitmap, 'attendance_log_collection', db.attendance_logs)
+    monkeypatch.setattr(bitmap, '_indexes_ready', False)
+    db.attendance_logs.insert_many([dict(l, owner_email='a@b.c', subject_id='s') for l in LOGS])
+    return db
+
+
+def test_rebuild_losing_an_upsert_race_returns_the_stored_doc(store, monkeypatch):
+    winner = bitmap.rebuild_bitmap('a@b.c', 's', 1)
+
+    def racing_upsert(*args, **kwargs):
+        raise DuplicateKeyError('E11000 duplicate key error')
+    monkeypatch.setattr(bitmap.bitmaps_collection, 'update_one', racing_upsert)
+
+    doc = bitmap.rebuild_bitmap('a@b.c', 's', 1)
+    assert doc['_id'] == store.attendance_bitmaps.find_one()['_id']
+    assert doc['total'] == winner['total'] == 4
@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+
+import pytest
+
+from api.calculations_v2 import AttendanceProjector
+
+MON_WED = [1, 0, 2, 0, 0, 0, 0]  # one class on Mondays, two on Wednesdays
+START = date(2024, 1, 1)  # a Monday
+
+
+def brute_force(weekly, start, end, holidays):
+    held, day = 0, start
+    while day <= end:
+        if day not in holidays:
+            held += weekly[day.weekday()]
+        day += timedelta(days=1)
+    return held
+
+
+@pytest.mark.parametrize('days', [0, 1, 6, 7, 8, 30, 100])
+def test_classes_between_matches_a_day_by_day_count(days):
+    end = START + timedelta(days=days)
+    holidays = [date(2024, 1, 3), date(2024, 1, 15), date(2024, 2, 7)]
+    assert AttendanceProjector.classes_between(MON_WED, START, end, holidays) == brute_force(MON_WED, START, end, holidays)
+
+
+def test_empty_and_reversed_ranges():
+    assert AttendanceProjector.weekday_occurrences(START, START - timedelta(days=1)) == [0] * 7
+    assert AttendanceProjector.classes_between(MON_WED, START, START - timedelta(days=5), []) == 0
+    assert AttendanceProjector.date_of_nth_class(MON_WED, START, START - timedelta(days=5), [], 1) is None
+
+
+def test_date_of_nth_class_skips_holidays():
+    holidays = [date(2024, 1, 3)]
+    assert AttendanceProjector.date_of_nth_class(MON_WED, START, date(2024, 1, 31), holidays, 1) == START
+    assert AttendanceProjector.date_of_nth_class(MON_WED, START, date(2024, 1, 31), holidays, 2) == date(2024, 1, 8)
+    assert AttendanceProjector.date_of_nth_class(MON_WED, START, date(2024, 1, 31), holidays, 0) is None
+    assert AttendanceProjector.date_of_nth_class([0] * 7, START, date(2024, 1, 31), [], 1) is None
+    assert AttendanceProjector.date_of_nth_class(MON_WED, START, date(2024, 1, 7), [], 4) is None
+
+
+def project(attended, total, end, targets=(75,)):
+    return AttendanceProjector.project_subject(attended, total, MON_WED, START, end, [], list(targets))
+
+
+def test_project_subject_statuses():
+    end = date(2024, 1, 28)  # 12 classes left
+    result = project(30, 40, end, targets=(50, 75, 95))
+    assert result['remaining_classes'] == 12 and result['classes_per_week'] == 3
+    assert result['projected_max_percentage'] == round(42 / 52 * 100, 2)
+    safe, at_risk, unreachable = result['targets']
+    assert safe['status'] == 'safe' and safe['can_miss'] == 12 and safe['must_attend'] == 0
+    assert at_risk['status'] == 'at_risk' and at_risk['can_miss'] == 3
+    # Missing the first 4 classes (Mon, Wed x2, Mon) puts 75% out of reach
+    assert at_risk['unreachable_after'] == '2024-01-08'
+    assert unreachable['status'] == 'unreachable' and unreachable['must_attend'] == 12
+
+
+def test_project_subject_without_any_classes():
+    result = project(0, 0, START - timedelta(days=1))
+    assert result['targets'][0]['status'] == 'no_classes'
+    assert result['projected_max_percentage'] == 0
+
+
+def test_target_met_exactly_leaves_no_slack():
+    result = project(9, 12, START - timedelta(days=1))
+    assert result['targets'][0]['status'] == 'safe' and result['targets'][0]['can_miss'] == 0
@@ -0,0 +1,48 @@
+import pytest
+
+from api import calculations_v2
+from api.calculations_v2 import AttendanceSimulator
+
+
+@pytest.fixture(params=['numpy', 'scalar'])
+def sampler(request, monkeypatch):
+    if request.param == 'scalar':
+        monkeypatch.setattr(calculations_v2, '_numpy', lambda: None)
+    return request.param
+
+
+def test_simulate_without_subjects(sampler):
+    assert AttendanceSimulator.simulate([], [], [], [], [], [75]) == []
+
+
+def test_simulate_nothing_left_is_deterministic(sampler):
+    zero = [[0] * 7]
+    result, = AttendanceSimulator.simulate([30], [40], [[6, 0, 0, 0, 0, 0, 0]], [[8, 0, 0, 0, 0, 0, 0]], zero, [75, 80], samples=50, seed=1)
+    assert result['remaining_classes'] == 0
+    assert result['expected_percentage'] == 75.0
+    assert set(result['percentiles'].values()) == {75.0}
+    assert [b['probability'] for b in result['below']] == [0.0, 1.0]
+
+
+def test_simulate_subject_with_no_classes_at_all(sampler):
+    zero = [[0] * 7]
+    result, = AttendanceSimulator.simulate([0], [0], zero, zero, zero, [75], samples=20, seed=1)
+    assert result['expected_percentage'] == 0.0
+
+
+def test_simulate_stays_within_best_and_worst_case(sampler):
+    remaining = [[4, 0, 8, 0, 0, 0, 0], [0] * 7]
+    history = [[3, 0, 6, 0, 0, 0, 0], [1, 1, 1, 1, 1, 0, 0]]
+    totals = [[4, 0, 8, 0, 0, 0, 0], [2, 2, 2, 2, 2, 0, 0]]
+    results = AttendanceSimulator.simulate([9, 5], [12, 10], history, totals, remaining, [75], samples=500, seed=7)
+    first, second = results
+    worst, best = 9 / 24 * 100, 21 / 24 * 100
+    assert worst <= first['percentiles']['p10'] <= first['percentiles']['p50'] <= first['percentiles']['p90'] <= best
+    assert 0 <= first['below'][0]['probability'] <= 1
+    assert second['expected_percentage'] == 50.0
+
+
+def test_simulate_clamps_samples(sampler):
+    zero = [[0] * 7]
+    result, = AttendanceSimulator.simulate([1], [2], zero, zero, [[1, 0, 0, 0, 0, 0, 0]], [50], samples=0, seed=3)
+    assert result['expected_percentage'] in (round(1 / 3 * 100, 2), round(2 / 3 * 100, 2))
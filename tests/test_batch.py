@@ -0,0 +1,106 @@
+import pytest
+
+from api.routes.batch import _parse_item
+
+
+def test_parse_item_defaults_and_merges_query():
+    entry, problem = _parse_item(0, {'path': '/api/v1/dashboard/bundle?a=1&b=2', 'query': {'b': '3'}})
+    assert problem is None
+    assert entry == (0, 'GET', '/api/v1/dashboard/bundle', {'a': '1', 'b': '3'}, None)
+
+    entry, _ = _parse_item(1, {'id': 'x', 'method': 'post', 'path': '/api/keep/notes', 'body': {'title': 't'}})
+    assert entry == ('x', 'POST', '/api/keep/notes', {}, {'title': 't'})
+
+
+@pytest.mark.parametrize('item', [
+    'not an object',
+    {'method': 'TRACE', 'path': '/api/v1/profile'},
+    {'path': '/health'},
+    {'path': 'https://evil.example/api/v1/profile'},
+    {'path': '//evil.example/api/v1/profile'},
+    {'path': '/api/v1/profile', 'query': ['a']},
+])
+def test_parse_item_rejects_malformed(item):
+    entry, problem = _parse_item(2, item)
+    assert entry is None and problem.startswith('requests[2]')
+
+
+@pytest.mark.parametrize('path', [
+    '/api/../admin/config.php',
+    '/api/v1/%2e%2e/%2E%2E/backup',
+    '/api/.env',
+    '/api/.ENV.bak',
+    '/api/config.py',
+])
+def test_parse_item_rejects_traversal_and_honeypots(path):
+    entry, problem = _parse_item(0, {'path': path})
+    assert entry is None and problem == 'requests[0]: path not allowed'
+
+
+def test_parse_item_allows_dots_inside_segments():
+    entry, problem = _parse_item(0, {'path': '/api/v1/files/report..v2.pdf'})
+    assert problem is None
+
+
+@pytest.fixture
+def client(login, mongo):
+    mongo.users.insert_one({'email': 'u@x.com', 'name': 'U'})
+    mongo.user_preferences.insert_one({'owner_email': 'u@x.com', 'preferences': {'attendance_threshold': 80}})
+    return login('u@x.com')
+
+
+def batch(client, *requests):
+    response = client.post('/api/v1/batch', json={'requests': list(requests)})
+    assert response.status_code == 200
+    return response.get_json()['data']['responses']
+
+
+def test_responses_come_back_in_request_order(client):
+    responses = batch(
+        client,
+        {'id': 'prefs', 'path': '/api/v1/profile/preferences'},
+        {'id': 'missing', 'path': '/api/v1/no-such-route'},
+        {'id': 'profile', 'path': '/api/v1/profile/'},
+    )
+    assert [r['id'] for r in responses] == ['prefs', 'missing', 'profile']
+    assert [r['status'] for r in responses] == [200, 404, 200]
+    assert responses[0]['body']['data']['attendance_threshold'] == 80
+    assert responses[2]['body']['data']['name'] == 'U'
+
+
+def test_nested_batches_and_streams_are_refused(client):
+    responses = batch(
+        client,
+        {'method': 'POST', 'path': '/api/v1/batch', 'body': {'requests': []}},
+        {'path': '/api/v1/events'},
+    )
+    assert [r['status'] for r in responses] == [400, 400]
+    assert responses[0]['body']['error']['message'] == 'Nested batches are not allowed'
+    assert responses[1]['body']['error']['message'] == "Streams can't be batched"
+
+
+def test_session_user_changed_by_a_write_is_merged_back(client):
+    responses = batch(
+        client,
+        {'method': 'PUT', 'path': '/api/v1/profile/', 'body': {'name': 'Renamed'}},
+        {'path': '/api/v1/profile/'},
+    )
+    assert [r['status'] for r in responses] == [200, 200]
+    assert responses[1]['body']['data']['name'] == 'Renamed'
+    with client.session_transaction() as sess:
+        assert sess['user']['name'] == 'Renamed'
+
+
+def test_unexpected_errors_are_not_leaked(client, app, monkeypatch):
+    def broken():
+        raise RuntimeError('connection to mongo-7.internal:27017 refused')
+    monkeypatch.setitem(app.view_functions, 'profile.handle_profile', broken)
+
+    response, = batch(client, {'path': '/api/v1/profile/'})
+    assert response['status'] == 500
+    assert response['body']['error'] == {'code': 'INTERNAL_ERROR', 'message': 'Internal server error'}
+
+
+def test_signed_out_batch(app, mongo):
+    response = app.test_client().post('/api/v1/batch', json={'requests': [{'path': '/api/v1/profile/'}]})
+    assert response.status_code == 401
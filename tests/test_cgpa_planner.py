@@ -0,0 +1,62 @@
+import pytest
+
+from api.calculations_v2 import CGPAPlanner
+
+
+def courses(*credits):
+    return [{'name': f'C{i}', 'credits': c} for i, c in enumerate(credits)]
+
+
+def test_plan_semester_prefers_the_most_even_grades():
+    planned = CGPAPlanner.plan_semester(courses(4, 4), 64)
+    assert planned['reachable'] and planned['points'] == 64 and planned['sgpa'] == 8.0
+    assert [c['grade'] for c in planned['courses']] == ['A', 'A']
+
+
+def test_plan_semester_reaches_at_least_the_required_points():
+    planned = CGPAPlanner.plan_semester(courses(1, 3, 4), 61)
+    assert planned['points'] >= 61
+    assert planned['points'] == sum(c['credits'] * c['grade_point'] for c in planned['courses'])
+    assert [c['name'] for c in planned['courses']] == ['C0', 'C1', 'C2']  # input order kept
+
+
+def test_plan_semester_never_plans_failing_or_legacy_grades():
+    planned = CGPAPlanner.plan_semester(courses(2, 3, 4, 1), 0)
+    assert {c['grade'] for c in planned['courses']} == {'P'}
+    table, _ = CGPAPlanner._profile_table((4, 1))
+    assert min(table) == 20 and max(table) == 50
+
+
+def test_plan_semester_out_of_reach_and_empty():
+    planned = CGPAPlanner.plan_semester(courses(4, 4), 81)
+    assert planned == {'reachable': False, 'points': 80, 'sgpa': 10.0, 'courses': []}
+    assert CGPAPlanner.plan_semester(courses(0), 10)['courses'] == []
+
+
+def test_plan_splits_the_requirement_over_remaining_semesters():
+    remaining = [{'semester': 5, 'courses': courses(4, 4, 2)}, {'semester': 6, 'total_credits': 10}]
+    plan = CGPAPlanner.plan(20, 160, remaining, 8.5)
+    assert plan['status'] == 'reachable'
+    assert plan['current_cgpa'] == 8.0 and plan['remaining_credits'] == 20
+    assert plan['required_sgpa'] == 9.0
+    assert plan['max_possible_cgpa'] == 9.0
+    sem5, sem6 = plan['semesters']
+    assert sem5['planned_sgpa'] >= 9.0 and len(sem5['courses']) == 3
+    assert 'courses' not in sem6
+
+
+@pytest.mark.parametrize('target, status', [(9.5, 'unreachable'), (6.0, 'met')])
+def test_plan_status(target, status):
+    plan = CGPAPlanner.plan(20, 160, [{'semester': 5, 'total_credits': 20}], target)
+    assert plan['status'] == status
+
+
+def test_plan_without_remaining_credits():
+    assert CGPAPlanner.plan(20, 160, [], 8.0)['status'] == 'met'
+    assert CGPAPlanner.plan(20, 160, [], 8.1)['status'] == 'unreachable'
+    assert CGPAPlanner.plan(0, 0, [], 5.0)['status'] == 'unreachable'
+
+
+def test_required_sgpa_is_rounded_up():
+    plan = CGPAPlanner.plan(10, 80, [{'semester': 2, 'total_credits': 20}], 8.3)
+    assert plan['required_sgpa'] == 8.45
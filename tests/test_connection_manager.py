@@ -0,0 +1,142 @@
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure, ServerSelectionTimeoutError
+
+import api.database as database
+from api.database import ConnectionManager, DatabaseUnavailable, BREAKER_FAILURE_THRESHOLD
+
+
+def fail(error):
+    def operation(*args, **kwargs):
+        raise error
+    return operation
+
+
+def ok(*args, **kwargs):
+    return 'ok'
+
+
+class FakeCursor:
+    def __init__(self, error=None, docs=()):
+        self.error = error
+        self.docs = list(docs)
+
+    def __next__(self):
+        if self.error:
+            raise self.error
+        if not self.docs:
+            raise StopIteration
+        return self.docs.pop(0)
+
+    def clone(self):
+        return FakeCursor(self.error, self.docs)
+
+
+def trip(manager):
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        with pytest.raises(ServerSelectionTimeoutError):
+            manager.call('find_one', fail(ServerSelectionTimeoutError('down')), (), {})
+    assert manager.state == manager.OPEN
+
+
+def end_open_period(manager):
+    manager.opened_at -= manager.open_seconds + 1
+
+
+def test_opens_after_threshold_and_fails_fast():
+    manager = ConnectionManager()
+    trip(manager)
+    with pytest.raises(DatabaseUnavailable):
+        manager.call('find_one', ok, (), {})
+    assert manager.rejected == 1
+
+
+def test_successful_probe_closes():
+    manager = ConnectionManager()
+    trip(manager)
+    end_open_period(manager)
+    assert manager.call('find_one', ok, (), {}) == 'ok'
+    assert manager.state == manager.CLOSED
+    assert manager.failures == 0
+
+
+def test_failed_probe_doubles_open_period():
+    manager = ConnectionManager()
+    trip(manager)
+    first = manager.open_seconds
+    end_open_period(manager)
+    with pytest.raises(ServerSelectionTimeoutError):
+        manager.call('find_one', fail(ServerSelectionTimeoutError('down')), (), {})
+    assert manager.state == manager.OPEN
+    assert manager.open_seconds == first * 2
+
+
+def test_only_one_probe_at_a_time():
+    manager = ConnectionManager()
+    trip(manager)
+    end_open_period(manager)
+    manager.before_call()
+    with pytest.raises(DatabaseUnavailable):
+        manager.before_call()
+
+
+def test_server_error_on_probe_cursor_closes():
+    # The probe is a find whose first fetch fails with a server-side error
+    manager = ConnectionManager()
+    trip(manager)
+    end_open_period(manager)
+    cursor = manager.call('find', lambda: FakeCursor(OperationFailure('bad query')), (), {})
+    with pytest.raises(OperationFailure):
+        next(cursor)
+    assert manager.state == manager.CLOSED
+    assert manager.call('find_one', ok, (), {}) == 'ok'
+
+
+def test_server_error_on_probe_call_closes():
+    manager = ConnectionManager()
+    trip(manager)
+    end_open_period(manager)
+    with pytest.raises(OperationFailure):
+        manager.call('find_one', fail(OperationFailure('bad query')), (), {})
+    assert manager.state == manager.CLOSED
+
+
+def test_lost_probe_reopens(monkeypatch):
+    manager = ConnectionManager()
+    trip(manager)
+    end_open_period(manager)
+    manager.call('find', lambda: FakeCursor(docs=[{}]), (), {})  # never iterated
+    monkeypatch.setattr(database, 'BREAKER_PROBE_SECONDS', -1)
+    with pytest.raises(DatabaseUnavailable):
+        manager.before_call()
+    assert manager.state == manager.OPEN
+    end_open_period(manager)
+    assert manager.call('find_one', ok, (), {}) == 'ok'
+    assert manager.state == manager.CLOSED
+
+
+def test_idempotent_read_retried_from_budget(monkeypatch):
+    monkeypatch.setattr(database, 'RETRY_BACKOFF_SECONDS', 0)
+    manager = ConnectionManager()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise AutoReconnect('blip')
+        return 'ok'
+
+    assert manager.call('find_one', flaky, (), {}) == 'ok'
+    assert manager.retries == 1
+    assert manager.retry_tokens == database.RETRY_BUDGET_MAX - 1
+
+
+def test_writes_and_selection_timeouts_not_retried(monkeypatch):
+    monkeypatch.setattr(database, 'RETRY_BACKOFF_SECONDS', 0)
+    manager = ConnectionManager()
+    with pytest.raises(AutoReconnect):
+        manager.call('insert_one', fail(AutoReconnect('blip')), ({},), {})
+    with pytest.raises(ServerSelectionTimeoutError):
+        manager.call('find_one', fail(ServerSelectionTimeoutError('down')), (), {})
+    with pytest.raises(AutoReconnect):
+        manager.call('aggregate', fail(AutoReconnect('blip')), ([{'$out': 'x'}],), {})
+    assert manager.retries == 0
@@ -0,0 +1,55 @@
+import pytest
+
+import api.scraper as scraper
+from api.routes import dashboard
+
+EMAIL = 'u@x.com'
+
+
+@pytest.fixture
+def client(login, mongo, monkeypatch):
+    monkeypatch.setattr(scraper, 'scrape_ipu_notices', lambda: [{'title': 'Exam datesheet', 'category': 'Exam'}])
+    mongo.subjects.insert_one({'owner_email': EMAIL, 'name': 'Maths', 'semester': 1, 'attended': 5, 'total': 10})
+    mongo.users.insert_one({'email': EMAIL, 'name': 'U', 'course': 'CSE'})
+    mongo.user_preferences.insert_one({'owner_email': EMAIL, 'preferences': {'attendance_threshold': 80}})
+    return login(EMAIL)
+
+
+def test_all_sections_by_default(client):
+    body = client.get('/api/v1/dashboard/bundle').get_json()
+    assert body['success'] and 'errors' not in body['data']
+    assert set(body['data']['sections']) == set(dashboard.BUNDLE_SECTIONS)
+    assert body['data']['sections']['preferences']['attendance_threshold'] == 80
+
+
+def test_only_requested_sections(client):
+    body = client.get('/api/v1/dashboard/bundle?sections=preferences, notices').get_json()
+    assert set(body['data']['sections']) == {'preferences', 'notices'}
+    assert body['data']['sections']['notices'] == [{'title': 'Exam datesheet', 'category': 'Exam'}]
+
+
+def test_unknown_sections_are_rejected(client):
+    response = client.get('/api/v1/dashboard/bundle?sections=preferences,bogus')
+    assert response.status_code == 400
+    assert response.get_json()['error']['code'] == 'INVALID_PARAMS'
+
+
+def test_signed_out(app, mongo):
+    assert app.test_client().get('/api/v1/dashboard/bundle').status_code == 401
+
+
+def test_failed_fetch_only_fails_its_sections(client, monkeypatch):
+    real_find_one = dashboard.find_one
+
+    async def find_one(collection, query, projection=None):
+        if collection == 'users':
+            raise RuntimeError('connection to mongo-7.internal:27017 refused')
+        return await real_find_one(collection, query, projection)
+    monkeypatch.setattr(dashboard, 'find_one', find_one)
+
+    response = client.get('/api/v1/dashboard/bundle?sections=current_user,preferences,dashboard_data')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['data']['errors'] == {'current_user': 'failed'}
+    assert set(body['data']['sections']) == {'preferences', 'dashboard_data'}
+    assert 'mongo-7' not in response.get_data(as_text=True)
@@ -0,0 +1,83 @@
+import json
+import threading
+import time
+
+from api import events
+from api.events import MemoryFeed
+
+
+def frames(feed, user, last_event_id=None, seconds=0):
+    return list(feed.stream(user, last_event_id, time.monotonic() + seconds))
+
+
+def parse(frame):
+    fields = dict(line.split(': ', 1) for line in frame.strip().split('\n'))
+    return fields.get('id'), fields['event'], json.loads(fields['data'])
+
+
+def publish(feed, user, count):
+    """Publish `count` events for `user` and return their IDs."""
+    ids = []
+    for i in range(count):
+        feed.publish(user, 'attendance_updated', {'n': i})
+        ids.append(f'{feed._boot}-{feed._seq}')
+    return ids
+
+
+def test_last_event_id_replays_what_came_after_it():
+    feed = MemoryFeed()
+    ids = publish(feed, 'u@x.com', 3)
+    feed.publish('other@x.com', 'attendance_updated', {'n': 'theirs'})
+
+    replayed = [parse(frame) for frame in frames(feed, 'u@x.com', ids[0])]
+    assert replayed == [(ids[1], 'attendance_updated', {'n': 1}), (ids[2], 'attendance_updated', {'n': 2})]
+    assert frames(feed, 'u@x.com', ids[2]) == []
+    # Without a resume point only new events are sent
+    assert frames(feed, 'u@x.com') == []
+
+
+def test_unknown_id_gets_a_reset_frame():
+    feed = MemoryFeed()
+    publish(feed, 'u@x.com', 2)
+    for stale in ('deadbeef-1', 'garbage', f'{feed._boot}-99'):
+        assert [parse(frame)[1:] for frame in frames(feed, 'u@x.com', stale)] == [
+            ('reset', {'type': 'reset', 'last_event_id': stale})
+        ]
+
+
+def test_evicted_id_gets_a_reset_frame():
+    feed = MemoryFeed(keep=2)
+    ids = publish(feed, 'u@x.com', 4)
+
+    assert parse(frames(feed, 'u@x.com', ids[0])[0])[1] == 'reset'
+    # The event just before the oldest kept one still resumes cleanly
+    assert [parse(frame)[0] for frame in frames(feed, 'u@x.com', ids[1])] == ids[2:]
+
+
+def test_least_recently_published_users_are_dropped():
+    feed = MemoryFeed(max_users=2)
+    a = publish(feed, 'a@x.com', 1)[0]
+    b = publish(feed, 'b@x.com', 1)[0]
+    publish(feed, 'a@x.com', 1)
+    publish(feed, 'c@x.com', 1)
+
+    assert parse(frames(feed, 'b@x.com', b)[0])[1] == 'reset'
+    assert [parse(frame)[2] for frame in frames(feed, 'a@x.com', a)] == [{'n': 0}]
+
+
+def test_stream_waits_for_events_until_the_deadline():
+    feed = MemoryFeed()
+    timer = threading.Timer(0.05, feed.publish, args=('u@x.com', 'timetable_updated', {'n': 1}))
+    timer.start()
+    started = time.monotonic()
+    received = frames(feed, 'u@x.com', seconds=0.3)
+    elapsed = time.monotonic() - started
+    assert [parse(frame)[1:] for frame in received] == [('timetable_updated', {'n': 1})]
+    assert 0.3 <= elapsed < 1
+
+
+def test_idle_stream_sends_heartbeats(monkeypatch):
+    monkeypatch.setattr(events, 'HEARTBEAT_SECONDS', 0.05)
+    received = frames(MemoryFeed(), 'u@x.com', seconds=0.22)
+    assert 2 <= len(received) <= 4
+    assert all(frame.startswith(': heartbeat ') for frame in received)
@@ -0,0 +1,75 @@
+import pytest
+
+from api.grading import GPA_4, IPU_10, GradingScheme, cgpa, course_points, grade_batch, grade_semester, subject_result
+
+
+@pytest.mark.parametrize('percentage, expected', [
+    (100, ('O', 10)), (90, ('O', 10)), (89.99, ('A+', 9)), (75, ('A+', 9)), (74.5, ('A', 8)),
+    (65, ('A', 8)), (55, ('B+', 7)), (50, ('B', 6)), (45, ('C', 5)), (44.99, ('P', 4)),
+    (40, ('P', 4)), (39.99, ('F', 0)), (0, ('F', 0)),
+])
+def test_ipu_10_cutoffs(percentage, expected):
+    assert IPU_10.lookup(percentage) == expected
+
+
+def test_lookups_outside_0_to_100_fall_back_to_bisect():
+    assert IPU_10.lookup(104) == ('O', 10)
+    assert IPU_10.lookup(-3) == ('F', 0)
+
+
+def test_gpa_4_cutoffs():
+    assert GPA_4.lookup(88) == ('A+', 3.7)
+    assert GPA_4.lookup(73) == ('C+', 2.3)
+    assert GPA_4.lookup(72.9) == ('C', 2.0)
+    assert GPA_4.lookup(59) == ('F', 0.0)
+
+
+def test_fractional_cutoffs_use_bisect():
+    scheme = GradingScheme('half', [(0, 'F', 0), (49.5, 'P', 1)], max_point=1)
+    assert scheme._by_floor is None
+    assert scheme.lookup(49.4) == ('F', 0)
+    assert scheme.lookup(49.5) == ('P', 1)
+
+
+def test_points_for_grade_letters():
+    assert IPU_10.points_for('C') == 5
+    assert IPU_10.points_for('P') == 4
+    assert IPU_10.points_for('C+') == 5  # legacy letter from the old table
+    assert IPU_10.points_for('Z') == 0
+    assert GPA_4.points_for('C+') == 2.3
+
+
+def test_course_points_prefers_stored_grade_point():
+    assert course_points({'grade': 'C', 'grade_point': 4}) == 4
+    assert course_points({'grade': 'C'}) == 5
+    assert course_points({}) == 0
+
+
+def test_subject_type_decides_counted_components():
+    marks = {'internal_theory': 20, 'external_theory': 50, 'internal_practical': 30, 'external_practical': 40}
+    assert subject_result(dict(marks, type='theory'))['total_marks'] == 70
+    assert subject_result(dict(marks, type='Practical'))['total_marks'] == 70
+    assert subject_result(dict(marks, type='nues'))['grade'] == 'F'
+    assert subject_result(marks)['total_marks'] == 140  # untyped: everything entered
+    assert subject_result({'type': 'theory', 'internal_theory': '20', 'external_theory': 'n/a'})['total_marks'] == 20
+
+
+def test_grade_semester_and_cgpa_are_credit_weighted():
+    semester = grade_semester([
+        {'name': 'Maths', 'type': 'theory', 'credits': 4, 'internal_theory': 25, 'external_theory': 70},
+        {'name': 'Lab', 'type': 'practical', 'credits': '1', 'internal_practical': 20, 'external_practical': 30},
+    ])
+    assert [s['grade'] for s in semester['subjects']] == ['O', 'B']
+    assert semester['total_credits'] == 5
+    assert semester['sgpa'] == round((4 * 10 + 6) / 5, 2)
+
+    result = cgpa([semester['subjects'], [{'credits': 3, 'grade': 'A'}]])
+    assert result['total_credits'] == 8
+    assert result['cgpa'] == round((46 + 24) / 8, 2)
+    assert cgpa([])['cgpa'] == 0.0
+
+
+def test_grade_batch_matches_lookup():
+    percentages = [0, 39.9, 45, 64.99, 90, 101, -1]
+    assert grade_batch(percentages) == [IPU_10.lookup(p) for p in percentages]
+    assert grade_batch(percentages, GPA_4) == [GPA_4.lookup(p) for p in percentages]
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from mongomock import aggregate
+
+EMAIL = 'u@x.com'
+
+
+@pytest.fixture(autouse=True)
+def code_point_operators(monkeypatch):
+    # mongomock has no $substrCP / $strLenCP
+    original = aggregate._Parser._handle_string_operator
+
+    def handle(self, operator, values):
+        if operator == '$substrCP':
+            string, start, length = (self.parse(v) for v in values)
+            return string[start:start + length]
+        if operator == '$strLenCP':
+            return len(self.parse(values))
+        return original(self, operator, values)
+    monkeypatch.setattr(aggregate._Parser, '_handle_string_operator', handle)
+
+
+@pytest.fixture
+def notes(mongo):
+    """Five notes of the user, newest first, one of them trashed, plus one of someone else."""
+    now = datetime(2024, 5, 1)
+    docs = [
+        {'owner_email': EMAIL, 'title': f'Note {i}', 'body': 'x' * (200 if i == 0 else 10), 'color': 'DEFAULT',
+         'created_at': now, 'updated_at': now - timedelta(minutes=i), 'trashed': i == 4}
+        for i in range(5)
+    ]
+    docs.append({'owner_email': 'other@x.com', 'title': 'Theirs', 'body': '', 'updated_at': now, 'trashed': False})
+    ids = mongo.brain_dump_notes.insert_many(docs).inserted_ids
+    return [str(i) for i in ids]
+
+
+@pytest.fixture
+def client(login, notes):
+    return login(EMAIL)
+
+
+def test_default_listing_is_the_bare_list_with_bodies(client, notes):
+    response = client.get('/api/keep/notes?limit=bogus')
+    body = response.get_json()
+    assert response.status_code == 200 and isinstance(body, list)
+    assert [n['id'] for n in body] == notes[:4]
+    assert body[0]['body'] == 'x' * 200
+    assert set(body[0]) == {'id', 'title', 'body', 'color', 'createTime', 'updateTime', 'trashed'}
+
+    trashed = client.get('/api/keep/notes?trashed=true').get_json()
+    assert [n['id'] for n in trashed] == [notes[4]]
+
+
+def test_paginated_listing_continues_from_the_cursor(client, notes):
+    first = client.get('/api/keep/notes?paginated=1&limit=3').get_json()
+    assert [n['id'] for n in first['notes']] == notes[:3]
+    assert first['notes'][0]['truncated'] and len(first['notes'][0]['snippet']) == 140
+    assert 'body' not in first['notes'][0]
+
+    second = client.get(f"/api/keep/notes?paginated=1&limit=3&cursor={first['next_cursor']}").get_json()
+    assert [n['id'] for n in second['notes']] == [notes[3]]
+    assert second['next_cursor'] is None
+
+
+def test_paginated_listing_rejects_bad_parameters(client):
+    assert client.get('/api/keep/notes?paginated=1&limit=bogus').status_code == 400
+    assert client.get('/api/keep/notes?paginated=1&cursor=nonsense').status_code == 400
+
+
+def test_listing_needs_a_session(app, mongo):
+    assert app.test_client().get('/api/keep/notes').status_code == 401
+
+
+def test_get_note(client, notes):
+    note = client.get(f'/api/keep/notes/{notes[0]}').get_json()
+    assert note['body'] == 'x' * 200 and 'search_terms' not in note
+    assert client.get('/api/keep/notes/not-an-id').status_code == 400
+    assert client.get(f'/api/keep/notes/{notes[5]}').status_code == 404  # someone else's
+    assert client.get(f'/api/keep/notes/{ObjectId()}').status_code == 404
+
+
+@pytest.mark.usefixtures('bulk_write')
+class TestBulk:
+    def post(self, client, **body):
+        return client.post('/api/keep/notes/bulk', json=body)
+
+    def test_trash_and_restore(self, client, mongo, notes):
+        response = self.post(client, action='trash', ids=[notes[0], notes[1], notes[0]])
+        assert response.get_json() == {'success': True, 'matched': 2, 'modified': 2, 'deleted': 0}
+        assert mongo.brain_dump_notes.count_documents({'owner_email': EMAIL, 'trashed': True}) == 3
+
+        self.post(client, action='restore', ids=[notes[0], notes[4]])
+        assert mongo.brain_dump_notes.count_documents({'owner_email': EMAIL, 'trashed': True}) == 1
+
+    def test_color(self, client, mongo, notes):
+        assert self.post(client, action='color', ids=[notes[2]]).status_code == 400  # no color
+        assert self.post(client, action='color', ids=[notes[2]], color='RED').get_json()['modified'] == 1
+        assert mongo.brain_dump_notes.find_one({'_id': ObjectId(notes[2])})['color'] == 'RED'
+
+    def test_delete(self, client, mongo, notes):
+        assert self.post(client, action='delete', ids=notes[:2]).get_json()['deleted'] == 2
+        assert mongo.brain_dump_notes.count_documents({'owner_email': EMAIL}) == 3
+
+    def test_only_the_owners_notes_change(self, client, mongo, notes):
+        result = self.post(client, action='delete', ids=[notes[5]]).get_json()
+        assert result['deleted'] == 0
+        result = self.post(client, action='color', ids=[notes[5]], color='RED').get_json()
+        assert result['matched'] == 0
+        assert mongo.brain_dump_notes.find_one({'_id': ObjectId(notes[5])}) is not None
+
+    @pytest.mark.parametrize('body', [
+        {'action': 'archive', 'ids': ['a']},
+        {'action': 'trash', 'ids': []},
+        {'action': 'trash', 'ids': 'abc'},
+        {'action': 'trash', 'ids': ['not-an-id']},
+    ])
+    def test_invalid_requests(self, client, body):
+        assert self.post(client, **body).status_code == 400
+
+    def test_id_cap(self, client):
+        from api.keep import BULK_MAX_NOTES
+        ids = [str(ObjectId()) for _ in range(BULK_MAX_NOTES + 1)]
+        response = self.post(client, action='trash', ids=ids)
+        assert response.status_code == 400 and str(BULK_MAX_NOTES) in response.get_json()['error']
+        assert self.post(client, action='trash', ids=ids[:BULK_MAX_NOTES]).status_code == 200
@@ -0,0 +1,25 @@
+import pytest
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_open_without_a_token(client, monkeypatch):
+    monkeypatch.delenv('METRICS_TOKEN', raising=False)
+    response = client.get('/metrics')
+    assert response.status_code == 200 and b'acadhub_' in response.data
+
+
+@pytest.mark.parametrize('headers', [{}, {'Authorization': 'Bearer wrong'}, {'Authorization': 's3cret'}])
+def test_token_required_when_set(client, monkeypatch, headers):
+    monkeypatch.setenv('METRICS_TOKEN', 's3cret')
+    response = client.get('/metrics', headers=headers)
+    assert response.status_code == 401 and response.data == b'Unauthorized\n'
+
+
+def test_matching_bearer_token(client, monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 's3cret')
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200 and response.content_type.startswith('text/plain')
@@ -0,0 +1,82 @@
+import mongomock
+import pytest
+
+from api.migrations import Migration, MigrationRunner
+
+
+class MarkMigrated(Migration):
+    name = 'mark_migrated'
+    collection = 'docs'
+    query = {'migrated': {'$ne': True}}
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+
+    def transform(self, doc):
+        if doc['_id'] == self.fail_on:
+            raise RuntimeError('crash')
+        return {'$set': {'migrated': True}}
+
+
+class FixedRanges(MigrationRunner):
+    # mongomock has no $bucketAuto
+    def _split(self):
+        return [(None, 10), (10, 20), (20, None)]
+
+
+class BulkResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+def bulk_write(self, ops, ordered=True):
+    # mongomock's bulk_write doesn't accept current pymongo UpdateOne objects
+    return BulkResult(sum(self.update_one(op._filter, op._doc).modified_count for op in ops))
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(mongomock.collection.Collection, 'bulk_write', bulk_write)
+    db = mongomock.MongoClient().get_database('attendanceDB')
+    db.docs.insert_many([{'_id': i} for i in range(30)])
+    return db
+
+
+def run(db, migration):
+    return FixedRanges(db, migration, batch_size=5, workers=3, log=lambda *a: None).run()
+
+
+def test_resume_keeps_partition_that_never_finished_a_batch(db):
+    with pytest.raises(RuntimeError):
+        run(db, MarkMigrated(fail_on=20))  # part 2 dies in its first batch
+    assert db.docs.count_documents({'migrated': True}) == 20
+
+    run(db, MarkMigrated())
+    assert db.docs.count_documents({'migrated': True}) == 30
+    parts = {c['part']: c['completed'] for c in db.migration_checkpoints.find()}
+    assert parts == {0: True, 1: True, 2: True}
+
+
+def test_resume_continues_each_part_from_its_own_checkpoint(db):
+    with pytest.raises(RuntimeError):
+        run(db, MarkMigrated(fail_on=17))  # part 1 checkpointed at 14
+    checkpoint = db.migration_checkpoints.find_one({'part': 1})
+    assert (checkpoint['lower'], checkpoint['upper'], checkpoint['last_id']) == (10, 20, 14)
+
+    stats = run(db, MarkMigrated())
+    assert stats['scanned'] == 5  # 15..19 of part 1; parts 0 and 2 finished
+    assert db.docs.count_documents({'migrated': True}) == 30
+
+
+def test_fresh_run_without_resume_forgets_old_checkpoints(db):
+    run(db, MarkMigrated())
+    db.docs.update_many({}, {'$unset': {'migrated': ''}})
+    stats = FixedRanges(db, MarkMigrated(), batch_size=5, workers=3, resume=False, log=lambda *a: None).run()
+    assert stats['scanned'] == 30
+
+
+def test_dry_run_writes_nothing(db):
+    stats = FixedRanges(db, MarkMigrated(), batch_size=5, workers=3, dry_run=True, log=lambda *a: None).run()
+    assert stats['changed'] == 30
+    assert db.docs.count_documents({'migrated': True}) == 0
+    assert db.migration_checkpoints.count_documents({}) == 0
@@ -0,0 +1,124 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from api import notifications
+
+EMAIL = 'u@x.com'
+
+
+@pytest.fixture
+def subjects(mongo, bulk_write, monkeypatch):
+    """Maths below the 75% target, Physics just on it; nothing materialized yet."""
+    monkeypatch.setattr(notifications, '_indexes_ready', False)
+    mongo.user_preferences.insert_one({'owner_email': EMAIL, 'preferences': {'attendance_threshold': 75}})
+    maths, physics = mongo.subjects.insert_many([
+        {'owner_email': EMAIL, 'name': 'Maths', 'semester': 1, 'attended': 5, 'total': 10},
+        {'owner_email': EMAIL, 'name': 'Physics', 'semester': 1, 'attended': 3, 'total': 4},
+    ]).inserted_ids
+    return str(maths), str(physics)
+
+
+@pytest.fixture
+def client(login, subjects):
+    return login(EMAIL)
+
+
+def keys(mongo):
+    return sorted(doc['key'] for doc in mongo.notifications.find({'owner_email': EMAIL}))
+
+
+def test_first_listing_materializes(client, mongo, subjects):
+    body = client.get('/api/v1/dashboard/notifications').get_json()
+    assert [n['subject_id'] for n in body['data']] == [subjects[0]]
+    assert body['data'][0]['message'].startswith('Critical: Maths is at 50.0%.')
+    assert not body['data'][0]['read']
+    assert mongo.user_preferences.find_one()['notifications_refreshed_at']
+
+
+def test_marking_absent_adds_a_notification(client, mongo, subjects):
+    notifications.refresh_notifications(EMAIL)
+    assert client.post('/api/v1/attendance/mark', json={'subject_id': subjects[1], 'status': 'absent'}).status_code == 200
+    assert keys(mongo) == sorted(f'low_attendance:{sid}' for sid in subjects)
+
+
+def test_raising_the_threshold_rewrites_notifications(client, mongo, subjects):
+    notifications.refresh_notifications(EMAIL)
+    before = mongo.notifications.find_one({'subject_id': subjects[0]})
+
+    assert client.post('/api/v1/profile/preferences', json={'attendance_threshold': 90}).status_code == 200
+    assert keys(mongo) == sorted(f'low_attendance:{sid}' for sid in subjects)
+    # The changed message is a new notification, so it shows up as unread and on top
+    after = mongo.notifications.find_one({'subject_id': subjects[0]})
+    assert after['_id'] != before['_id'] and after['message'] != before['message']
+
+
+def test_recovered_and_deleted_subjects_lose_their_notification(client, mongo, subjects):
+    mongo.subjects.update_one({'_id': ObjectId(subjects[1])}, {'$set': {'attended': 1}})
+    notifications.refresh_notifications(EMAIL)
+    assert len(keys(mongo)) == 2
+
+    recovered = client.post(f'/api/v1/academic/subjects/{subjects[0]}/attendance-count', json={'attended': 9, 'total': 10})
+    assert recovered.status_code == 200
+    assert keys(mongo) == [f'low_attendance:{subjects[1]}']
+
+    assert client.delete(f'/api/v1/academic/subjects/{subjects[1]}').status_code == 200
+    assert keys(mongo) == []
+
+
+def test_duplicate_keys_from_a_concurrent_refresh_are_ignored(mongo, subjects, monkeypatch):
+    notifications.refresh_notifications(EMAIL)
+    mongo.user_preferences.update_one({}, {'$unset': {'notifications_refreshed_at': ''}})
+    mongo.subjects.update_one({'_id': ObjectId(subjects[1])}, {'$set': {'attended': 1}})
+
+    # Simulate a refresh that read the notifications before another one inserted them
+    real_find = notifications.notifications_collection.find
+    monkeypatch.setattr(notifications.notifications_collection, 'find',
+                        lambda query, *a, **kw: iter(()) if 'key' in query else real_find(query, *a, **kw))
+    notifications.refresh_notifications(EMAIL)
+
+    # The duplicate is skipped without stopping the other insert or the refresh marker
+    assert keys(mongo) == sorted(f'low_attendance:{sid}' for sid in subjects)
+    assert mongo.user_preferences.find_one()['notifications_refreshed_at']
+
+
+def test_mark_read(client, mongo, subjects):
+    mongo.subjects.update_one({'_id': ObjectId(subjects[1])}, {'$set': {'attended': 1}})
+    notifications.refresh_notifications(EMAIL)
+    first, second = (str(doc['_id']) for doc in mongo.notifications.find())
+
+    response = client.post('/api/v1/dashboard/notifications/read', json={'ids': [first]})
+    assert response.get_json()['data'] == {'updated': 1}
+    assert {n['id']: n['read'] for n in client.get('/api/v1/dashboard/notifications').get_json()['data']} == {
+        first: True, second: False
+    }
+
+    assert client.post('/api/v1/dashboard/notifications/read', json={}).get_json()['data'] == {'updated': 1}
+    assert mongo.notifications.count_documents({'read': False}) == 0
+
+    bad = client.post('/api/v1/dashboard/notifications/read', json={'ids': ['nope']})
+    assert bad.status_code == 400 and bad.get_json()['error']['code'] == 'INVALID_PARAMS'
+
+
+def test_cursor_paging(client, mongo):
+    mongo.user_preferences.update_one({}, {'$set': {'notifications_refreshed_at': datetime(2024, 5, 1)}})
+    ids = [str(i) for i in mongo.notifications.insert_many([
+        {'owner_email': EMAIL, 'key': f'k{i}', 'title': f'N{i}', 'read': False, 'created_at': datetime(2024, 5, 1)}
+        for i in range(5)
+    ]).inserted_ids][::-1]
+
+    pages, cursor = [], None
+    while True:
+        response = client.get('/api/v1/dashboard/notifications?limit=2' + (f'&before={cursor}' if cursor else ''))
+        pages.append([n['id'] for n in response.get_json()['data']])
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert pages == [ids[:2], ids[2:4], ids[4:]]
+
+    items, next_cursor = notifications.list_notifications(EMAIL, before=ids[0], limit=10)
+    assert [n['id'] for n in items] == ids[1:] and next_cursor is None
+
+    bad = client.get('/api/v1/dashboard/notifications?before=nope')
+    assert bad.status_code == 400 and bad.get_json()['error']['code'] == 'INVALID_PARAMS'
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import pytest
+
+from api import profiling
+
+ADMIN, USER = 'admin@x.com', 'u@x.com'
+
+
+@pytest.fixture
+def users(mongo, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_SAMPLE_RATE', 0)
+    monkeypatch.setattr(profiling, 'PROFILE_EMAILS', set())
+    monkeypatch.setattr(profiling, '_indexes_ready', False)
+    mongo.users.insert_many([{'email': ADMIN, 'role': 'admin'}, {'email': USER, 'role': 'student'}])
+    return mongo
+
+
+def profile(**fields):
+    return {
+        '_id': 'abc123', 'user_email': USER, 'method': 'GET', 'path': '/api/v1/dashboard/?q=1', 'status': 200,
+        'duration_ms': 12.5, 'interval_ms': 5.0, 'samples': 3,
+        'stacks': [['handle (api/app.py:1);load (api/db.py:9)', 2], ['handle (api/app.py:1)', 1]],
+        'mongo': {'commands': 1, 'duration_ms': 1.2, 'trace': [
+            {'command': 'find subjects', 'at_ms': 0.5, 'duration_ms': 1.2, 'docs': 4, 'failed': False}
+        ]},
+        'created_at': datetime(2024, 5, 1, 12, 0), **fields
+    }
+
+
+def test_render_html_builds_the_call_tree():
+    page = profiling.render_html(profile())
+    assert '<b>100.0%</b> handle (api/app.py:1)' in page
+    assert '<b>66.7%</b> load (api/db.py:9)' in page
+    assert '<td>find subjects</td><td>4</td>' in page
+    assert profiling.collapsed(profile()) == 'handle (api/app.py:1);load (api/db.py:9) 2\nhandle (api/app.py:1) 1\n'
+
+
+def test_render_html_escapes_request_data():
+    page = profiling.render_html(profile(
+        _id='<id>',
+        path='/api/keep/notes?q=<script>alert(1)</script>',
+        user_email='"><img src=x>',
+        stacks=[['<lambda> (api/x.py:1);<svg onload=x> (api/y.py:2)', 1]],
+        mongo={'commands': 1, 'duration_ms': 1, 'trace': [
+            {'command': 'find <b>notes</b>', 'at_ms': 0, 'duration_ms': 1, 'docs': 0, 'failed': True}
+        ]},
+    ))
+    for raw in ('<script>', '<img', '<svg', '<lambda>', '<b>notes', '<id>'):
+        assert raw not in page
+    assert '&lt;script&gt;alert(1)&lt;/script&gt;' in page and '&lt;svg onload=x&gt;' in page
+    assert 'find &lt;b&gt;notes&lt;/b&gt;' in page and '&quot;&gt;&lt;img src=x&gt;' in page
+
+
+def test_profile_header_only_counts_for_admins(app, users):
+    for email, headers, expected in [
+        (ADMIN, {'X-Profile': '1'}, True),
+        (USER, {'X-Profile': '1'}, False),
+        (None, {'X-Profile': '1'}, False),
+        (ADMIN, {}, False),
+        (ADMIN, {'X-Profile': 'yes'}, False),
+    ]:
+        with app.test_request_context(headers=headers):
+            assert profiling._requested(email) is expected, (email, headers)
+
+
+def test_profile_emails_and_sampling(app, users, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_EMAILS', {USER})
+    with app.test_request_context():
+        assert profiling._requested(USER) and not profiling._requested(ADMIN)
+        monkeypatch.setattr(profiling, 'PROFILE_SAMPLE_RATE', 1.0)
+        assert profiling._requested(ADMIN)
+
+
+def test_admin_request_is_profiled_and_served(login, users):
+    admin = login(ADMIN)
+    response = admin.get('/api/v1/profiles', headers={'X-Profile': '1'})
+    profile_id = response.headers['X-Profile-Id']
+    stored = users.request_profiles.find_one({'_id': profile_id})
+    assert (stored['user_email'], stored['path'], stored['status']) == (ADMIN, '/api/v1/profiles', 200)
+
+    listed = admin.get('/api/v1/profiles').get_json()['data']
+    assert [p['id'] for p in listed] == [profile_id]
+    page = admin.get(f'/api/v1/profiles/{profile_id}?format=html')
+    assert page.status_code == 200 and page.mimetype == 'text/html'
+
+    assert 'X-Profile-Id' not in login(USER).get('/api/v1/profiles', headers={'X-Profile': '1'}).headers
+
+
+def test_profiles_are_admin_only(app, login, users):
+    users.request_profiles.insert_one(profile())
+    assert app.test_client().get('/api/v1/profiles').status_code == 401
+    user = login(USER)
+    for path in ('/api/v1/profiles', '/api/v1/profiles/abc123', '/api/v1/profiles/abc123?format=collapsed'):
+        assert user.get(path).status_code == 403
+    assert login(ADMIN).get('/api/v1/profiles/abc123?format=collapsed').status_code == 200
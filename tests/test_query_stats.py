@@ -0,0 +1,97 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from api import query_stats
+from api.query_stats import RequestQueries, init_query_stats, listener
+
+
+@pytest.fixture(autouse=True)
+def routes(monkeypatch):
+    monkeypatch.setattr(query_stats, '_routes', {})
+
+
+def command(name, command, request_id, micros=1000, reply=None):
+    return SimpleNamespace(command_name=name, command=command, request_id=request_id,
+                           duration_micros=micros, reply=reply or {})
+
+
+def run(*events):
+    """Send (method, event) pairs through the listener inside a bound RequestQueries."""
+    queries = RequestQueries()
+    token = query_stats.bind(queries)
+    try:
+        for method, event in events:
+            getattr(listener, method)(event)
+    finally:
+        query_stats.unbind(token)
+    return queries
+
+
+def test_listener_counts_commands_of_the_bound_request():
+    find = command('find', {'find': 'subjects'}, 1, 2000, {'cursor': {'firstBatch': [{}, {}]}})
+    more = command('getMore', {'getMore': 7, 'collection': 'subjects'}, 2, 500, {'cursor': {'nextBatch': [{}]}})
+    update = command('findAndModify', {'findAndModify': 'timetable'}, 3, 1500, {'value': {'_id': 1}})
+    failed = command('insert', {'insert': 'notifications'}, 4)
+    queries = run(('started', find), ('succeeded', find), ('started', more), ('succeeded', more),
+                  ('started', update), ('succeeded', update), ('started', failed), ('failed', failed),
+                  ('succeeded', command('find', {'find': 'subjects'}, 99)))
+
+    assert (queries.count, queries.duration_ms, queries.docs, queries.failed) == (4, 5.0, 4, 1)
+    assert queries.by_command == {'find subjects': 1, 'getMore subjects': 1,
+                                  'findAndModify timetable': 1, 'insert notifications': 1}
+    assert query_stats.current() is None
+    listener.started(find)  # outside a request: ignored
+
+
+def test_trace_keeps_every_command():
+    queries = RequestQueries()
+    queries.trace = []
+    queries.command_started(1, 'ping', None)
+    queries.command_finished(1, 250)
+    assert [(t['command'], t['duration_ms'], t['failed']) for t in queries.trace] == [('ping', 0.25, False)]
+
+
+def over(count=0, duration_ms=0.0):
+    queries = RequestQueries()
+    queries.count, queries.duration_ms = count, duration_ms
+    return queries
+
+
+def test_record_route_counts_requests_over_budget():
+    query_stats._record_route('GET /a', over(3, 10.0))
+    query_stats._record_route('GET /a', over(query_stats.QUERY_BUDGET + 1, 10.0))
+    query_stats._record_route('GET /a', over(1, query_stats.QUERY_TIME_BUDGET_MS + 1))
+    query_stats._record_route('GET /b', over(query_stats.QUERY_BUDGET, query_stats.QUERY_TIME_BUDGET_MS))
+
+    a, b = sorted(query_stats.route_stats(), key=lambda row: row['route'])
+    assert (a['requests'], a['over_budget'], a['max_commands']) == (3, 2, query_stats.QUERY_BUDGET + 1)
+    assert a['avg_commands'] == round((3 + query_stats.QUERY_BUDGET + 1 + 1) / 3, 1)
+    assert b['over_budget'] == 0
+
+
+def test_server_timing_header_per_request():
+    app = Flask(__name__)
+    init_query_stats(app)
+
+    @app.route('/items/<int:n>')
+    def items(n):
+        queries = query_stats.current()
+        for i in range(n):
+            queries.command_started(i, 'find', 'items')
+            queries.command_finished(i, 1500)
+        return 'ok'
+
+    client = app.test_client()
+    timing = client.get('/items/3').headers['Server-Timing']
+    assert re.fullmatch(r'db;dur=4\.5;desc="3 queries", app;dur=\d+\.\d', timing)
+    # Each request starts from zero
+    assert client.get('/items/1').headers['Server-Timing'].startswith('db;dur=1.5;desc="1 queries"')
+    assert client.get('/missing').headers['Server-Timing'].startswith('db;dur=0.0;desc="0 queries"')
+
+    rows = {row['route']: row for row in query_stats.route_stats()}
+    assert (rows['GET /items/<int:n>']['requests'], rows['GET /items/<int:n>']['commands']) == (2, 4)
+    assert rows['GET <unmatched>']['requests'] == 1
+    assert query_stats.current() is None
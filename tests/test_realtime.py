@@ -0,0 +1,79 @@
+from api.realtime import EmitCoalescer, merge_payloads
+
+
+def event(**fields):
+    return {'type': 'attendance_updated', 'email': 'u@x.com', 'at': '2024-05-01T10:00:00', **fields}
+
+
+def test_single_payload_passes_through():
+    payload = event(action='marked', date='2024-05-02', semester=3, subject_id='s1', extra='kept')
+    merged = merge_payloads([payload])
+    assert {k: merged[k] for k in payload} == payload
+    assert merged['dates'] == ['2024-05-02'] and merged['subject_ids'] == ['s1'] and merged['semesters'] == [3]
+    assert merged['actions'] == ['marked'] and merged['coalesced'] == 1
+
+
+def test_burst_is_unioned_and_sorted():
+    merged = merge_payloads([
+        event(action='marked', date='2024-05-03', subject_id='s2', semester=2),
+        event(action='edited', date='2024-05-01', previous_date='2024-05-03', subject_ids=['s1', None], semester=2),
+        event(action='marked', dates=['2024-05-02'], subject_ids=['s2'], semesters=[1]),
+    ])
+    assert merged['dates'] == ['2024-05-01', '2024-05-02', '2024-05-03']
+    assert merged['subject_ids'] == ['s1', 's2']
+    assert merged['semesters'] == [1, 2]
+    assert merged['actions'] == ['marked', 'edited']
+    assert merged['action'] == 'marked' and merged['coalesced'] == 3
+    # Fields the events disagreed on are dropped rather than picked from one of them
+    assert 'date' not in merged and 'semester' not in merged
+
+
+def test_coalesced_counts_add_up_across_merges():
+    first = merge_payloads([event(action='a'), event(action='b')])
+    assert merge_payloads([first, event(action='c')])['coalesced'] == 3
+
+
+def recorder():
+    sent = []
+    return sent, lambda event, payload, room: sent.append((room, event, payload))
+
+
+def test_zero_window_sends_immediately():
+    sent, send = recorder()
+    coalescer = EmitCoalescer(send, window=0)
+    coalescer.submit('u@x.com', 'attendance_updated', event(action='marked'))
+    coalescer.submit('u@x.com', 'attendance_updated', event(action='edited'))
+    assert [payload['actions'] for _, _, payload in sent] == [['marked'], ['edited']]
+    assert coalescer.stats() == {
+        'received': 2, 'emitted': 2, 'suppressed': 0, 'pending_batches': 0, 'window_seconds': 0
+    }
+
+
+def test_flush_drains_pending_keys():
+    sent, send = recorder()
+    coalescer = EmitCoalescer(send, window=60)
+    for action in ('a', 'b', 'c'):
+        coalescer.submit('u@x.com', 'attendance_updated', event(action=action))
+    coalescer.submit('u@x.com', 'timetable_updated', event(type='timetable_updated', action='saved'))
+    coalescer.submit('v@x.com', 'attendance_updated', event(action='d'))
+    assert sent == [] and coalescer.stats()['pending_batches'] == 3
+
+    coalescer.flush(('u@x.com', 'attendance_updated'))
+    assert [(room, name, payload['coalesced']) for room, name, payload in sent] == [('u@x.com', 'attendance_updated', 3)]
+    stats = coalescer.stats()
+    assert stats['pending_batches'] == 2
+    assert stats['received'] == stats['emitted'] + stats['suppressed'] + 2
+
+    coalescer.flush()
+    assert {(room, name) for room, name, _ in sent[1:]} == {('u@x.com', 'timetable_updated'), ('v@x.com', 'attendance_updated')}
+    assert coalescer.stats() == {
+        'received': 5, 'emitted': 3, 'suppressed': 2, 'pending_batches': 0, 'window_seconds': 60
+    }
+
+
+def test_failed_send_still_counts_as_emitted():
+    def send(event, payload, room):
+        raise ConnectionError('queue down')
+    coalescer = EmitCoalescer(send, window=0)
+    coalescer.submit('u@x.com', 'attendance_updated', event(action='marked'))
+    assert coalescer.stats()['emitted'] == 1
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from api import results_summary as rs
+
+USER = 'a@b.c'
+
+
+def subjects(*grades):
+    return [{'name': f'S{i}', 'credits': 4, 'grade': grade} for i, grade in enumerate(grades)]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock.MongoClient().get_database('attendanceDB')
+    monkeypatch.setattr(rs, 'semester_results_collection', db.semester_results)
+    monkeypatch.setattr(rs, 'summaries_collection', db.result_summaries)
+    return db
+
+
+def test_saves_and_deletes_move_the_totals(db):
+    rs.save_semester_result(USER, 1, {'subjects': subjects('O', 'A+')})
+    rs.save_semester_result(USER, 2, {'subjects': subjects('A')})
+    rs.save_semester_result(USER, 1, {'subjects': subjects('O')})
+    assert rs.delete_semester_result(USER, 2)
+    assert not rs.delete_semester_result(USER, 3)
+
+    stored = db.result_summaries.find_one({'_id': USER})
+    assert stored['pending_writes'] == 0
+    assert rs.verify_result_summary(USER) == []
+    assert rs.summary_view(rs.get_result_summary(USER))['cgpa'] == 10.0
+
+
+def test_save_interrupted_after_the_result_write_is_rebuilt_on_read(db, monkeypatch):
+    rs.save_semester_result(USER, 1, {'subjects': subjects('O')})
+
+    def crash(*args):
+        raise RuntimeError('worker died')
+    with monkeypatch.context() as m:
+        m.setattr(rs, '_apply_delta', crash)
+        with pytest.raises(RuntimeError):
+            rs.save_semester_result(USER, 2, {'subjects': subjects('B')})
+
+    # Within the grace period the mark may belong to a save still in flight
+    assert rs.get_result_summary(USER)['total_credits'] == 4
+
+    db.result_summaries.update_one({'_id': USER}, {'$set': {'pending_since': datetime.utcnow() - timedelta(minutes=5)}})
+    summary = rs.get_result_summary(USER)
+    assert summary['total_credits'] == 8
+    assert rs.verify_result_summary(USER) == []
+
+
+def test_delta_after_a_concurrent_rebuild_rebuilds_instead(db):
+    rs.save_semester_result(USER, 1, {'subjects': subjects('O')})
+    rs._mark_pending(USER)
+    db.semester_results.update_one({'owner_email': USER, 'semester': 1}, {'$set': {'subjects': subjects('O', 'O')}})
+    rs.rebuild_result_summary(USER)  # already counts the new subjects, and drops the mark
+
+    rs._apply_delta(USER, 1, subjects('O'), subjects('O', 'O'))
+    assert rs.get_result_summary(USER)['total_credits'] == 8
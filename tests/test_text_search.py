@@ -0,0 +1,51 @@
+from api.utils import text_search
+from api.utils.text_search import build_search_terms, highlight, make_snippet, parse_query, tokenize
+
+
+def test_tokenize_lowercases_alphanumeric_runs():
+    assert tokenize('DBMS: Unit-2, ER diagrams!') == ['dbms', 'unit', '2', 'er', 'diagrams']
+    assert tokenize(None) == [] and tokenize('') == []
+    assert tokenize(42) == ['42']
+
+
+def test_build_search_terms_indexes_every_prefix():
+    assert build_search_terms('Cat', 'ca') == ['c', 'ca', 'cat']
+
+
+def test_long_tokens_keep_capped_prefixes_and_the_whole_token():
+    url = 'abcdefghijklmnopqrstuvwxyz'
+    terms = build_search_terms(url)
+    assert len(terms) == text_search.MAX_PREFIX_LENGTH + 1
+    assert url in terms and url[:text_search.MAX_PREFIX_LENGTH + 1] not in terms
+    # A long query is cut to the same length, so it still finds the note
+    assert all(term in terms for term in parse_query(url))
+
+
+def test_terms_per_document_are_capped(monkeypatch):
+    monkeypatch.setattr(text_search, 'MAX_TERMS_PER_DOC', 10)
+    assert len(build_search_terms('alpha beta gamma delta epsilon')) == 10
+
+
+def test_parse_query_dedupes_in_order():
+    assert parse_query('Graph graph THEORY gr') == ['graph', 'theory', 'gr']
+    assert parse_query('  ...  ') == []
+
+
+def test_highlight_marks_the_longest_matching_prefix():
+    text = 'Graph theory: graphs and grading'
+    assert highlight(text, ['gr', 'graph']) == [[0, 5], [14, 19], [25, 27]]
+    assert highlight(text, []) == [] and highlight('', ['gr']) == []
+
+
+def test_make_snippet_keeps_highlights_aligned():
+    assert make_snippet('short', [[0, 2]]) == ('short', [[0, 2]])
+
+    text = 'x' * 200 + ' target ' + 'y' * 200
+    ranges = highlight(text, ['target'])
+    snippet, shifted = make_snippet(text, ranges, width=40)
+    assert len(snippet) == 40
+    start, end = shifted[0]
+    assert snippet[start:end] == 'target'
+
+    snippet, shifted = make_snippet('z' * 300, [], width=50)
+    assert snippet == 'z' * 50 and shifted == []
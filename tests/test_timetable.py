@@ -0,0 +1,144 @@
+import re
+
+import pytest
+from mongomock import OperationFailure, collection
+from mongomock.filtering import filter_applies
+
+EMAIL = 'u@x.com'
+
+
+@pytest.fixture(autouse=True)
+def slot_updates(monkeypatch):
+    # mongomock has no arrayFilters, its $pull raises on a slot that fails an $or condition,
+    # and it silently skips a $pull on a non-array field that MongoDB rejects
+    def pull_applies(spec, doc):
+        try:
+            return filter_applies(spec, doc)
+        except OperationFailure:
+            if 'field' in spec:
+                return False
+            raise
+    monkeypatch.setattr(collection, 'filter_applies', pull_applies)
+
+    original = collection.Collection.find_one_and_update
+
+    def find_one_and_update(self, filter, update, array_filters=None, **kwargs):
+        doc = self.find_one(filter) if array_filters or '$pull' in update else None
+        if doc is not None:
+            for path in update.get('$pull', {}):
+                value = _get(doc, path)
+                if value is not None and not isinstance(value, list):
+                    raise OperationFailure('Cannot apply $pull to a non-array value', code=2)
+            update = {op: dict(_resolved(fields, doc, array_filters or [])) for op, fields in update.items()}
+        return original(self, filter, update, **kwargs)
+    monkeypatch.setattr(collection.Collection, 'find_one_and_update', find_one_and_update)
+
+
+def _get(doc, path):
+    for part in path.split('.'):
+        doc = doc.get(part) if isinstance(doc, dict) else None
+    return doc
+
+
+def _resolved(fields, doc, array_filters):
+    for path, value in fields.items():
+        found = re.search(r'\.\$\[(\w+)\]', path)
+        if not found:
+            yield path, value
+            continue
+        array = _get(doc, path[:found.start()])
+        spec = next(f for f in array_filters if all(k.startswith('$') or k.startswith(found[1] + '.') for k in f))
+        for i, element in enumerate(array):
+            if filter_applies(spec, {found[1]: element}):
+                yield f'{path[:found.start()]}.{i}{path[found.end():]}', value
+
+
+@pytest.fixture
+def timetable(mongo):
+    """Semester 1 at version 3, with Wednesday still in the legacy dict format."""
+    mongo.timetable.insert_one({
+        'owner_email': EMAIL, 'semester': 1, 'version': 3,
+        'schedule': {
+            'Monday': [{'id': 'm1', 'subject': 'Maths'}, {'id': 'm2', 'subject': 'Physics'}],
+            'Tuesday': [{'id': 't1', 'subject': 'Chemistry'}],
+            'Wednesday': {'0': {'id': 'w1', 'subject': 'Biology'}},
+        },
+    })
+    return mongo.timetable
+
+
+@pytest.fixture
+def client(login, timetable):
+    return login(EMAIL)
+
+
+def schedule(timetable):
+    return timetable.find_one({'owner_email': EMAIL})['schedule']
+
+
+def test_add_slot_appends_and_bumps_the_version(client, timetable):
+    response = client.post('/api/v1/timetable/slot', json={'day': 'Tuesday', 'subject': 'English'})
+    body = response.get_json()
+    assert response.status_code == 200 and body['data']['version'] == 4
+    assert schedule(timetable)['Tuesday'][-1] == {'id': body['data']['id'], 'day': 'Tuesday', 'subject': 'English'}
+
+
+def test_add_slot_upserts_a_missing_timetable(client, timetable):
+    response = client.post('/api/v1/timetable/slot?semester=2', json={'day': 'Friday', 'id': 'f1'})
+    assert response.status_code == 200 and response.get_json()['data']['version'] == 1
+    assert timetable.find_one({'semester': 2})['schedule']['Friday'] == [{'day': 'Friday', 'id': 'f1'}]
+
+
+def test_update_slot_sets_fields_without_a_day(client, timetable):
+    response = client.put('/api/v1/timetable/slot/m2', json={'subject': 'Astronomy', 'id': 'hijack'})
+    assert response.status_code == 200 and response.get_json()['data']['version'] == 4
+    assert schedule(timetable)['Monday'][1] == {'id': 'm2', 'subject': 'Astronomy'}
+
+
+def test_delete_slot_without_a_day_skips_legacy_dict_days(client, timetable):
+    response = client.delete('/api/v1/timetable/slot/t1')
+    assert response.status_code == 200 and response.get_json()['data']['version'] == 4
+    stored = schedule(timetable)
+    assert stored['Tuesday'] == [] and len(stored['Monday']) == 2
+    assert stored['Wednesday'] == {'0': {'id': 'w1', 'subject': 'Biology'}}
+
+
+def test_delete_slot_with_a_day(client, timetable):
+    assert client.delete('/api/v1/timetable/slot/m1?day=Monday').status_code == 200
+    assert [s['id'] for s in schedule(timetable)['Monday']] == ['m2']
+
+
+def test_missing_slot_is_a_404(client):
+    assert client.put('/api/v1/timetable/slot/nope', json={'subject': 'x'}).status_code == 404
+    assert client.delete('/api/v1/timetable/slot/nope').status_code == 404
+    assert client.delete('/api/v1/timetable/slot/m1?day=Tuesday').status_code == 404
+
+
+@pytest.mark.parametrize('send', [
+    lambda c, url, **kw: c.open(url, headers={'If-Match': '"3"'}, **kw),
+    lambda c, url, **kw: c.open(f'{url}?version=3', **kw),
+])
+def test_matching_version_is_accepted(client, timetable, send):
+    assert send(client, '/api/v1/timetable/slot', method='POST', json={'day': 'Monday'}).status_code == 200
+    assert timetable.find_one()['version'] == 4
+
+
+def test_stale_version_is_a_conflict(client, timetable):
+    stale = {'If-Match': '2'}
+    added = client.post('/api/v1/timetable/slot', json={'day': 'Monday'}, headers=stale)
+    assert added.status_code == 409 and added.get_json()['error']['code'] == 'VERSION_CONFLICT'
+
+    updated = client.put('/api/v1/timetable/slot/m1', json={'subject': 'x'}, headers=stale)
+    deleted = client.delete('/api/v1/timetable/slot/m1?version=2')
+    for response in (updated, deleted):
+        assert response.status_code == 409
+        assert response.get_json()['error']['details'] == {'current_version': 3}
+
+    assert timetable.find_one()['version'] == 3
+    assert [s['id'] for s in schedule(timetable)['Monday']] == ['m1', 'm2']
+
+
+def test_unversioned_document_counts_as_version_zero(client, timetable):
+    timetable.update_one({}, {'$unset': {'version': ''}})
+    response = client.delete('/api/v1/timetable/slot/m1', headers={'If-Match': '0'})
+    assert response.status_code == 200 and response.get_json()['data']['version'] == 1
@@ -0,0 +1,108 @@
+from datetime import date, datetime
+
+import pytest
+from bson import ObjectId
+
+from api import timetable_index
+from api.utils import cache
+from api.utils.cache import LRUCache
+
+EMAIL = 'u@x.com'
+MATHS, PHYSICS = str(ObjectId()), str(ObjectId())
+SUBJECTS = {MATHS: {'name': 'Maths', 'code': 'MA101'}, PHYSICS: {'name': 'Physics'}}
+
+
+def test_compile_new_format_sorts_by_start_time_and_drops_unknown_subjects():
+    compiled = timetable_index.compile_schedule({
+        'Monday': [
+            {'id': 'b', 'subjectId': PHYSICS, 'startTime': '2:00 PM', 'endTime': '3:00 PM'},
+            {'id': 'a', 'subject_id': MATHS, 'start_time': '09:30', 'end_time': '10:30'},
+            {'id': 'x', 'subject_id': str(ObjectId()), 'start_time': '08:00'},
+            {'id': 'l', 'subject_id': MATHS, 'type': 'break'},
+        ],
+        'Friday': [{'id': 'c', 'subject_id': MATHS, 'start_time': 'soon'}, {'id': 'd', 'subject_id': MATHS}],
+    }, SUBJECTS)
+    assert [(s['slot_id'], s['name'], s['start_min']) for s in compiled[0]] == [('a', 'Maths', 570), ('b', 'Physics', 840)]
+    assert compiled[0][0]['code'] == 'MA101' and compiled[0][1]['code'] == ''
+    # Unparseable times sort last; missing ones default to 9-10 AM
+    assert [(s['slot_id'], s['start_time'], s['end_time']) for s in compiled[4]] == [
+        ('d', '09:00 AM', '10:00 AM'), ('c', 'soon', '10:00 AM')
+    ]
+    assert all(compiled[i] == [] for i in (1, 2, 3, 5, 6))
+
+
+def test_compile_legacy_dict_format():
+    compiled = timetable_index.compile_schedule({
+        '11:00 AM - 12:00 PM': {'Tuesday': {'subject_id': MATHS, 'type': 'Lab'}},
+        '09:00 AM - 10:00 AM': {'Tuesday': {'subjectId': PHYSICS}, 'Monday': 'not a slot'},
+        'notes': 'ignored',
+    }, SUBJECTS)
+    assert [(s['name'], s['start_time'], s['end_time'], s['type']) for s in compiled[1]] == [
+        ('Physics', '09:00 AM', '10:00 AM', 'Lecture'), ('Maths', '11:00 AM', '12:00 PM', 'Lab')
+    ]
+    assert compiled[0] == []
+
+
+@pytest.fixture
+def stored(mongo, monkeypatch):
+    monkeypatch.setattr(timetable_index, '_cache', LRUCache(max_entries=10, max_age=60))
+    maths = mongo.subjects.insert_one({'owner_email': EMAIL, 'name': 'Maths'}).inserted_id
+    mongo.timetable.insert_one({
+        'owner_email': EMAIL, 'semester': 1, 'version': 1, 'updated_at': datetime(2024, 5, 1),
+        'schedule': {'Monday': [{'id': 'a', 'subject_id': str(maths), 'start_time': '09:00 AM'}]},
+    })
+    return mongo
+
+
+def test_cached_until_the_timetable_changes(stored):
+    first = timetable_index.get_compiled_timetable(EMAIL, 1)
+    assert timetable_index.get_compiled_timetable(EMAIL, 1) is first
+    assert timetable_index._cache.hits == 1
+
+    stored.timetable.update_one({}, {'$set': {'schedule.Monday.0.start_time': '10:00 AM'}, '$inc': {'version': 1}})
+    assert timetable_index.get_compiled_timetable(EMAIL, 1)[0][0]['start_time'] == '10:00 AM'
+
+    stored.timetable.update_one({}, {'$set': {'schedule.Monday.0.start_time': '11:00 AM', 'updated_at': datetime(2024, 5, 2)}})
+    assert timetable_index.get_slots_for_date(EMAIL, 1, date(2024, 5, 6))[0]['start_time'] == '11:00 AM'
+    assert timetable_index._cache.hits == 1
+
+
+def test_subject_renames_need_an_explicit_invalidation(stored):
+    assert timetable_index.get_compiled_timetable(EMAIL, 1)[0][0]['name'] == 'Maths'
+    stored.subjects.update_one({}, {'$set': {'name': 'Calculus'}})
+    assert timetable_index.get_compiled_timetable(EMAIL, 1)[0][0]['name'] == 'Maths'
+
+    timetable_index.invalidate_timetable_cache(EMAIL)
+    assert timetable_index.get_compiled_timetable(EMAIL, 1)[0][0]['name'] == 'Calculus'
+
+
+def test_no_timetable(stored):
+    assert timetable_index.get_compiled_timetable('other@x.com', 1) is None
+    assert timetable_index.get_slots_for_date('other@x.com', 1, date(2024, 5, 6)) == []
+
+
+def test_lru_stamp_and_max_age(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    lru = LRUCache(max_entries=10, max_age=60)
+    lru.put('k', 'v', stamp=1)
+    assert lru.get('k', stamp=1) == 'v'
+    assert lru.get('k', stamp=2) is None
+
+    now[0] += 59
+    assert lru.get('k', stamp=1) == 'v'
+    now[0] += 1
+    assert lru.get('k', stamp=1) is None
+    assert (lru.hits, lru.misses) == (2, 2)
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    lru.get('a')
+    lru.put('c', 3)
+    assert (lru.get('a'), lru.get('b'), lru.get('c')) == (1, None, 3)
+
+    lru.invalidate(lambda key: key == 'a')
+    assert lru.get('a') is None and len(lru) == 1